@@ -10,6 +10,9 @@ import uvicorn
 from pathlib import Path
 import logging
 import os
+import queue
+import atexit
+from logging.handlers import QueueHandler, QueueListener
 from dotenv import load_dotenv
 
 from api.routers import cvs, offres, matching, projects, enterprises, interview_sheet
@@ -22,13 +25,25 @@ load_dotenv(PROJECT_ROOT / ".env")
 logs_dir = Path(__file__).parent.parent / "logs"
 logs_dir.mkdir(exist_ok=True)
 
+# Les handlers (fichier + console) tournent dans un thread dédié: un log depuis
+# l'event loop se limite à un put() dans une file, sans I/O bloquante
+_log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+_log_handlers = [
+    logging.FileHandler(logs_dir / 'api_debug.log', mode='a', encoding='utf-8'),
+    logging.StreamHandler()
+]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_formatter)
+
+_log_queue = queue.SimpleQueue()
+_log_listener = QueueListener(_log_queue, *_log_handlers, respect_handler_level=True)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(logs_dir / 'api_debug.log', mode='a', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
+    format='%(message)s',  # Mise en forme finale faite par les handlers du listener
+    handlers=[QueueHandler(_log_queue)]
 )
 
 logger = logging.getLogger(__name__)
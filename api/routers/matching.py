@@ -131,7 +131,7 @@ async def run_matching_stream(
 
         try:
             # === Charger le projet, l'offre et les CVs ===
-            from project_manager import ProjectManager
+            from project_manager import ProjectManager, write_matching_meta
 
             pm = ProjectManager(projects_folder="projects")
 
@@ -411,6 +411,8 @@ async def run_matching_stream(
             results_file = matchings_dir / "results.json"
             with open(results_file, 'w', encoding='utf-8') as f:
                 json.dump(summary, f, ensure_ascii=False, indent=2)
+            write_matching_meta(results_file, timestamp_str, len(reranked_cvs))
+            pm.record_matching(project_id, timestamp_str)
 
             yield f"event: done\n"
             yield f"data: {json.dumps({'summary': summary})}\n\n"
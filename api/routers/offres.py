@@ -148,13 +148,11 @@ async def extract_criteria(project_id: str, request: ParseOffreRequest):
 
     **Retourne:** Liste de critères must-have suggérés
     """
-    from matching_engine import MatchingEngine
-    from config_loader import Config
+    # Moteur partagé du router matching (modèle d'embeddings et clients LLM chargés une seule fois)
+    from api.routers.matching import matching_engine
 
     try:
-        config = Config()
-        engine = MatchingEngine(config._config)
-        criteria = engine.extract_must_have_with_llm(request.text)
+        criteria = matching_engine.extract_must_have_with_llm(request.text)
 
         return {
             "criteria": criteria,
@@ -414,7 +412,6 @@ async def delete_offre(project_id: str):
     sys.path.insert(0, str(PROJECT_ROOT))
 
     from project_manager import ProjectManager
-    from pathlib import Path
 
     try:
         pm = ProjectManager(projects_folder="projects")
@@ -426,15 +423,8 @@ async def delete_offre(project_id: str):
                 detail=f"Projet {project_id} introuvable"
             )
 
-        # Supprimer le fichier offre_parsed.json
-        project_dir = pm.get_project_path(project_id)
-        offre_file = project_dir / "offre_parsed.json"
-
-        if offre_file.exists():
-            offre_file.unlink()
-
-        # Mettre à jour le projet
-        pm.update_project(project_id, {"offre_saved": False})
+        # Supprimer offre_parsed.json (et l'offre gardée en mémoire) puis mettre à jour le projet
+        pm.delete_offer(project_id)
 
     except HTTPException:
         raise
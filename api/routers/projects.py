@@ -2,6 +2,7 @@
 Router Projets - CRUD projets et historique matchings
 """
 
+import os
 import sys
 from typing import List, Optional
 from pathlib import Path
@@ -258,20 +259,19 @@ async def get_latest_matching(project_id: str):
                 detail=f"Aucun matching trouvé pour le projet {project_id}"
             )
 
-        # Lister tous les dossiers de matching
-        matching_dirs = [d for d in matchings_dir.iterdir() if d.is_dir()]
+        # Lister tous les dossiers de matching (type fourni par scandir, sans stat par entrée)
+        with os.scandir(matchings_dir) as entries:
+            matching_names = [e.name for e in entries if e.is_dir()]
 
-        if not matching_dirs:
+        if not matching_names:
             raise HTTPException(
                 status_code=404,
                 detail=f"Aucun matching trouvé pour le projet {project_id}"
             )
 
-        # Trier par nom (format YYYY-MM-DD_HH-MM-SS) et prendre le dernier
-        latest = sorted(matching_dirs, reverse=True)[0]
-
+        # Le plus grand nom (format YYYY-MM-DD_HH-MM-SS) est le plus récent
         return {
-            "timestamp": latest.name
+            "timestamp": max(matching_names)
         }
 
     except HTTPException:
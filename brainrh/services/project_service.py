@@ -3,6 +3,7 @@ ProjectService - Gestion des projets
 Couche service : DB (index) + JSON (données complètes)
 """
 
+import threading
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 from sqlmodel import Session, select
@@ -12,6 +13,17 @@ from brainrh.models import ProjectDB
 from brainrh.services.file_storage import FileStorage
 from brainrh.paths import get_relative_path, ENTERPRISES_DIR
 
+# Un verrou par projet: les lectures-modifications-écritures du JSON d'un même projet
+# (mises à jour, compteur de matchings) sont sérialisées au sein du process
+_project_locks: Dict[str, threading.Lock] = {}
+_project_locks_guard = threading.Lock()
+
+
+def _project_lock(project_id: str) -> threading.Lock:
+    """Verrou du projet (créé au premier usage)"""
+    with _project_locks_guard:
+        return _project_locks.setdefault(project_id, threading.Lock())
+
 
 class ProjectService:
     """Service pour gestion des projets (DB + JSON)"""
@@ -153,7 +165,7 @@ class ProjectService:
         Returns:
             Données mises à jour ou None si introuvable
         """
-        with get_session() as session:
+        with _project_lock(project_id), get_session() as session:
             db_proj = session.get(ProjectDB, project_id)
 
             if not db_proj:
@@ -197,6 +209,48 @@ class ProjectService:
 
         return full_data
 
+    @staticmethod
+    def increment_matching_count(project_id: str, timestamp: str) -> Optional[Dict[str, Any]]:
+        """
+        Enregistre un nouveau matching: compteur incrémenté et dernier matching mis à jour
+        en une seule opération. La lecture-incrément-écriture se fait sous le verrou du projet
+        (partagé avec update_project): deux matchings simultanés ne perdent pas d'incrément
+        dans un même process (plusieurs workers API ne sont pas couverts)
+
+        Args:
+            project_id: ID projet
+            timestamp: Timestamp du matching
+
+        Returns:
+            Données mises à jour ou None si introuvable
+        """
+        with _project_lock(project_id), get_session() as session:
+            db_proj = session.get(ProjectDB, project_id)
+
+            if not db_proj:
+                return None
+
+            try:
+                full_data = FileStorage.load_json(db_proj.json_path)
+            except FileNotFoundError:
+                full_data = {
+                    "id": db_proj.id,
+                    "nom": db_proj.nom,
+                    "enterprise_id": db_proj.enterprise_id
+                }
+
+            full_data["matchings_count"] = full_data.get("matchings_count", 0) + 1
+            full_data["last_matching"] = timestamp
+            full_data["last_modified"] = datetime.now().isoformat()
+
+            FileStorage.save_json(db_proj.json_path, full_data)
+
+            db_proj.last_modified = datetime.now()
+            session.add(db_proj)
+            session.commit()
+
+        return full_data
+
     @staticmethod
     def delete_project(project_id: str) -> bool:
         """
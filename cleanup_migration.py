@@ -165,7 +165,7 @@ def summary():
 
             historique_dir = project_dir / "historique"
             if historique_dir.exists():
-                matching_count += len(list(historique_dir.glob("*.json")))
+                matching_count += len([f for f in historique_dir.glob("*.json") if not f.name.endswith(".meta.json")])
 
     print(f"   - {project_count} projets migrés")
     print(f"   - {matching_count} matchings préservés")
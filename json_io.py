@@ -0,0 +1,57 @@
+"""
+Lecture/écriture des fichiers JSON des projets (offre, historique des matchings)
+- orjson si installé (parsing et sérialisation en C), sinon json de la bibliothèque standard
+- Même rendu dans les deux cas: UTF-8 non échappé, indentation de 2
+- Écriture atomique: fichier temporaire écrit d'un bloc, fsync, puis renommage
+  (un crash ne laisse jamais de JSON à moitié écrit)
+"""
+
+import json
+import os
+from typing import Any
+
+try:
+    import orjson  # Optionnel: (dé)sérialisation JSON plus rapide
+except ImportError:
+    orjson = None
+
+
+def loads(data: bytes) -> Any:
+    """Parse du JSON (octets UTF-8 ou str)"""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def dumps(data: Any) -> bytes:
+    """Sérialise en JSON indenté, encodé en UTF-8"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:
+            pass  # Type non géré par orjson: repli sur json
+    return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def read_json(path) -> Any:
+    """Lit et parse un fichier JSON"""
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def atomic_write_bytes(path, data: bytes):
+    """Écrit des octets de manière atomique (temporaire + fsync + os.replace)"""
+    path = str(path)
+    tmp = f"{path}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]  # Un seul appel en pratique; boucle si écriture partielle
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(tmp, path)
+
+
+def write_json(path, data: Any):
+    """Écrit un fichier JSON de manière atomique (voir dumps)"""
+    atomic_write_bytes(path, dumps(data))
@@ -252,8 +252,11 @@ async def parse_cvs_parallel_async(
 
     # Créer le ThreadPoolExecutor
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Lancer toutes les tâches
+        # Lancer toutes les tâches (chaque tâche terminée est déposée dans une file: O(1) par complétion)
+        done_queue: asyncio.Queue = asyncio.Queue()
         tasks = [asyncio.create_task(one(cv_path)) for cv_path in cv_files]
+        for task in tasks:
+            task.add_done_callback(done_queue.put_nowait)
 
         results = []
         completed = 0
@@ -262,8 +265,8 @@ async def parse_cvs_parallel_async(
         failed_count = 0
 
         # Traiter les résultats au fur et à mesure
-        for fut in asyncio.as_completed(tasks):
-            result = await fut
+        for _ in range(total):
+            result = (await done_queue.get()).result()
             completed += 1
 
             # Mise à jour de la progression
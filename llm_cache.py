@@ -0,0 +1,49 @@
+"""
+Cache disque des réponses LLM
+- Clé: sha256 du modèle, du prompt et du texte analysé → réponse brute du modèle
+- Une relance sur les mêmes CVs lit un fichier au lieu de refaire l'appel (latence et budget RPM/TPM)
+- Arborescence shardée cache/llm/{clé[:2]}/{clé}.json: pas de répertoire à des milliers d'entrées
+"""
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Optional
+
+LLM_CACHE_DIR = Path(__file__).parent / "cache" / "llm"
+
+
+def make_key(*parts: str) -> str:
+    """Clé déterministe à partir des éléments qui déterminent la réponse (modèle, prompt, texte)"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")  # Séparateur: ("ab", "c") et ("a", "bc") donnent des clés distinctes
+    return digest.hexdigest()
+
+
+def _path(key: str) -> Path:
+    return LLM_CACHE_DIR / key[:2] / f"{key}.json"
+
+
+def get(key: str) -> Optional[str]:
+    """Retourne la réponse en cache, ou None (absente ou illisible)"""
+    try:
+        return _path(key).read_text(encoding="utf-8")
+    except OSError:
+        return None
+
+
+def put(key: str, value: str):
+    """
+    Mémorise une réponse (écriture atomique: un lecteur concurrent ne voit jamais un fichier partiel).
+    L'échec d'écriture n'est pas bloquant: l'appel sera simplement refait la prochaine fois
+    """
+    path = _path(key)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(value, encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"⚠️ Cache LLM non écrit sur disque: {e}")
@@ -5,28 +5,59 @@ V2: Validation avec jsonschema + parallélisation
 """
 
 import os
+import asyncio
+import gzip
 import json
+import logging
 import re
 import hashlib
 import numpy as np
 import time
 import requests
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Optional, Tuple
 from pathlib import Path
+from types import MappingProxyType
 
 from sentence_transformers import SentenceTransformer
-from openai import OpenAI
+import httpx
+from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from tenacity import retry, stop_after_attempt, stop_after_delay, wait_exponential, retry_if_exception
 
 # Import modules V2
 from validation import validate_and_repair, check_cv_size, check_min_content
-from parallel_processing import ParallelPipeline
+from parallel_processing import (
+    ParallelPipeline,
+    create_async_openai_client,
+    DEFAULT_REQUESTS_PER_MINUTE,
+    DEFAULT_TOKENS_PER_MINUTE,
+    BATCH_API_MIN_CALLS,
+)
 from lib.experience_analyzer import detect_gaps_and_overlaps, format_flags_for_llm
 from lib.models import Evidence, EvidenceMap, Flags
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Connexions HTTP max du client OpenAI async (appels must-have / nice-have parallèles)
+ASYNC_LLM_MAX_CONNECTIONS = 500
+
+# Résumé vide partagé (lecture seule) pour les CVs sans résumé préparé
+_EMPTY_SUMMARY = MappingProxyType({})
+
+# Codes HTTP transitoires pour lesquels un nouvel appel xAI a du sens
+XAI_RETRYABLE_STATUS = frozenset({408, 409, 425, 429, 500, 502, 503, 504})
+
+
+def _is_retryable_xai_error(exc: BaseException) -> bool:
+    """Retry uniquement sur erreurs transitoires (réseau, timeout, 429, 5xx), jamais sur 400/401/403"""
+    if isinstance(exc, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    if isinstance(exc, requests.exceptions.HTTPError) and exc.response is not None:
+        return exc.response.status_code in XAI_RETRYABLE_STATUS
+    return False
+
 
 class MatchingEngine:
     """Moteur de matching CV/Offre avec scoring intelligent"""
@@ -51,6 +82,11 @@ class MatchingEngine:
             raise ValueError("❌ OPENAI_API_KEY non trouvée")
 
         self.openai_client = OpenAI(api_key=api_key)
+        self._api_key = api_key
+
+        # Client OpenAI async (créé à la demande, lié à l'event loop courant)
+        self._async_openai_client = None
+        self._async_openai_loop = None
         self.llm_model = self.config.get("llm", {}).get("model", "gpt-5-mini")
         self.fallback_models = self.config.get("llm", {}).get("fallback_models", ["gpt-4.1-mini", "gpt-5-mini"])
 
@@ -63,6 +99,9 @@ class MatchingEngine:
         # Seed pour déterminisme (même seed = mêmes résultats)
         self.seed = self.config.get("llm", {}).get("seed", 42)
 
+        # Compression gzip du corps des requêtes xAI (désactivée automatiquement si 415)
+        self.compress_xai = self.config.get("llm", {}).get("compress_xai", True)
+
         # Technical info removed from UI as requested
         # print(f"✅ Engine initialisé avec modèle: {self.llm_model} (temp_extract={self.temperature_extraction}, temp_rerank={self.temperature_reranking})")
 
@@ -73,17 +112,35 @@ class MatchingEngine:
         self.cache_folder = Path(self.config.get("paths", {}).get("cache_folder", "cache"))
         self.cache_folder.mkdir(parents=True, exist_ok=True)
 
-        # V2: Pipeline de parallélisation
-        self.pipeline = ParallelPipeline(
-            max_file_workers=self.config.get("parallel", {}).get("file_workers", 4),
-            max_llm_concurrent=self.config.get("parallel", {}).get("llm_concurrent", 5),
-            openai_client=self.openai_client
-        )
+        # V2: Pipeline de parallélisation, construit au premier usage (voir la propriété pipeline):
+        # ni clients HTTP ni préchauffage pour un moteur qui ne s'en sert pas
+        self._pipeline: Optional[ParallelPipeline] = None
 
         # V2: Flags de validation
         self.validate_outputs = self.config.get("validation", {}).get("enabled", True)
         self.max_repair_attempts = self.config.get("validation", {}).get("max_repair_attempts", 3)
 
+    @property
+    def pipeline(self) -> ParallelPipeline:
+        """Pipeline de parallélisation (clients AsyncOpenAI créés, et préchauffés si configuré, au premier accès)"""
+        if self._pipeline is None:
+            parallel_config = self.config.get("parallel", {})
+            llm_concurrent = parallel_config.get("llm_concurrent", 5)
+            # Clés supplémentaires (OPENAI_API_KEYS, séparées par des virgules): appels répartis entre les clés
+            api_keys = [k.strip() for k in os.getenv("OPENAI_API_KEYS", "").split(",") if k.strip()] or [self._api_key]
+            self._pipeline = ParallelPipeline(
+                max_file_workers=parallel_config.get("file_workers", 4),
+                max_llm_concurrent=llm_concurrent,
+                # Utilisés sur l'event loop partagé (run_sync), pool keep-alive dimensionné
+                openai_clients=[create_async_openai_client(key, llm_concurrent) for key in api_keys],
+                requests_per_minute=parallel_config.get("requests_per_minute", DEFAULT_REQUESTS_PER_MINUTE),
+                tokens_per_minute=parallel_config.get("tokens_per_minute", DEFAULT_TOKENS_PER_MINUTE),
+                batch_mode=parallel_config.get("batch_api", False),
+                batch_threshold=parallel_config.get("batch_api_min_calls", BATCH_API_MIN_CALLS),
+                prewarm=parallel_config.get("prewarm", False)
+            )
+        return self._pipeline
+
     def _default_config(self) -> Dict:
         """Configuration par défaut"""
         return {
@@ -103,6 +160,25 @@ class MatchingEngine:
             "paths": {"cache_folder": "cache"}
         }
 
+    def _get_async_openai_client(self) -> AsyncOpenAI:
+        """
+        Client OpenAI async partagé par toutes les tâches de l'event loop courant
+        (pool httpx keep-alive dimensionné pour la concurrence des appels parallèles)
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_openai_client is None or self._async_openai_loop is not loop:
+            self._async_openai_client = AsyncOpenAI(
+                api_key=self._api_key,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=ASYNC_LLM_MAX_CONNECTIONS,
+                        max_keepalive_connections=ASYNC_LLM_MAX_CONNECTIONS
+                    )
+                )
+            )
+            self._async_openai_loop = loop
+        return self._async_openai_client
+
     def clean_text(self, text: str) -> str:
         """Nettoie et normalise le texte"""
         if not text:
@@ -141,11 +217,8 @@ class MatchingEngine:
 
         return cv_text
 
-    def _find_nice_have_missing(self, cv: Dict, nice_have_list: List[str], job_description: str) -> List[str]:
-        """Recherche sémantique des nice-have manquants"""
-        if not nice_have_list:
-            return []
-
+    def _build_nice_have_prompt(self, cv: Dict, nice_have_list: List[str], job_description: str) -> str:
+        """Construit le prompt de recherche sémantique des nice-have"""
         cv_text = json.dumps(cv, ensure_ascii=False)
 
         prompt = f"""
@@ -175,6 +248,24 @@ class MatchingEngine:
         - Être généreux dans l'interprétation sémantique pour les nice-have
         """
 
+        return prompt
+
+    def _nice_have_missing_from_response(self, content: str, nice_have_list: List[str]) -> List[str]:
+        """Extrait les nice-have manquants de la réponse LLM (tous manquants si réponse invalide)"""
+        result = self._safe_json_parse(content)
+
+        if isinstance(result, dict):
+            return result.get("nice_have_manquants", [])
+
+        return nice_have_list
+
+    def _find_nice_have_missing(self, cv: Dict, nice_have_list: List[str], job_description: str) -> List[str]:
+        """Recherche sémantique des nice-have manquants"""
+        if not nice_have_list:
+            return []
+
+        prompt = self._build_nice_have_prompt(cv, nice_have_list, job_description)
+
         response = self.openai_client.chat.completions.create(
             model=self.llm_model,
             messages=[
@@ -186,12 +277,26 @@ class MatchingEngine:
             # GPT-5 mini: pas de paramètre temperature
         )
 
-        result = self._safe_json_parse(response.choices[0].message.content)
+        return self._nice_have_missing_from_response(response.choices[0].message.content, nice_have_list)
 
-        if isinstance(result, dict):
-            return result.get("nice_have_manquants", [])
+    async def _find_nice_have_missing_async(self, cv: Dict, nice_have_list: List[str], job_description: str) -> List[str]:
+        """Recherche sémantique des nice-have manquants (client OpenAI async, pour nice_have_parallel)"""
+        if not nice_have_list:
+            return []
 
-        return nice_have_list
+        prompt = self._build_nice_have_prompt(cv, nice_have_list, job_description)
+
+        response = await self._get_async_openai_client().chat.completions.create(
+            model=self.llm_model,
+            messages=[
+                {"role": "system", "content": "Tu es un assistant RH expert en analyse sémantique. Tu réponds UNIQUEMENT en JSON valide."},
+                {"role": "user", "content": prompt}
+            ],
+            response_format={"type": "json_object"},
+            seed=self.seed  # Déterminisme: même seed = mêmes résultats
+        )
+
+        return self._nice_have_missing_from_response(response.choices[0].message.content, nice_have_list)
 
     def _analyze_experience_bonus(self, cv: Dict, job_description: str) -> float:
         """
@@ -536,27 +641,8 @@ Retourne UNIQUEMENT un JSON conforme à ce schéma:
 
         return must_haves_clean
 
-    def check_single_cv_must_have(
-        self,
-        cv: Dict,
-        indispensables: List[str],
-        job_description: str,
-        timeout_s: int = 20
-    ) -> Tuple[bool, str, Dict]:
-        """
-        Vérifie si un CV unique satisfait tous les must-have (format amélioré)
-
-        Args:
-            cv: CV à vérifier
-            indispensables: Liste des critères indispensables
-            job_description: Description de l'offre (contexte)
-            timeout_s: Timeout en secondes pour l'appel LLM
-
-        Returns:
-            Tuple (accepted: bool, rationale: str, raw_trace: dict)
-        """
-        cv_name = cv.get('cv', 'CV sans nom')
-
+    def _build_must_have_prompt(self, cv: Dict, indispensables: List[str], job_description: str) -> str:
+        """Construit le prompt de vérification must-have d'un CV"""
         # Liste numérotée des critères
         criteres_liste = "\n".join([f"{j+1}. {critere}" for j, critere in enumerate(indispensables)])
 
@@ -690,6 +776,57 @@ Exemple 4 (compétence technique):
 - Pour CHAQUE critère d'expérience: DÉTAILLE le calcul dans "commentaire" + mentionne flexibilité si appliquée
 """
 
+        return prompt
+
+    def _must_have_decision_from_result(self, cv_name: str, result: Dict) -> Tuple[bool, str, Dict]:
+        """Interprète une décision must-have déjà parsée → (accepted, rationale, raw_trace)"""
+        # Validation du format
+        decision = result.get("decision", "ÉLIMINÉ")
+        rationale = result.get("rationale", "Réponse LLM invalide")
+        element_declencheur = result.get("element_declencheur")
+
+        accepted = decision == "ACCEPTÉ"
+
+        # Log compact (logging: appelé depuis l'event loop par les versions async, pas de print bloquant)
+        if accepted:
+            logger.info("✅ %s: ACCEPTÉ", cv_name)
+        else:
+            logger.info("❌ %s: ÉLIMINÉ (bloqué par: %s)", cv_name, element_declencheur or 'non précisé')
+
+        return accepted, rationale, result
+
+    def _must_have_decision_from_response(self, cv_name: str, result_text: str) -> Tuple[bool, str, Dict]:
+        """Interprète la réponse LLM must-have → (accepted, rationale, raw_trace)"""
+        try:
+            result = json.loads(result_text)
+        except json.JSONDecodeError as e:
+            logger.warning("⚠️ %s: Erreur parsing JSON - %s", cv_name, e)
+            return False, f"Erreur parsing: {str(e)}", {"error": "json_decode", "raw": result_text}
+
+        return self._must_have_decision_from_result(cv_name, result)
+
+    def check_single_cv_must_have(
+        self,
+        cv: Dict,
+        indispensables: List[str],
+        job_description: str,
+        timeout_s: int = 20
+    ) -> Tuple[bool, str, Dict]:
+        """
+        Vérifie si un CV unique satisfait tous les must-have (format amélioré)
+
+        Args:
+            cv: CV à vérifier
+            indispensables: Liste des critères indispensables
+            job_description: Description de l'offre (contexte)
+            timeout_s: Timeout en secondes pour l'appel LLM
+
+        Returns:
+            Tuple (accepted: bool, rationale: str, raw_trace: dict)
+        """
+        cv_name = cv.get('cv', 'CV sans nom')
+        prompt = self._build_must_have_prompt(cv, indispensables, job_description)
+
         try:
             response = self.openai_client.chat.completions.create(
                 model=self.llm_model,
@@ -702,33 +839,106 @@ Exemple 4 (compétence technique):
                 # GPT-5 mini: pas de paramètre temperature
                 timeout=timeout_s
             )
-
             result_text = response.choices[0].message.content.strip()
-            result = json.loads(result_text)
+            return self._must_have_decision_from_response(cv_name, result_text)
 
-            # Validation du format
-            decision = result.get("decision", "ÉLIMINÉ")
-            rationale = result.get("rationale", "Réponse LLM invalide")
-            element_declencheur = result.get("element_declencheur")
-
-            accepted = decision == "ACCEPTÉ"
+        except Exception as e:
+            print(f"❌ {cv_name}: Erreur LLM - {str(e)}")
+            return False, f"Erreur LLM: {str(e)}", {"error": str(e)}
 
-            # Log compact
-            if accepted:
-                print(f"✅ {cv_name}: ACCEPTÉ")
-            else:
-                print(f"❌ {cv_name}: ÉLIMINÉ (bloqué par: {element_declencheur or 'non précisé'})")
+    async def check_single_cv_must_have_async(
+        self,
+        cv: Dict,
+        indispensables: List[str],
+        job_description: str,
+        timeout_s: int = 20
+    ) -> Tuple[bool, str, Dict]:
+        """
+        Version async de check_single_cv_must_have (client OpenAI async, pour must_have_parallel)
 
-            return accepted, rationale, result
+        Returns:
+            Tuple (accepted: bool, rationale: str, raw_trace: dict)
+        """
+        cv_name = cv.get('cv', 'CV sans nom')
+        prompt = self._build_must_have_prompt(cv, indispensables, job_description)
 
-        except json.JSONDecodeError as e:
-            print(f"⚠️ {cv_name}: Erreur parsing JSON - {str(e)}")
-            return False, f"Erreur parsing: {str(e)}", {"error": "json_decode", "raw": result_text if 'result_text' in locals() else ""}
+        try:
+            response = await self._get_async_openai_client().chat.completions.create(
+                model=self.llm_model,
+                messages=[
+                    {"role": "system", "content": "Tu es un expert RH. Tu réponds UNIQUEMENT en JSON valide conforme au schéma demandé."},
+                    {"role": "user", "content": prompt}
+                ],
+                response_format={"type": "json_object"},
+                seed=self.seed,  # Déterminisme: même seed = mêmes résultats
+                timeout=timeout_s
+            )
+            result_text = response.choices[0].message.content.strip()
+            return self._must_have_decision_from_response(cv_name, result_text)
 
         except Exception as e:
-            print(f"❌ {cv_name}: Erreur LLM - {str(e)}")
+            logger.warning("❌ %s: Erreur LLM - %s", cv_name, e)
             return False, f"Erreur LLM: {str(e)}", {"error": str(e)}
 
+    async def check_cvs_must_have_batch_async(
+        self,
+        cvs: List[Dict],
+        indispensables: List[str],
+        job_description: str,
+        timeout_s: int = 20
+    ) -> List[Tuple[bool, str, Dict]]:
+        """
+        Vérifie plusieurs CVs en un seul appel LLM (offre + critères envoyés une seule fois)
+
+        Returns:
+            Liste de tuples (accepted, rationale, raw_trace), un par CV, dans l'ordre de `cvs`
+        """
+        # Identifiants positionnels: deux CVs du lot peuvent porter le même nom de fichier,
+        # chaque décision doit revenir au CV à cette position
+        cv_ids = [f"cv_{i}" for i in range(1, len(cvs) + 1)]
+        labels = [cv.get('cv') or cv_id for cv, cv_id in zip(cvs, cv_ids)]
+
+        # Le bloc "CV À ANALYSER" contient tous les CVs du lot, indexés par identifiant
+        prompt = self._build_must_have_prompt(dict(zip(cv_ids, cvs)), indispensables, job_description)
+        prompt += f"""
+
+📦 MODE LOT: le bloc "CV À ANALYSER" contient {len(cvs)} CVs distincts, indexés par identifiant.
+Évalue CHAQUE CV indépendamment avec les règles ci-dessus et réponds avec:
+{{
+  "decisions": [
+    {{"cv_id": "identifiant du CV", ...même format que ci-dessus pour ce CV...}}
+  ]
+}}
+Identifiants attendus (un objet par identifiant): {json.dumps(cv_ids, ensure_ascii=False)}
+"""
+
+        response = await self._get_async_openai_client().chat.completions.create(
+            model=self.llm_model,
+            messages=[
+                {"role": "system", "content": "Tu es un expert RH. Tu réponds UNIQUEMENT en JSON valide conforme au schéma demandé."},
+                {"role": "user", "content": prompt}
+            ],
+            response_format={"type": "json_object"},
+            seed=self.seed,  # Déterminisme: même seed = mêmes résultats
+            timeout=timeout_s
+        )
+
+        result = json.loads(response.choices[0].message.content)
+        decisions_by_id = {
+            d.get("cv_id"): d for d in result.get("decisions", []) if isinstance(d, dict)
+        }
+
+        decisions = []
+        for cv_id, label in zip(cv_ids, labels):
+            decision = decisions_by_id.get(cv_id)
+            if decision is None:
+                # Rejet prudent (même politique que les erreurs LLM unitaires)
+                logger.warning("⚠️ %s: absent de la réponse LLM (lot)", label)
+                decisions.append((False, "Décision absente de la réponse LLM (lot)", {"error": "missing_decision"}))
+                continue
+            decisions.append(self._must_have_decision_from_result(label, decision))
+        return decisions
+
     def check_single_cv_must_have_legacy(
         self,
         cv: Dict,
@@ -775,7 +985,7 @@ Exemple 4 (compétence technique):
         if use_parallel:
             # Version parallèle
             try:
-                from must_have_parallel import filter_cvs_by_must_have_parallel_sync
+                from must_have_parallel import filter_cvs_by_must_have_parallel_sync, keyword_pre_filter
 
                 # Configuration: forcer 500 max concurrent sans timeout
                 concurrency = min(len(cvs), 500)
@@ -786,7 +996,10 @@ Exemple 4 (compétence technique):
 
                 accepted, rejected, traces = filter_cvs_by_must_have_parallel_sync(
                     cvs, indispensables, job_description,
-                    decide_fn=self.check_single_cv_must_have,
+                    decide_fn=self.check_single_cv_must_have_async,
+                    decide_batch_fn=self.check_cvs_must_have_batch_async,
+                    batch_size=self.config.get("llm", {}).get("must_have_batch_size", 1),
+                    pre_filter_fn=keyword_pre_filter if self.config.get("llm", {}).get("must_have_keyword_prefilter", False) else None,
                     concurrency=concurrency,
                     qps=qps,
                     timeout_s=timeout_s,
@@ -970,7 +1183,7 @@ Exemple 4 (compétence technique):
 
                 nice_have_map = find_nice_have_missing_parallel_sync(
                     cvs, nice_have_list, job_description,
-                    find_fn=self._find_nice_have_missing,
+                    find_fn=self._find_nice_have_missing_async,
                     concurrency=concurrency,
                     qps=qps,
                     timeout_s=timeout_s,
@@ -1256,7 +1469,7 @@ Consignes de cohérence
 
         # === ROUTING PROVIDER ===
         provider = self.scoring_config.get("reranking_provider", "openai").lower()
-        print(f"🔀 Provider reranking: {provider}")
+        logger.info("🔀 Provider reranking: %s", provider)
 
         try:
             if provider == "xai":
@@ -1347,7 +1560,8 @@ Consignes de cohérence
         )
 
         raw_content = response.choices[0].message.content
-        print(f"[DEBUG OpenAI] Réponse brute (premiers 500 chars): {raw_content[:500]}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[OpenAI] Réponse brute (premiers 500 chars): %s", raw_content[:500])
 
         result = self._safe_json_parse(raw_content)
 
@@ -1357,48 +1571,11 @@ Consignes de cohérence
 
         ranked_cvs_data = result.get("ranked_cvs", [])
 
-        # DEBUG: Log ce que le LLM retourne
-        print(f"[DEBUG OpenAI] Type ranked_cvs_data: {type(ranked_cvs_data)}")
-        print(f"[DEBUG OpenAI] Nombre d'items: {len(ranked_cvs_data)}")
-        print(f"[DEBUG OpenAI] Types des items: {[type(item) for item in ranked_cvs_data[:5]]}")
-
-        # FILTRER les items invalides (None, scalaires, non-dict)
-        ranked_cvs_valid = [cv for cv in ranked_cvs_data if isinstance(cv, dict)]
-        if len(ranked_cvs_valid) != len(ranked_cvs_data):
-            invalid_count = len(ranked_cvs_data) - len(ranked_cvs_valid)
-            print(f"⚠️ [OpenAI] {invalid_count} items invalides ignorés dans ranked_cvs")
-            print(f"   Items invalides: {[cv for cv in ranked_cvs_data if not isinstance(cv, dict)][:3]}")
-
-        if not ranked_cvs_valid:
-            raise ValueError(f"Aucun CV valide dans ranked_cvs (tous null/invalides). Total items: {len(ranked_cvs_data)}")
-
-        # Enrichir avec coefficient, evidences et flags
-        cv_map_by_name = {cv.get('cv'): cv for cv in cvs_to_rerank}
-        cv_summaries_by_name = {s['nom_fichier']: s for s in cv_summaries}
-
-        enriched_result = []
-        for reranked_cv in ranked_cvs_valid:  # ✅ Utiliser la liste filtrée
-            cv_name = reranked_cv.get("cv", "inconnu")
-            summary = cv_summaries_by_name.get(cv_name, {})
-            candidate_name = summary.get("candidate_name") or cv_name
-
-            # NORMALISER les valeurs null retournées par le LLM
-            evidences = reranked_cv.get("evidences") or []
-            evidence_map = reranked_cv.get("evidence_map") or {}
-            flags_raw = summary.get("flags_raw") or {}
+        logger.debug("[OpenAI] Nombre d'items: %d", len(ranked_cvs_data))
 
-            enriched_result.append({
-                "cv": cv_name,
-                "candidate_name": candidate_name,
-                "coefficient_qualite_experience": reranked_cv.get("coefficient_qualite_experience", 1.0),
-                "commentaire_scoring": reranked_cv.get("commentaire_scoring", ""),
-                "appreciation_globale": reranked_cv.get("appreciation_globale", ""),
-                "evidences": evidences,
-                "evidence_map": evidence_map,
-                "flags_raw": flags_raw
-            })
+        enriched_result = self._enrich_reranked(ranked_cvs_data, cv_summaries, "OpenAI")
 
-        print(f"✅ Re-ranking OpenAI: {len(enriched_result)} CVs retournés")
+        logger.info("✅ Re-ranking OpenAI: %d CVs retournés", len(enriched_result))
         return enriched_result
 
     def _call_xai_with_retry(self, payload):
@@ -1407,10 +1584,17 @@ Consignes de cohérence
         """
         XAI_BASE = "https://api.x.ai/v1"
 
+        # Sérialiser + compresser une seule fois (les prompts de rerank font des dizaines de Ko)
+        compressed_body = None
+        if self.compress_xai:
+            compressed_body = gzip.compress(
+                json.dumps(payload, ensure_ascii=False).encode("utf-8"), compresslevel=3
+            )
+
         @retry(
-            stop=stop_after_attempt(3),
+            stop=(stop_after_attempt(3) | stop_after_delay(30)),
             wait=wait_exponential(multiplier=1, min=2, max=10),
-            retry=retry_if_exception_type((requests.exceptions.RequestException, requests.exceptions.Timeout))
+            retry=retry_if_exception(_is_retryable_xai_error)
         )
         def _do_call():
             api_key = os.environ.get('XAI_API_KEY')
@@ -1422,13 +1606,28 @@ Consignes de cohérence
                 "Content-Type": "application/json"
             }
 
-            resp = requests.post(
-                f"{XAI_BASE}/chat/completions",
-                json=payload,
-                headers=headers,
-                timeout=90
-            )
-            resp.raise_for_status()
+            resp = None
+            if compressed_body is not None and self.compress_xai:
+                resp = requests.post(
+                    f"{XAI_BASE}/chat/completions",
+                    data=compressed_body,
+                    headers={**headers, "Content-Encoding": "gzip"},
+                    timeout=90
+                )
+                if resp.status_code == 415:
+                    # Compression refusée: repasser en JSON brut pour cet appel et les suivants
+                    logger.warning("⚠️ xAI refuse Content-Encoding gzip (415), envoi non compressé")
+                    self.compress_xai = False
+                    resp = None
+
+            if resp is None:
+                resp = requests.post(
+                    f"{XAI_BASE}/chat/completions",
+                    json=payload,
+                    headers=headers,
+                    timeout=90
+                )
+            resp.raise_for_status()  # HTTPError porte resp (status_code) pour le classifieur de retry
             return resp.json()
 
         return _do_call()
@@ -1440,7 +1639,7 @@ Consignes de cohérence
         XAI_MODEL = "grok-4-fast-reasoning"
 
         # Log du modèle utilisé
-        print(f"🤖 Modèle xAI utilisé: {XAI_MODEL}")
+        logger.info("🤖 Modèle xAI utilisé: %s", XAI_MODEL)
 
         # Construire le payload (format OpenAI-compatible)
         payload = {
@@ -1464,13 +1663,14 @@ Consignes de cohérence
             raise ValueError(f"Réponse xAI invalide: {response_json}")
 
         raw_content = response_json["choices"][0]["message"]["content"]
-        print(f"[DEBUG xAI] Réponse brute (premiers 500 chars): {raw_content[:500]}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[xAI] Réponse brute (premiers 500 chars): %s", raw_content[:500])
 
         result = self._safe_json_parse(raw_content)
 
         # Grok peut retourner soit un objet {"ranked_cvs": [...]}, soit directement un array [...]
         if isinstance(result, list):
-            print(f"[DEBUG xAI] Grok a retourné directement un array (non-standard)")
+            logger.debug("[xAI] Grok a retourné directement un array (non-standard)")
             ranked_cvs_data = result
         elif isinstance(result, dict) and "ranked_cvs" in result:
             ranked_cvs_data = result.get("ranked_cvs", [])
@@ -1480,29 +1680,29 @@ Consignes de cohérence
         if not ranked_cvs_data:
             raise ValueError(f"ranked_cvs est vide. Réponse complète: {result}")
 
-        # DEBUG: Log ce que le LLM retourne
-        print(f"[DEBUG xAI] Type ranked_cvs_data: {type(ranked_cvs_data)}")
-        print(f"[DEBUG xAI] Nombre d'items: {len(ranked_cvs_data)}")
-        print(f"[DEBUG xAI] Types des items: {[type(item) for item in ranked_cvs_data[:5]]}")
+        logger.debug("[xAI] Nombre d'items: %d", len(ranked_cvs_data))
 
-        # FILTRER les items invalides (None, scalaires, non-dict)
-        ranked_cvs_valid = [cv for cv in ranked_cvs_data if isinstance(cv, dict)]
-        if len(ranked_cvs_valid) != len(ranked_cvs_data):
-            invalid_count = len(ranked_cvs_data) - len(ranked_cvs_valid)
-            print(f"⚠️ [xAI] {invalid_count} items invalides ignorés dans ranked_cvs")
-            print(f"   Items invalides: {[cv for cv in ranked_cvs_data if not isinstance(cv, dict)][:3]}")
+        enriched_result = self._enrich_reranked(ranked_cvs_data, cv_summaries, "xAI")
 
-        if not ranked_cvs_valid:
-            raise ValueError(f"Aucun CV valide dans ranked_cvs (tous null/invalides). Total items: {len(ranked_cvs_data)}")
+        logger.info("✅ Re-ranking xAI (Grok): %d CVs retournés", len(enriched_result))
+        return enriched_result
 
-        # Enrichir (même logique que OpenAI)
-        cv_map_by_name = {cv.get('cv'): cv for cv in cvs_to_rerank}
-        cv_summaries_by_name = {s['nom_fichier']: s for s in cv_summaries}
+    def _enrich_reranked(self, ranked_cvs_data, cv_summaries, provider_label):
+        """
+        Filtre les items invalides et enrichit les CVs rerankés en une seule passe
+        """
+        get_summary = {s['nom_fichier']: s for s in cv_summaries}.get
 
         enriched_result = []
-        for reranked_cv in ranked_cvs_valid:  # ✅ Utiliser la liste filtrée
+        invalid_items = []
+        for reranked_cv in ranked_cvs_data:
+            # FILTRER les items invalides (None, scalaires, non-dict)
+            if not isinstance(reranked_cv, dict):
+                invalid_items.append(reranked_cv)
+                continue
+
             cv_name = reranked_cv.get("cv", "inconnu")
-            summary = cv_summaries_by_name.get(cv_name, {})
+            summary = get_summary(cv_name) or _EMPTY_SUMMARY
             candidate_name = summary.get("candidate_name") or cv_name
 
             # NORMALISER les valeurs null retournées par le LLM
@@ -1521,7 +1721,15 @@ Consignes de cohérence
                 "flags_raw": flags_raw
             })
 
-        print(f"✅ Re-ranking xAI (Grok): {len(enriched_result)} CVs retournés")
+        if invalid_items:
+            logger.warning(
+                "⚠️ [%s] %d items invalides ignorés dans ranked_cvs (ex: %r)",
+                provider_label, len(invalid_items), invalid_items[:3]
+            )
+
+        if not enriched_result:
+            raise ValueError(f"Aucun CV valide dans ranked_cvs (tous null/invalides). Total items: {len(ranked_cvs_data)}")
+
         return enriched_result
 
     def _normalize_reranked(self, result):
@@ -1581,7 +1789,7 @@ Consignes de cohérence
         # Fallback
         try:
             return json.loads(content)
-        except:
+        except (json.JSONDecodeError, ValueError):
             print(f"⚠️ Erreur parsing JSON: {content[:200]}")
             return []
 
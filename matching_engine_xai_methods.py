@@ -13,7 +13,7 @@ def _rerank_with_openai(self, cvs_to_rerank, cv_summaries, prompt, cv_names, pro
         cvs_to_rerank: CVs à reranker
         cv_summaries: Résumés des CVs préparés
         prompt: Prompt complet pour le LLM
-        cv_names: Noms de fichiers des CVs
+        cv_names: Noms de fichiers des CVs (frozenset)
         progress_callback: Callback de progression
 
     Returns:
@@ -38,24 +38,17 @@ def _rerank_with_openai(self, cvs_to_rerank, cv_summaries, prompt, cv_names, pro
 
         ranked_cvs_data = result.get("ranked_cvs", [])
 
-        # Valider les noms de fichiers
-        llm_cv_names = [cv.get("cv", "") for cv in ranked_cvs_data]
-        missing = set(cv_names) - set(llm_cv_names)
+        # Valider les noms de fichiers (cv_names est un frozenset précalculé)
+        missing = cv_names.difference(cv.get("cv", "") for cv in ranked_cvs_data)
         if missing:
             print(f"⚠️ CVs manquants dans réponse LLM: {missing}")
 
-        # Normaliser la réponse
-        normalized_result = self._normalize_reranked(result)
-
-        # Enrichir avec coefficient, evidences et flags
-        # (mapper par nom de fichier)
-        cv_map_by_name = {cv.get('cv'): cv for cv in cvs_to_rerank}
+        # Enrichir avec coefficient, evidences et flags (mapper par nom de fichier)
         cv_summaries_by_name = {s['nom_fichier']: s for s in cv_summaries}
 
         enriched_result = []
         for reranked_cv in ranked_cvs_data:
             cv_name = reranked_cv.get("cv", "inconnu")
-            original_cv = cv_map_by_name.get(cv_name, {})
             summary = cv_summaries_by_name.get(cv_name, {})
 
             # Extraire les nouveaux champs (evidences, evidence_map, coefficient)
@@ -71,7 +64,8 @@ def _rerank_with_openai(self, cvs_to_rerank, cv_summaries, prompt, cv_names, pro
                     commentaire_scoring=evidence_map_data.get("commentaire_scoring", []),
                     appreciation_globale=evidence_map_data.get("appreciation_globale", [])
                 ) if evidence_map_data else None
-            except:
+            except (ImportError, TypeError, AttributeError, ValueError):
+                # ValueError couvre pydantic.ValidationError (sous-classe en pydantic v2)
                 evidences_models = evidences
                 evidence_map = evidence_map_data
 
@@ -79,7 +73,12 @@ def _rerank_with_openai(self, cvs_to_rerank, cv_summaries, prompt, cv_names, pro
                 "cv": cv_name,
                 "coefficient_qualite_experience": coefficient,
                 "commentaire_scoring": reranked_cv.get("commentaire_scoring", ""),
-                "appreciation_globale": reranked_cv.get("appreciation_globale", ""),
+                # Champs legacy (commentaire/justification) repris de _normalize_reranked
+                "appreciation_globale": (
+                    reranked_cv.get("appreciation_globale")
+                    or reranked_cv.get("commentaire")
+                    or reranked_cv.get("justification", "")
+                ),
                 "evidences": evidences_models,
                 "evidence_map": evidence_map,
                 "flags_raw": summary.get("flags_raw")  # Flags détectés automatiquement
@@ -106,9 +105,9 @@ def _call_xai_with_retry(self, payload):
     XAI_BASE = "https://api.x.ai/v1"
 
     @retry(
-        stop=stop_after_attempt(3),
+        stop=(stop_after_attempt(3) | stop_after_delay(30)),
         wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type((requests.exceptions.RequestException, requests.exceptions.Timeout))
+        retry=retry_if_exception(_is_retryable_xai_error)  # 429/5xx/réseau uniquement
     )
     def _do_call():
         api_key = os.environ.get('XAI_API_KEY')
@@ -140,7 +139,7 @@ def _rerank_with_xai(self, cvs_to_rerank, cv_summaries, prompt, cv_names, progre
         cvs_to_rerank: CVs à reranker
         cv_summaries: Résumés des CVs préparés
         prompt: Prompt complet pour le LLM
-        cv_names: Noms de fichiers des CVs
+        cv_names: Noms de fichiers des CVs (frozenset)
         progress_callback: Callback de progression
 
     Returns:
@@ -178,23 +177,17 @@ def _rerank_with_xai(self, cvs_to_rerank, cv_summaries, prompt, cv_names, progre
 
         ranked_cvs_data = result.get("ranked_cvs", [])
 
-        # Valider les noms de fichiers
-        llm_cv_names = [cv.get("cv", "") for cv in ranked_cvs_data]
-        missing = set(cv_names) - set(llm_cv_names)
+        # Valider les noms de fichiers (cv_names est un frozenset précalculé)
+        missing = cv_names.difference(cv.get("cv", "") for cv in ranked_cvs_data)
         if missing:
             print(f"⚠️ CVs manquants dans réponse LLM: {missing}")
 
-        # Normaliser la réponse (même logique que OpenAI)
-        normalized_result = self._normalize_reranked(result)
-
         # Enrichir avec coefficient, evidences et flags
-        cv_map_by_name = {cv.get('cv'): cv for cv in cvs_to_rerank}
         cv_summaries_by_name = {s['nom_fichier']: s for s in cv_summaries}
 
         enriched_result = []
         for reranked_cv in ranked_cvs_data:
             cv_name = reranked_cv.get("cv", "inconnu")
-            original_cv = cv_map_by_name.get(cv_name, {})
             summary = cv_summaries_by_name.get(cv_name, {})
 
             # Extraire les nouveaux champs (evidences, evidence_map, coefficient)
@@ -210,7 +203,8 @@ def _rerank_with_xai(self, cvs_to_rerank, cv_summaries, prompt, cv_names, progre
                     commentaire_scoring=evidence_map_data.get("commentaire_scoring", []),
                     appreciation_globale=evidence_map_data.get("appreciation_globale", [])
                 ) if evidence_map_data else None
-            except:
+            except (ImportError, TypeError, AttributeError, ValueError):
+                # ValueError couvre pydantic.ValidationError (sous-classe en pydantic v2)
                 evidences_models = evidences
                 evidence_map = evidence_map_data
 
@@ -218,7 +212,12 @@ def _rerank_with_xai(self, cvs_to_rerank, cv_summaries, prompt, cv_names, progre
                 "cv": cv_name,
                 "coefficient_qualite_experience": coefficient,
                 "commentaire_scoring": reranked_cv.get("commentaire_scoring", ""),
-                "appreciation_globale": reranked_cv.get("appreciation_globale", ""),
+                # Champs legacy (commentaire/justification) repris de _normalize_reranked
+                "appreciation_globale": (
+                    reranked_cv.get("appreciation_globale")
+                    or reranked_cv.get("commentaire")
+                    or reranked_cv.get("justification", "")
+                ),
                 "evidences": evidences_models,
                 "evidence_map": evidence_map,
                 "flags_raw": summary.get("flags_raw")  # Flags détectés automatiquement
@@ -244,13 +243,16 @@ def _rerank_with_xai(self, cvs_to_rerank, cv_summaries, prompt, cv_names, progre
 
         print(f"🔀 Provider reranking: {provider}")
 
+        # Ensemble figé des noms attendus, construit une seule fois pour tous les appels
+        cv_names_set = frozenset(cv_names)
+
         try:
             if provider == "xai":
                 return self._rerank_with_xai(
                     cvs_to_rerank=cvs_to_rerank,
                     cv_summaries=cv_summaries,
                     prompt=prompt,
-                    cv_names=cv_names,
+                    cv_names=cv_names_set,
                     progress_callback=progress_callback
                 )
             else:  # default: openai
@@ -258,7 +260,7 @@ def _rerank_with_xai(self, cvs_to_rerank, cv_summaries, prompt, cv_names, progre
                     cvs_to_rerank=cvs_to_rerank,
                     cv_summaries=cv_summaries,
                     prompt=prompt,
-                    cv_names=cv_names,
+                    cv_names=cv_names_set,
                     progress_callback=progress_callback
                 )
 
@@ -5,9 +5,128 @@ Respecte les enterprise_id déjà assignés aux projets
 """
 
 import json
+import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Set, Tuple
+
+# Nombre de projets copiés en parallèle (travail essentiellement I/O)
+MAX_MIGRATION_WORKERS = 8
+
+
+def _tree_signature(root: Path, ignore: Set[str]) -> Dict[str, Tuple[int, int]]:
+    """
+    Signature d'une arborescence: chemin relatif → (taille, mtime_ns) pour chaque fichier
+    """
+    signature = {}
+    for dirpath, _dirnames, filenames in os.walk(root):
+        for filename in filenames:
+            file_path = os.path.join(dirpath, filename)
+            rel_path = os.path.relpath(file_path, root)
+            if rel_path in ignore:
+                continue
+            st = os.stat(file_path)
+            signature[rel_path] = (st.st_size, st.st_mtime_ns)
+    return signature
+
+
+def _dirs_equivalent(a: Path, b: Path, ignore: Set[str] = frozenset()) -> bool:
+    """
+    Vrai si les deux dossiers contiennent les mêmes fichiers (mêmes tailles et mtimes).
+    copytree (copy2) préserve les mtimes, donc une copie intacte est reconnue.
+    """
+    return _tree_signature(a, ignore) == _tree_signature(b, ignore)
+
+
+def _migrate_one(
+    project: Dict,
+    old_projects_folder: Path,
+    target_projects_folder: Path,
+    default_enterprise_id: Optional[str] = None
+) -> Tuple[bool, Optional[str]]:
+    """
+    Migre un projet (copie du dossier + mise à jour de projet.json si besoin)
+
+    Returns:
+        (succès, message d'erreur éventuel)
+    """
+    project_id = project['id']
+    old_project_dir = old_projects_folder / project_id
+    new_project_dir = target_projects_folder / project_id
+
+    if not old_project_dir.exists():
+        return False, f"Projet '{project_id}' introuvable dans projects/"
+
+    try:
+        # projet.json est réécrit après copie quand on force l'entreprise par défaut
+        rewritten = {"projet.json"} if default_enterprise_id else set()
+
+        if new_project_dir.exists() and _dirs_equivalent(old_project_dir, new_project_dir, rewritten):
+            # Copie déjà à jour (relance de migration): ne rien recopier
+            print(f"   ⏭  Le projet '{project_id}' est inchangé, copie ignorée")
+        else:
+            # Copier le dossier du projet (avec tous ses sous-dossiers: cvs, matchings, historique, etc.)
+            if new_project_dir.exists():
+                print(f"   ⚠️  Le projet '{project_id}' existe déjà, écrasement...")
+                shutil.rmtree(new_project_dir)
+
+            shutil.copytree(old_project_dir, new_project_dir)
+
+        if default_enterprise_id:
+            # Mettre à jour le projet pour ajouter enterprise_id
+            project['enterprise_id'] = default_enterprise_id
+
+            # Mettre à jour le fichier projet.json
+            projet_file = new_project_dir / "projet.json"
+            if projet_file.exists():
+                with open(projet_file, 'r', encoding='utf-8') as f:
+                    projet_data = json.load(f)
+                projet_data['enterprise_id'] = default_enterprise_id
+                with open(projet_file, 'w', encoding='utf-8') as f:
+                    json.dump(projet_data, f, ensure_ascii=False, indent=2)
+
+        print(f"   ✅ {project['nom']} ({project_id})")
+        return True, None
+
+    except Exception as e:
+        return False, f"Erreur lors de la migration de '{project_id}': {str(e)}"
+
+
+def _migrate_batch(
+    projects: List[Dict],
+    old_projects_folder: Path,
+    target_projects_folder: Path,
+    target_index: Dict,
+    default_enterprise_id: Optional[str] = None
+) -> Tuple[int, List[str]]:
+    """
+    Migre un lot de projets en parallèle puis met à jour l'index (séquentiellement)
+
+    Returns:
+        (nombre de projets migrés, liste des erreurs)
+    """
+    with ThreadPoolExecutor(max_workers=MAX_MIGRATION_WORKERS) as executor:
+        outcomes = list(executor.map(
+            lambda project: _migrate_one(project, old_projects_folder, target_projects_folder, default_enterprise_id),
+            projects
+        ))
+
+    migrated_count = 0
+    errors = []
+    existing_ids = {p['id'] for p in target_index['projects']}
+    for project, (ok, error) in zip(projects, outcomes):
+        if not ok:
+            errors.append(error)
+            continue
+
+        # Ajouter à l'index si pas déjà présent
+        if project['id'] not in existing_ids:
+            target_index['projects'].append(project)
+            existing_ids.add(project['id'])
+        migrated_count += 1
+
+    return migrated_count, errors
 
 
 def migrate_projects_to_enterprises():
@@ -96,32 +215,11 @@ def migrate_projects_to_enterprises():
         else:
             target_index = {"projects": []}
 
-        for project in enterprise_projects:
-            project_id = project['id']
-            old_project_dir = old_projects_folder / project_id
-            new_project_dir = target_projects_folder / project_id
-
-            if not old_project_dir.exists():
-                errors.append(f"Projet '{project_id}' introuvable dans projects/")
-                continue
-
-            try:
-                # Copier le dossier du projet (avec tous ses sous-dossiers: cvs, matchings, historique, etc.)
-                if new_project_dir.exists():
-                    print(f"   ⚠️  Le projet '{project_id}' existe déjà, écrasement...")
-                    shutil.rmtree(new_project_dir)
-
-                shutil.copytree(old_project_dir, new_project_dir)
-
-                # Ajouter à l'index si pas déjà présent
-                if not any(p['id'] == project_id for p in target_index['projects']):
-                    target_index['projects'].append(project)
-
-                print(f"   ✅ {project['nom']} ({project_id})")
-                migrated_count += 1
-
-            except Exception as e:
-                errors.append(f"Erreur lors de la migration de '{project_id}': {str(e)}")
+        batch_count, batch_errors = _migrate_batch(
+            enterprise_projects, old_projects_folder, target_projects_folder, target_index
+        )
+        migrated_count += batch_count
+        errors.extend(batch_errors)
 
         # Sauvegarder l'index de l'entreprise
         with open(target_index_file, 'w', encoding='utf-8') as f:
@@ -149,43 +247,12 @@ def migrate_projects_to_enterprises():
         else:
             target_index = {"projects": []}
 
-        for project in projects_without_enterprise:
-            project_id = project['id']
-            old_project_dir = old_projects_folder / project_id
-            new_project_dir = target_projects_folder / project_id
-
-            if not old_project_dir.exists():
-                errors.append(f"Projet '{project_id}' introuvable dans projects/")
-                continue
-
-            try:
-                if new_project_dir.exists():
-                    print(f"   ⚠️  Le projet '{project_id}' existe déjà, écrasement...")
-                    shutil.rmtree(new_project_dir)
-
-                shutil.copytree(old_project_dir, new_project_dir)
-
-                # Mettre à jour le projet pour ajouter enterprise_id
-                project['enterprise_id'] = default_enterprise_id
-
-                # Mettre à jour le fichier projet.json
-                projet_file = new_project_dir / "projet.json"
-                if projet_file.exists():
-                    with open(projet_file, 'r', encoding='utf-8') as f:
-                        projet_data = json.load(f)
-                    projet_data['enterprise_id'] = default_enterprise_id
-                    with open(projet_file, 'w', encoding='utf-8') as f:
-                        json.dump(projet_data, f, ensure_ascii=False, indent=2)
-
-                # Ajouter à l'index
-                if not any(p['id'] == project_id for p in target_index['projects']):
-                    target_index['projects'].append(project)
-
-                print(f"   ✅ {project['nom']} ({project_id})")
-                migrated_count += 1
-
-            except Exception as e:
-                errors.append(f"Erreur lors de la migration de '{project_id}': {str(e)}")
+        batch_count, batch_errors = _migrate_batch(
+            projects_without_enterprise, old_projects_folder, target_projects_folder, target_index,
+            default_enterprise_id=default_enterprise_id
+        )
+        migrated_count += batch_count
+        errors.extend(batch_errors)
 
         # Sauvegarder l'index
         with open(target_index_file, 'w', encoding='utf-8') as f:
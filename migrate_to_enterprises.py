@@ -3,13 +3,45 @@
 Script de migration: ancienne structure (projets seuls) → nouvelle structure (entreprises > projets)
 """
 
+import os
 import json
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from enterprise_manager import EnterpriseManager
 from project_manager import ProjectManager
 
 
+# Fichiers réécrits sur place par l'application: copiés (un lien physique modifierait aussi l'ancien dossier)
+MUTABLE_SUFFIXES = frozenset({".json"})
+
+# Projets migrés en parallèle (recouvre la latence des appels système, surtout sur SSD)
+MAX_MIGRATION_WORKERS = min(32, (os.cpu_count() or 4) * 4)
+
+
+def _link_or_copy_tree(src_root: Path, dst_root: Path):
+    """
+    Reproduit src_root dans dst_root par liens physiques (aucun octet dupliqué, O(métadonnées)).
+    Les fichiers mutables sont copiés; copie aussi en repli si le lien est impossible
+    (autre volume, système de fichiers sans liens, Windows FAT...).
+    """
+    for dirpath, _dirnames, filenames in os.walk(src_root):
+        src_dir = Path(dirpath)
+        dst_dir = dst_root / src_dir.relative_to(src_root)
+        dst_dir.mkdir(parents=True, exist_ok=True)
+        for name in filenames:
+            src, dst = src_dir / name, dst_dir / name
+            if src.suffix.lower() not in MUTABLE_SUFFIXES:
+                if dst.exists():
+                    dst.unlink()  # Équivalent de dirs_exist_ok: la source remplace la cible
+                try:
+                    os.link(src, dst)
+                    continue
+                except OSError:
+                    pass
+            shutil.copy2(src, dst)
+
+
 def migrate_old_projects_to_enterprises():
     """
     Migre les anciens projets vers la nouvelle structure avec entreprises
@@ -56,23 +88,27 @@ def migrate_old_projects_to_enterprises():
     # Récupérer le dossier projects de cette entreprise
     new_projects_folder = em.get_projects_folder(enterprise['id'])
 
-    # Copier chaque projet
-    migrated_count = 0
-    for old_project in old_projects:
+    def migrate_one(old_project):
         project_id = old_project['id']
         old_project_dir = old_projects_folder / project_id
-        new_project_dir = new_projects_folder / project_id
+        if not old_project_dir.exists():
+            return False
+        # Reproduire le dossier complet du projet (liens physiques, JSON copiés)
+        _link_or_copy_tree(old_project_dir, new_projects_folder / project_id)
+        return True
 
-        if old_project_dir.exists():
-            # Copier le dossier complet du projet
-            shutil.copytree(old_project_dir, new_project_dir, dirs_exist_ok=True)
-            print(f"  Migré: {old_project['nom']}")
-            migrated_count += 1
+    # Migrer les projets en parallèle (résultats dans l'ordre de l'index)
+    migrated_count = 0
+    with ThreadPoolExecutor(max_workers=MAX_MIGRATION_WORKERS) as executor:
+        for old_project, migrated in zip(old_projects, executor.map(migrate_one, old_projects)):
+            if migrated:
+                print(f"  Migré: {old_project['nom']}")
+                migrated_count += 1
 
     # Mettre à jour l'index des projets dans la nouvelle structure
     new_index_file = new_projects_folder / "_index.json"
-    with open(new_index_file, 'w', encoding='utf-8') as f:
-        json.dump(old_index, f, ensure_ascii=False, indent=2)
+    # Sérialisé en une fois puis écrit d'un bloc (json.dump écrit fragment par fragment)
+    new_index_file.write_text(json.dumps(old_index, ensure_ascii=False, indent=2), encoding='utf-8')
 
     # Mettre à jour le compteur de projets de l'entreprise
     em.update_projects_count(enterprise['id'])
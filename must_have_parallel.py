@@ -1,169 +1,132 @@
 """
 Module de filtrage must-have parallélisé
-- Parallélisation avec asyncio + ThreadPoolExecutor pour vraie parallélisation API
+- Parallélisation asyncio native (fonction LLM async, pas de pool de threads)
 - Rate limiting (QPS)
 - Timeout et retries
 - Compatible avec le format existant
 """
 
-import asyncio
-import time
-import random
 import json
-import functools
-from typing import Dict, List, Tuple, Any, Optional, Callable
-from concurrent.futures import ThreadPoolExecutor
+import logging
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Tuple, Any, Optional, Callable, Awaitable, Union
+
+from retry_runner import (
+    TokenBucket,
+    RetryExhausted,
+    call_with_retry,
+    stream_results,
+    clean_criteria,
+    cv_identifiers,
+    get_peak_inflight,
+    reset_inflight_tracking,
+    run_sync,
+)
+
+logger = logging.getLogger(__name__)
 
 # Configuration par défaut
-DEFAULT_CONCURRENCY = 500    # CVs traités en parallèle (max threads)
+DEFAULT_CONCURRENCY = 500    # CVs traités en parallèle (appels en vol)
 DEFAULT_QPS = 100.0          # Requêtes/seconde max (limite OpenAI)
 DEFAULT_TIMEOUT_S = 20       # Timeout par appel LLM
 DEFAULT_RETRIES = 2          # Nombre de retries
 DEFAULT_BACKOFF_S = 1.0      # Backoff initial (exponentiel)
+MAX_TRACE_RAW_CHARS = 2048   # Taille max de la réponse LLM brute conservée dans une trace
+TRACES_BUFFER_BYTES = 1 << 20  # Tampon d'écriture du JSONL des traces (moins d'appels système)
 
 
-# ==================== TRACKING PARALLÉLISATION ====================
+@lru_cache(maxsize=256)
+def _keyword_pattern(must_have: str) -> re.Pattern:
+    """Regex mot entier, insensible à la casse, pour un critère (compilée une seule fois)"""
+    return re.compile(r"(?<!\w)" + re.escape(must_have.strip()) + r"(?!\w)", re.IGNORECASE)
 
-# Métriques pour prouver la vraie parallélisation
-_inflight_api_calls = 0
-_peak_inflight = 0
-_inflight_lock = None  # Créé à la demande (lazy init)
 
-
-def _get_inflight_lock():
-    """Retourne le lock (lazy initialization pour éviter RuntimeError)"""
-    global _inflight_lock
-    if _inflight_lock is None:
-        _inflight_lock = asyncio.Lock()
-    return _inflight_lock
-
-
-async def _track_inflight_start():
-    """Incrémente le compteur d'appels API en vol"""
-    global _inflight_api_calls, _peak_inflight
-    lock = _get_inflight_lock()
-    async with lock:
-        _inflight_api_calls += 1
-        if _inflight_api_calls > _peak_inflight:
-            _peak_inflight = _inflight_api_calls
-
-
-async def _track_inflight_end():
-    """Décrémente le compteur d'appels API en vol"""
-    global _inflight_api_calls
-    lock = _get_inflight_lock()
-    async with lock:
-        _inflight_api_calls -= 1
-
-
-def get_peak_inflight() -> int:
-    """Retourne le pic d'appels API simultanés"""
-    return _peak_inflight
-
-
-def reset_inflight_tracking():
-    """Reset les métriques de tracking"""
-    global _inflight_api_calls, _peak_inflight
-    _inflight_api_calls = 0
-    _peak_inflight = 0
-
-
-def _is_empty(xs: Optional[List[str]]) -> bool:
-    """Vérifie si une liste est vide ou ne contient que des chaînes vides"""
-    return not xs or all((not s) or (not s.strip()) for s in xs)
-
-
-class RateLimiter:
-    """Rate limiter simple basé sur QPS (requêtes/seconde)"""
-
-    def __init__(self, qps: float):
-        self.min_interval = 1.0 / max(qps, 0.01)
-        self._lock = asyncio.Lock()
-        self._last = 0.0
-
-    async def acquire(self):
-        """Attend si nécessaire pour respecter le QPS"""
-        async with self._lock:
-            now = time.perf_counter()
-            wait = self.min_interval - (now - self._last)
-            if wait > 0:
-                await asyncio.sleep(wait)
-            self._last = time.perf_counter()
-
-
-async def _run_one(
-    cv: Dict[str, Any],
-    must_haves: List[str],
-    job_description: str,
+def keyword_pre_filter(cv: Dict[str,Any], must_haves: List[str], job_description: str) -> Optional[Tuple[bool, str]]:
+    """
+    Pré-filtre sans LLM: accepte le CV si chaque critère apparaît tel quel dans le CV.
+    Retourne None (cas ambigu → LLM) dès qu'un critère est introuvable: une absence
+    littérale ne prouve rien (synonymes, reformulations), on ne rejette donc jamais ici.
+    """
+    criteria = [mh for mh in must_haves if mh and mh.strip()]
+    if not criteria:
+        return None
+    text = json.dumps(cv, ensure_ascii=False, default=str)
+    if all(_keyword_pattern(mh).search(text) for mh in criteria):
+        return True, "[PRÉ-FILTRE] Tous les critères indispensables figurent dans le CV"
+    return None
+
+
+def _truncate_raw(raw: Any) -> Any:
+    """Borne la réponse LLM brute stockée dans les traces (évite de garder des complétions entières)"""
+    if isinstance(raw, str):
+        text = raw
+    else:
+        text = json.dumps(raw, ensure_ascii=False, default=str)
+        if len(text) <= MAX_TRACE_RAW_CHARS:
+            return raw
+    return text if len(text) <= MAX_TRACE_RAW_CHARS else text[:MAX_TRACE_RAW_CHARS] + "…[tronqué]"
+
+
+def _single_as_batch(
+    decide_fn: Callable[[Dict[str,Any], List[str], str, int], Awaitable[Tuple[bool, str, Any]]]
+) -> Callable[[List[Dict[str,Any]], List[str], str, int], Awaitable[List[Tuple[bool, str, Any]]]]:
+    """Adapte une fonction de décision unitaire au format lot (lot d'un seul CV)"""
+    async def decide_batch(cvs_batch, must_haves, job_description, timeout_s):
+        return [await decide_fn(cvs_batch[0], must_haves, job_description, timeout_s)]
+    return decide_batch
+
+
+async def _run_batch(
+    cvs_batch: List[Dict[str, Any]],
     *,
-    decide_fn: Callable[[Dict[str,Any], List[str], str, int], Tuple[bool, str, Any]],
+    decide: Callable[[List[Dict[str,Any]]], Awaitable[List[Tuple[bool, str, Any]]]],
     timeout_s: int,
     retries: int,
     backoff_s: float,
-    limiter: RateLimiter,
-    executor: ThreadPoolExecutor,
-) -> Tuple[Dict[str,Any], bool, str, Any]:
+    limiter: TokenBucket,
+) -> List[Tuple[Dict[str,Any], bool, str, Any]]:
     """
-    Appelle la fonction de décision avec protection QPS/timeout/retries + vraie parallélisation
+    Appelle la fonction de décision sur un lot de CVs avec protection QPS/timeout/retries
 
     Args:
-        cv: CV à analyser
-        must_haves: Liste des critères indispensables
-        job_description: Description de l'offre
-        decide_fn: Fonction de décision (prompt + LLM + parsing)
+        cvs_batch: CVs à analyser (un seul appel LLM pour tout le lot)
+        decide: Décision par lot, critères et offre déjà liés (une décision par CV, dans l'ordre)
         timeout_s: Timeout en secondes
         retries: Nombre de tentatives
         backoff_s: Backoff initial
-        limiter: Rate limiter
-        executor: ThreadPoolExecutor pour vraie parallélisation
+        limiter: Rate limiter (token-bucket)
 
     Returns:
-        Tuple (cv, accepted, rationale, raw_trace)
+        Liste de tuples (cv, accepted, rationale, raw_trace), un par CV du lot
     """
-    delay = backoff_s
-    last_err = None
-    loop = asyncio.get_running_loop()
-
-    for attempt in range(retries + 1):
-        try:
-            # Respecter le rate limit
-            await limiter.acquire()
+    cv_names = ", ".join(cv.get('cv', 'inconnu') for cv in cvs_batch)
 
-            # TRACKING: Marquer début appel API
-            await _track_inflight_start()
+    async def attempt():
+        decisions = await decide(cvs_batch)
+        if len(decisions) != len(cvs_batch):
+            raise ValueError(f"{len(decisions)} décisions reçues pour {len(cvs_batch)} CVs")
+        return decisions
 
-            # Appel avec timeout + vraie parallélisation
-            decide_partial = functools.partial(decide_fn, cv, must_haves, job_description, timeout_s)
-            accepted, rationale, raw = await asyncio.wait_for(
-                loop.run_in_executor(executor, decide_partial),
-                timeout=timeout_s + 5,  # Garde-fou externe
-            )
-
-            # TRACKING: Marquer fin appel API
-            await _track_inflight_end()
-
-            return cv, accepted, rationale, raw
-
-        except asyncio.TimeoutError as e:
-            await _track_inflight_end()
-            last_err = f"Timeout après {timeout_s}s (tentative {attempt + 1}/{retries + 1})"
-            print(f"⚠️ {last_err} - CV: {cv.get('cv', 'inconnu')}")
-
-        except Exception as e:
-            await _track_inflight_end()
-            last_err = str(e)
-            print(f"⚠️ Erreur tentative {attempt + 1}/{retries + 1}: {last_err} - CV: {cv.get('cv', 'inconnu')}")
-
-        # Backoff exponentiel avec jitter
-        if attempt < retries:
-            jitter = random.uniform(0, delay / 4)
-            await asyncio.sleep(delay + jitter)
-            delay *= 2
+    try:
+        decisions = await call_with_retry(
+            attempt,
+            retries=retries,
+            backoff_s=backoff_s,
+            timeout_s=timeout_s,
+            limiter=limiter,
+            label=cv_names,
+        )
+    except RetryExhausted as e:
+        # Échec après toutes les tentatives: rejet prudent
+        logger.warning(f"❌ CV {cv_names} ÉLIMINÉ après {e.attempts} tentative(s): {e.last_err}")
+        return [
+            (cv, False, f"[ERREUR après {e.attempts} tentative(s)] {e.last_err}", {"error": str(e.last_err)})
+            for cv in cvs_batch
+        ]
 
-    # Échec après toutes les tentatives: rejet prudent
-    cv_name = cv.get('cv', 'inconnu')
-    print(f"❌ CV {cv_name} ÉLIMINÉ après {retries + 1} tentatives: {last_err}")
-    return cv, False, f"[ERREUR après {retries + 1} tentatives] {last_err}", {"error": str(last_err)}
+    return [(cv, accepted, rationale, raw) for cv, (accepted, rationale, raw) in zip(cvs_batch, decisions)]
 
 
 async def filter_cvs_by_must_have_parallel(
@@ -171,14 +134,18 @@ async def filter_cvs_by_must_have_parallel(
     must_haves: List[str],
     job_description: str,
     *,
-    decide_fn: Callable[[Dict[str,Any], List[str], str, int], Tuple[bool, str, Any]],
+    decide_fn: Callable[[Dict[str,Any], List[str], str, int], Awaitable[Tuple[bool, str, Any]]],
     concurrency: int = DEFAULT_CONCURRENCY,
     qps: float = DEFAULT_QPS,
     timeout_s: int = DEFAULT_TIMEOUT_S,
     retries: int = DEFAULT_RETRIES,
     backoff_s: float = DEFAULT_BACKOFF_S,
     progress_callback: Optional[Callable[[int, int], None]] = None,
-) -> Tuple[List[Dict[str,Any]], List[Dict[str,Any]], Dict[str, Dict[str, Any]]]:
+    batch_size: int = 1,
+    decide_batch_fn: Optional[Callable[[List[Dict[str,Any]], List[str], str, int], Awaitable[List[Tuple[bool, str, Any]]]]] = None,
+    pre_filter_fn: Optional[Callable[[Dict[str,Any], List[str], str], Optional[Tuple[bool, str]]]] = None,
+    traces_path: Optional[Path] = None,
+) -> Tuple[List[Dict[str,Any]], List[Dict[str,Any]], Union[Dict[str, Dict[str, Any]], Path]]:
     """
     Filtre les CVs en parallèle selon les must-have avec vraie parallélisation API
 
@@ -186,84 +153,122 @@ async def filter_cvs_by_must_have_parallel(
         cvs: Liste des CVs à filtrer
         must_haves: Liste des critères indispensables
         job_description: Description de l'offre
-        decide_fn: Fonction de décision (prompt + LLM + parsing)
+        decide_fn: Fonction async de décision (prompt + LLM + parsing)
         concurrency: Nombre de CVs traités en parallèle
         qps: Requêtes par seconde max
         timeout_s: Timeout par appel
         retries: Nombre de retries
         backoff_s: Backoff initial
         progress_callback: Callback(current, total) pour suivre la progression
+        batch_size: Nombre de CVs par appel LLM (> 1 exige decide_batch_fn)
+        decide_batch_fn: Fonction async de décision par lot (amortit offre + critères sur le lot)
+        pre_filter_fn: Décision sans LLM (accepted, rationale), ou None si ambigu (ex: keyword_pre_filter)
+        traces_path: Fichier JSONL où écrire les traces au fil de l'eau (au lieu de les garder en mémoire)
 
     Returns:
-        Tuple (accepted_list, rejected_list, traces_dict)
+        Tuple (accepted_list, rejected_list, traces_dict), ou traces_path à la place du dict si fourni
     """
+    # Critères nettoyés une fois, réutilisés tels quels pour chaque CV / lot
+    must_haves = clean_criteria(must_haves)
+
     # Si pas de must-haves, accepter tous les CVs
-    if _is_empty(must_haves):
-        print("ℹ️ Aucun must-have défini → tous les CVs acceptés")
+    if not must_haves:
+        logger.info("ℹ️ Aucun must-have défini → tous les CVs acceptés")
+        if traces_path is not None:
+            Path(traces_path).write_text("", encoding="utf-8")
+            return list(cvs), [], Path(traces_path)
         return list(cvs), [], {}
 
+    if batch_size > 1 and decide_batch_fn is None:
+        raise ValueError("batch_size > 1 nécessite decide_batch_fn")
+    if batch_size <= 1:
+        batch_size = 1
+        decide_batch_fn = _single_as_batch(decide_fn)
+
     # Reset tracking avant le filtrage
     reset_inflight_tracking()
 
-    print(f"\n🔄 Filtrage parallèle: {len(cvs)} CVs, concurrence={concurrency}, QPS={qps}")
-
-    # ThreadPoolExecutor dimensionné selon la concurrence
-    max_workers = max(4, min(concurrency, 128))
+    logger.info(f"🔄 Filtrage parallèle: {len(cvs)} CVs, concurrence={concurrency}, QPS={qps}, lots de {batch_size}")
 
-    limiter = RateLimiter(qps)
-    sem = asyncio.Semaphore(max(1, concurrency))
+    limiter = TokenBucket(rate=qps, capacity=qps)  # Rafales d'une seconde autorisées
 
-    async def one(cv):
-        async with sem:
-            return await _run_one(
-                cv, must_haves, job_description,
-                decide_fn=decide_fn,
-                timeout_s=timeout_s,
-                retries=retries,
-                backoff_s=backoff_s,
-                limiter=limiter,
-                executor=executor
-            )
+    # Critères, offre et timeout sont invariants: liés une seule fois pour tous les CVs
+    def decide(cvs_batch):
+        return decide_batch_fn(cvs_batch, must_haves, job_description, timeout_s)
 
-    # Créer le ThreadPoolExecutor
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Lancer toutes les tâches
-        tasks = [asyncio.create_task(one(cv)) for cv in cvs]
+    def call(cvs_batch):
+        return _run_batch(
+            cvs_batch,
+            decide=decide,
+            timeout_s=timeout_s,
+            retries=retries,
+            backoff_s=backoff_s,
+            limiter=limiter
+        )
 
-        accepted, rejected, traces = [], [], {}
-        completed = 0
-        total = len(tasks)
+    accepted, rejected, traces = [], [], {}
+    completed = 0
+    total = len(cvs)
+    cv_ids = cv_identifiers(cvs)
+    log_every = max(1, total // 100)
+    traces_file = open(traces_path, "w", encoding="utf-8", buffering=TRACES_BUFFER_BYTES) if traces_path is not None else None
+
+    def record(cv, ok, rationale, raw):
+        nonlocal completed
+        completed += 1
+
+        # Mise à jour de la progression
+        if progress_callback:
+            progress_callback(completed, total)
+
+        cv_id = cv_ids[id(cv)]
+
+        # Stocker la trace (sur disque si traces_path: mémoire en O(concurrence))
+        trace = {
+            "accepted": ok,
+            "rationale": rationale,
+            "raw": _truncate_raw(raw)
+        }
+        if traces_file is not None:
+            traces_file.write(json.dumps({"cv_id": cv_id, **trace}, ensure_ascii=False, default=str) + "\n")
+        else:
+            traces[cv_id] = trace
+
+        # Classifier
+        (accepted if ok else rejected).append(cv)
+
+        # Log échantillonné (~100 lignes par run): la progression fine passe par progress_callback
+        if completed % log_every == 0 or completed == total:
+            status = "✅ ACCEPTÉ" if ok else "❌ ÉLIMINÉ"
+            logger.info(f"  [{completed}/{total}] {status} - {cv_id}")
+
+    try:
+        # Pré-filtre: les cas évidents ne coûtent aucun appel LLM
+        to_llm = cvs
+        if pre_filter_fn is not None:
+            to_llm = []
+            for cv in cvs:
+                decision = pre_filter_fn(cv, must_haves, job_description)
+                if decision is None:
+                    to_llm.append(cv)
+                else:
+                    record(cv, decision[0], decision[1], {"pre_filter": True})
+            if completed:
+                logger.info(f"⚡ Pré-filtre: {completed} CV(s) décidé(s) sans LLM, {len(to_llm)} envoyé(s) au LLM")
 
         # Traiter les résultats au fur et à mesure
-        for fut in asyncio.as_completed(tasks):
-            cv, ok, rationale, raw = await fut
-            completed += 1
-
-            # Mise à jour de la progression
-            if progress_callback:
-                progress_callback(completed, total)
-
-            # Identifier le CV
-            cv_id = cv.get("cv") or cv.get("id") or cv.get("filename") or cv.get("nom") or f"cv_{len(traces)+1}"
-
-            # Stocker la trace
-            traces[cv_id] = {
-                "accepted": ok,
-                "rationale": rationale,
-                "raw": raw
-            }
-
-            # Classifier
-            (accepted if ok else rejected).append(cv)
-
-            # Log en temps réel
-            status = "✅ ACCEPTÉ" if ok else "❌ ÉLIMINÉ"
-            print(f"  [{completed}/{total}] {status} - {cv_id}")
+        async for cv, ok, rationale, raw in stream_results(to_llm, call, concurrency, batch_size):
+            record(cv, ok, rationale, raw)
+    finally:
+        if traces_file is not None:
+            traces_file.close()
 
     peak = get_peak_inflight()
-    print(f"\n📊 Résultat: {len(accepted)} acceptés, {len(rejected)} éliminés")
-    print(f"⚡ Pic d'appels API simultanés: {peak}")
+    logger.info(f"📊 Résultat: {len(accepted)} acceptés, {len(rejected)} éliminés")
+    logger.info(f"⚡ Pic d'appels API simultanés: {peak}")
 
+    if traces_path is not None:
+        return accepted, rejected, Path(traces_path)
     return accepted, rejected, traces
 
 
@@ -273,16 +278,20 @@ def filter_cvs_by_must_have_parallel_sync(
     must_haves: List[str],
     job_description: str,
     *,
-    decide_fn: Callable[[Dict[str,Any], List[str], str, int], Tuple[bool, str, Any]],
+    decide_fn: Callable[[Dict[str,Any], List[str], str, int], Awaitable[Tuple[bool, str, Any]]],
     concurrency: int = DEFAULT_CONCURRENCY,
     qps: float = DEFAULT_QPS,
     timeout_s: int = DEFAULT_TIMEOUT_S,
     retries: int = DEFAULT_RETRIES,
     backoff_s: float = DEFAULT_BACKOFF_S,
     progress_callback: Optional[Callable[[int, int], None]] = None,
-) -> Tuple[List[Dict[str,Any]], List[Dict[str,Any]], Dict[str, Dict[str, Any]]]:
+    batch_size: int = 1,
+    decide_batch_fn: Optional[Callable[[List[Dict[str,Any]], List[str], str, int], Awaitable[List[Tuple[bool, str, Any]]]]] = None,
+    pre_filter_fn: Optional[Callable[[Dict[str,Any], List[str], str], Optional[Tuple[bool, str]]]] = None,
+    traces_path: Optional[Path] = None,
+) -> Tuple[List[Dict[str,Any]], List[Dict[str,Any]], Union[Dict[str, Dict[str, Any]], Path]]:
     """Version synchrone pour compatibilité avec Streamlit"""
-    return asyncio.run(
+    return run_sync(
         filter_cvs_by_must_have_parallel(
             cvs, must_haves, job_description,
             decide_fn=decide_fn,
@@ -291,6 +300,10 @@ def filter_cvs_by_must_have_parallel_sync(
             timeout_s=timeout_s,
             retries=retries,
             backoff_s=backoff_s,
-            progress_callback=progress_callback
+            progress_callback=progress_callback,
+            batch_size=batch_size,
+            decide_batch_fn=decide_batch_fn,
+            pre_filter_fn=pre_filter_fn,
+            traces_path=traces_path
         )
     )
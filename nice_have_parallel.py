@@ -1,163 +1,78 @@
 """
 Module de détection nice-have parallélisé
-- Parallélisation avec asyncio + ThreadPoolExecutor pour vraie parallélisation API
+- Parallélisation asyncio native (fonction LLM async, pas de pool de threads)
 - Rate limiting (QPS)
 - Timeout et retries
 - Compatible avec le format existant
 """
 
-import asyncio
-import time
-import random
-import functools
-from typing import Dict, List, Any, Optional, Callable
-from concurrent.futures import ThreadPoolExecutor
+import logging
+from typing import Dict, List, Any, Optional, Callable, Awaitable
+
+from retry_runner import (
+    TokenBucket,
+    RetryExhausted,
+    call_with_retry,
+    stream_results,
+    clean_criteria,
+    cv_identifier,
+    cv_identifiers,
+    get_peak_inflight,
+    reset_inflight_tracking,
+    run_sync,
+)
+
+logger = logging.getLogger(__name__)
 
 # Configuration par défaut
-DEFAULT_CONCURRENCY = 500      # CVs traités en parallèle (max threads)
+DEFAULT_CONCURRENCY = 500      # CVs traités en parallèle (appels en vol)
 DEFAULT_QPS = 100.0            # Requêtes/seconde max (limite OpenAI)
 DEFAULT_TIMEOUT_S = 20         # Timeout par appel LLM
 DEFAULT_RETRIES = 2            # Nombre de retries
 DEFAULT_BACKOFF_S = 1.0        # Backoff initial (exponentiel)
 
 
-# ==================== TRACKING PARALLÉLISATION ====================
-
-# Métriques pour prouver la vraie parallélisation
-_inflight_api_calls = 0
-_peak_inflight = 0
-_inflight_lock = None  # Créé à la demande (lazy init)
-
-
-def _get_inflight_lock():
-    """Retourne le lock (lazy initialization pour éviter RuntimeError)"""
-    global _inflight_lock
-    if _inflight_lock is None:
-        _inflight_lock = asyncio.Lock()
-    return _inflight_lock
-
-
-async def _track_inflight_start():
-    """Incrémente le compteur d'appels API en vol"""
-    global _inflight_api_calls, _peak_inflight
-    lock = _get_inflight_lock()
-    async with lock:
-        _inflight_api_calls += 1
-        if _inflight_api_calls > _peak_inflight:
-            _peak_inflight = _inflight_api_calls
-
-
-async def _track_inflight_end():
-    """Décrémente le compteur d'appels API en vol"""
-    global _inflight_api_calls
-    lock = _get_inflight_lock()
-    async with lock:
-        _inflight_api_calls -= 1
-
-
-def get_peak_inflight() -> int:
-    """Retourne le pic d'appels API simultanés"""
-    return _peak_inflight
-
-
-def reset_inflight_tracking():
-    """Reset les métriques de tracking"""
-    global _inflight_api_calls, _peak_inflight
-    _inflight_api_calls = 0
-    _peak_inflight = 0
-
-
-class RateLimiter:
-    """Rate limiter simple basé sur QPS (requêtes/seconde)"""
-
-    def __init__(self, qps: float):
-        self.min_interval = 1.0 / max(qps, 0.01)
-        self._lock = asyncio.Lock()
-        self._last = 0.0
-
-    async def acquire(self):
-        """Attend si nécessaire pour respecter le QPS"""
-        async with self._lock:
-            now = time.perf_counter()
-            wait = self.min_interval - (now - self._last)
-            if wait > 0:
-                await asyncio.sleep(wait)
-            self._last = time.perf_counter()
-
-
 async def _find_nice_have_missing_one(
     cv: Dict[str, Any],
     nice_have_list: List[str],
-    job_description: str,
     *,
-    find_fn: Callable[[Dict[str,Any], List[str], str], List[str]],
+    find: Callable[[Dict[str,Any]], Awaitable[List[str]]],
     timeout_s: int,
     retries: int,
     backoff_s: float,
-    limiter: RateLimiter,
-    executor: ThreadPoolExecutor,
+    limiter: TokenBucket,
 ) -> tuple[Dict[str,Any], List[str], Optional[str]]:
     """
     Appelle la fonction de recherche nice-have avec protection QPS/timeout/retries + vraie parallélisation
 
     Args:
         cv: CV à analyser
-        nice_have_list: Liste des nice-have à chercher
-        job_description: Description de l'offre
-        find_fn: Fonction de recherche (prompt + LLM + parsing)
+        nice_have_list: Liste des nice-have à chercher (retournée telle quelle en cas d'échec)
+        find: Recherche async, nice-have et offre déjà liés (prompt + LLM + parsing)
         timeout_s: Timeout en secondes
         retries: Nombre de tentatives
         backoff_s: Backoff initial
-        limiter: Rate limiter
-        executor: ThreadPoolExecutor pour vraie parallélisation
+        limiter: Rate limiter (token-bucket)
 
     Returns:
         Tuple (cv, nice_have_manquants, error_message)
     """
-    delay = backoff_s
-    last_err = None
-    loop = asyncio.get_running_loop()
-
-    for attempt in range(retries + 1):
-        try:
-            # Respecter le rate limit
-            await limiter.acquire()
-
-            # TRACKING: Marquer début appel API
-            await _track_inflight_start()
-
-            # Appel avec timeout + vraie parallélisation
-            find_partial = functools.partial(find_fn, cv, nice_have_list, job_description)
-            manquants = await asyncio.wait_for(
-                loop.run_in_executor(executor, find_partial),
-                timeout=timeout_s + 5,  # Garde-fou externe
-            )
-
-            # TRACKING: Marquer fin appel API
-            await _track_inflight_end()
-
-            return cv, manquants, None
-
-        except asyncio.TimeoutError as e:
-            await _track_inflight_end()
-            last_err = f"Timeout après {timeout_s}s (tentative {attempt + 1}/{retries + 1})"
-            print(f"⚠️ {last_err} - CV: {cv.get('cv', 'inconnu')}")
-
-        except Exception as e:
-            await _track_inflight_end()
-            last_err = str(e)
-            print(f"⚠️ Erreur tentative {attempt + 1}/{retries + 1}: {last_err} - CV: {cv.get('cv', 'inconnu')}")
-
-        # Backoff exponentiel avec jitter
-        if attempt < retries:
-            jitter = random.uniform(0, delay / 4)
-            await asyncio.sleep(delay + jitter)
-            delay *= 2
-
-    # Échec après toutes les tentatives: retourner tous manquants (safe fallback)
     cv_name = cv.get('cv', 'inconnu')
-    print(f"❌ CV {cv_name} échec nice-have après {retries + 1} tentatives: {last_err} → tous manquants par défaut")
-    return cv, nice_have_list, last_err
+    try:
+        manquants = await call_with_retry(
+            lambda: find(cv),
+            retries=retries,
+            backoff_s=backoff_s,
+            timeout_s=timeout_s,
+            limiter=limiter,
+            label=cv_name,
+        )
+    except RetryExhausted as e:
+        # Échec après toutes les tentatives: retourner tous manquants (safe fallback)
+        logger.warning(f"❌ CV {cv_name} échec nice-have après {e.attempts} tentative(s): {e.last_err} → tous manquants par défaut")
+        return cv, nice_have_list, e.last_err
+
+    return cv, manquants, None
 
 
 async def find_nice_have_missing_parallel(
@@ -165,7 +80,7 @@ async def find_nice_have_missing_parallel(
     nice_have_list: List[str],
     job_description: str,
     *,
-    find_fn: Callable[[Dict[str,Any], List[str], str], List[str]],
+    find_fn: Callable[[Dict[str,Any], List[str], str], Awaitable[List[str]]],
     concurrency: int = DEFAULT_CONCURRENCY,
     qps: float = DEFAULT_QPS,
     timeout_s: int = DEFAULT_TIMEOUT_S,
@@ -180,7 +95,7 @@ async def find_nice_have_missing_parallel(
         cvs: Liste des CVs à analyser
         nice_have_list: Liste des nice-have à chercher
         job_description: Description de l'offre
-        find_fn: Fonction de recherche (prompt + LLM + parsing)
+        find_fn: Fonction async de recherche (prompt + LLM + parsing)
         concurrency: Nombre de CVs traités en parallèle
         qps: Requêtes par seconde max
         timeout_s: Timeout par appel
@@ -191,65 +106,62 @@ async def find_nice_have_missing_parallel(
     Returns:
         Dict {cv_id: [nice_have_manquants]}
     """
+    # Nice-have nettoyés une fois, réutilisés tels quels pour chaque CV
+    nice_have_list = clean_criteria(nice_have_list)
+
     # Si pas de nice-have, retourner dict vide
-    if not nice_have_list or all(not s or not s.strip() for s in nice_have_list):
-        print("ℹ️ Aucun nice-have défini → skip détection")
-        return {cv.get("cv", f"cv_{i}"): [] for i, cv in enumerate(cvs)}
+    if not nice_have_list:
+        logger.info("ℹ️ Aucun nice-have défini → skip détection")
+        return {cv_identifier(cv, i): [] for i, cv in enumerate(cvs)}
 
     # Reset tracking avant la détection
     reset_inflight_tracking()
 
-    print(f"\n🔄 Détection nice-have parallèle: {len(cvs)} CVs, concurrence={concurrency}, QPS={qps}")
-
-    # ThreadPoolExecutor dimensionné selon la concurrence
-    max_workers = max(4, min(concurrency, 128))
+    logger.info(f"🔄 Détection nice-have parallèle: {len(cvs)} CVs, concurrence={concurrency}, QPS={qps}")
 
-    limiter = RateLimiter(qps)
-    sem = asyncio.Semaphore(max(1, concurrency))
+    limiter = TokenBucket(rate=qps, capacity=qps)  # Rafales d'une seconde autorisées
 
-    async def one(cv):
-        async with sem:
-            return await _find_nice_have_missing_one(
-                cv, nice_have_list, job_description,
-                find_fn=find_fn,
-                timeout_s=timeout_s,
-                retries=retries,
-                backoff_s=backoff_s,
-                limiter=limiter,
-                executor=executor
-            )
+    # Nice-have et offre sont invariants: liés une seule fois pour tous les CVs
+    def find(cv):
+        return find_fn(cv, nice_have_list, job_description)
 
-    # Créer le ThreadPoolExecutor
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Lancer toutes les tâches
-        tasks = [asyncio.create_task(one(cv)) for cv in cvs]
+    async def call(batch):
+        return [await _find_nice_have_missing_one(
+            batch[0], nice_have_list,
+            find=find,
+            timeout_s=timeout_s,
+            retries=retries,
+            backoff_s=backoff_s,
+            limiter=limiter
+        )]
 
-        results = {}
-        completed = 0
-        total = len(tasks)
+    results = {}
+    completed = 0
+    total = len(cvs)
+    cv_ids = cv_identifiers(cvs)
+    log_every = max(1, total // 100)
 
-        # Traiter les résultats au fur et à mesure
-        for fut in asyncio.as_completed(tasks):
-            cv, manquants, error = await fut
-            completed += 1
+    # Traiter les résultats au fur et à mesure
+    async for cv, manquants, error in stream_results(cvs, call, concurrency):
+        completed += 1
 
-            # Mise à jour de la progression
-            if progress_callback:
-                progress_callback(completed, total)
+        # Mise à jour de la progression
+        if progress_callback:
+            progress_callback(completed, total)
 
-            # Identifier le CV
-            cv_id = cv.get("cv") or cv.get("id") or cv.get("filename") or cv.get("nom") or f"cv_{len(results)+1}"
+        cv_id = cv_ids[id(cv)]
 
-            # Stocker les manquants
-            results[cv_id] = manquants
+        # Stocker les manquants
+        results[cv_id] = manquants
 
-            # Log en temps réel
+        # Log échantillonné (~100 lignes par run): la progression fine passe par progress_callback
+        if completed % log_every == 0 or completed == total:
             status = f"✅ {len(nice_have_list) - len(manquants)}/{len(nice_have_list)} présents" if not error else f"⚠️ ERREUR"
-            print(f"  [{completed}/{total}] {status} - {cv_id}")
+            logger.info(f"  [{completed}/{total}] {status} - {cv_id}")
 
     peak = get_peak_inflight()
-    print(f"\n📊 Détection nice-have terminée: {len(results)} CVs analysés")
-    print(f"⚡ Pic d'appels API simultanés: {peak}")
+    logger.info(f"📊 Détection nice-have terminée: {len(results)} CVs analysés")
+    logger.info(f"⚡ Pic d'appels API simultanés: {peak}")
 
     return results
 
@@ -260,7 +172,7 @@ def find_nice_have_missing_parallel_sync(
     nice_have_list: List[str],
     job_description: str,
     *,
-    find_fn: Callable[[Dict[str,Any], List[str], str], List[str]],
+    find_fn: Callable[[Dict[str,Any], List[str], str], Awaitable[List[str]]],
     concurrency: int = DEFAULT_CONCURRENCY,
     qps: float = DEFAULT_QPS,
     timeout_s: int = DEFAULT_TIMEOUT_S,
@@ -269,7 +181,7 @@ def find_nice_have_missing_parallel_sync(
     progress_callback: Optional[Callable[[int, int], None]] = None,
 ) -> Dict[str, List[str]]:
     """Version synchrone pour compatibilité avec Streamlit"""
-    return asyncio.run(
+    return run_sync(
         find_nice_have_missing_parallel(
             cvs, nice_have_list, job_description,
             find_fn=find_fn,
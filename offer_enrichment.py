@@ -4,10 +4,16 @@ Utilise GPT-4o mini pour proposer des compléments pertinents
 """
 
 import json
-from typing import Dict, Any
-from jsonschema import validate, ValidationError
+import hashlib
+from typing import Dict, Any, Optional
+from jsonschema import Draft202012Validator, ValidationError
+try:
+    import fastjsonschema  # Optionnel: validateur généré en code Python, plus rapide
+except ImportError:
+    fastjsonschema = None
 from openai import AsyncOpenAI
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -19,10 +25,7 @@ PROMPT_ENRICHISSEMENT = """Tu es un expert en recrutement tech avec une connaiss
 
 🎯 MISSION: Analyser l'offre d'emploi fournie et PROPOSER des compléments intelligents pour la rendre plus complète et attractive.
 
-📋 CONTEXTE:
-- Métier cible: {metier_label}
-- Offre d'emploi actuelle (JSON):
-{offre_json}
+📋 CONTEXTE: le métier cible et l'offre d'emploi actuelle (JSON) sont fournis dans le message suivant.
 
 🔍 ANALYSE REQUISE:
 1. Examine ATTENTIVEMENT tous les éléments déjà présents dans l'offre (compétences techniques, outils, langages, certifications, missions, formations, expériences)
@@ -82,6 +85,16 @@ Estime le degré de complétude de l'offre AVANT tes propositions:
 🎯 TON OBJECTIF: Aider le RH à créer une offre claire, complète et attractive qui attirera les bons candidats tout en restant réaliste.
 """
 
+# Partie variable, envoyée APRÈS les instructions fixes: le préfixe statique reste identique
+# d'un appel à l'autre et bénéficie du cache de prompt automatique d'OpenAI
+PROMPT_ENRICHISSEMENT_CONTEXTE = """📋 CONTEXTE:
+- Métier cible: {metier_label}
+- Offre d'emploi actuelle (JSON):
+{offre_json}
+"""
+
+SYSTEM_JSON_ONLY = "Tu réponds UNIQUEMENT en JSON valide conforme au schéma demandé."
+
 ENRICH_SCHEMA = {
     "type": "object",
     "required": ["propositions", "coverage_score"],
@@ -161,6 +174,92 @@ ENRICH_SCHEMA = {
     "additionalProperties": False
 }
 
+# Schéma sérialisé une seule fois: prompt de réparation identique octet pour octet d'un essai à l'autre
+_ENRICH_SCHEMA_JSON_STR = json.dumps(ENRICH_SCHEMA, indent=2, ensure_ascii=False)
+
+# Instructions fixes de réparation (schéma inclus) en tête, JSON fautif et erreur à la fin
+PROMPT_REPARATION = f"""Corrige le JSON fourni dans le message suivant pour respecter STRICTEMENT le schéma, sans changer le fond.
+Retourne UNIQUEMENT le JSON corrigé, sans texte additionnel.
+
+Schéma attendu:
+{_ENRICH_SCHEMA_JSON_STR}
+"""
+
+# Segments invariants en message système dédié, schéma inclus: le préfixe statique dépasse
+# le seuil de 1024 tokens du cache de prompt OpenAI et reste identique d'un appel à l'autre
+SYSTEM_ENRICHISSEMENT = f"""{SYSTEM_JSON_ONLY}
+
+{PROMPT_ENRICHISSEMENT}
+
+Schéma attendu:
+{_ENRICH_SCHEMA_JSON_STR}
+"""
+SYSTEM_REPARATION = f"{SYSTEM_JSON_ONLY}\n\n{PROMPT_REPARATION}"
+
+# Validateur construit une seule fois (jsonschema.validate revérifie le métaschéma à chaque appel)
+Draft202012Validator.check_schema(ENRICH_SCHEMA)
+_ENRICH_VALIDATOR = Draft202012Validator(ENRICH_SCHEMA)
+
+# fastjsonschema compile le schéma en fonction Python dédiée s'il est installé, sinon jsonschema
+if fastjsonschema is not None:
+    _validate_enrich = fastjsonschema.compile(ENRICH_SCHEMA)
+    _ENRICH_VALIDATION_ERRORS = (ValidationError, fastjsonschema.JsonSchemaException)
+else:
+    _validate_enrich = _ENRICH_VALIDATOR.validate
+    _ENRICH_VALIDATION_ERRORS = (ValidationError,)
+
+# Cache des enrichissements validés: mémoire (process) + disque (cache/enrich_<clé>.json).
+# La clé inclut une empreinte des prompts et du schéma: les modifier invalide le cache.
+_ENRICH_PROMPT_FINGERPRINT = hashlib.sha256(
+    (SYSTEM_ENRICHISSEMENT + PROMPT_ENRICHISSEMENT_CONTEXTE).encode("utf-8")
+).hexdigest()
+ENRICH_CACHE_DIR = Path(__file__).parent / "cache"
+_enrich_cache: Dict[str, str] = {}  # clé → JSON (chaque lecture rend une copie indépendante)
+
+
+def _enrich_cache_key(offre_json: Dict[str, Any], metier_label: str) -> str:
+    """Clé déterministe: même offre (JSON canonique) + même métier + mêmes prompts"""
+    canonical = json.dumps(offre_json, sort_keys=True, ensure_ascii=False, default=str)
+    payload = "\n".join((_ENRICH_PROMPT_FINGERPRINT, metier_label, canonical))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _enrich_cache_get(key: str) -> Optional[Dict[str, Any]]:
+    """Retourne l'enrichissement en cache (mémoire puis disque), ou None"""
+    cached = _enrich_cache.get(key)
+    if cached is None:
+        cache_file = ENRICH_CACHE_DIR / f"enrich_{key}.json"
+        if not cache_file.exists():
+            return None
+        try:
+            cached = cache_file.read_text(encoding="utf-8")
+            data = json.loads(cached)
+        except (OSError, json.JSONDecodeError):
+            return None  # Fichier illisible: on refait l'appel LLM
+        _enrich_cache[key] = cached
+        return data
+    return json.loads(cached)
+
+
+def _enrich_cache_put(key: str, data: Dict[str, Any]):
+    """Mémorise un enrichissement validé (l'échec d'écriture disque n'est pas bloquant)"""
+    serialized = json.dumps(data, ensure_ascii=False)
+    _enrich_cache[key] = serialized
+    try:
+        ENRICH_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        (ENRICH_CACHE_DIR / f"enrich_{key}.json").write_text(serialized, encoding="utf-8")
+    except OSError as e:
+        print(f"⚠️ Cache enrichissement non écrit sur disque: {e}")
+
+
+def _log_prompt_cache(response: Any, label: str):
+    """Affiche la part du prompt lue dans le cache OpenAI (vérification du taux de hit)"""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    cached = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None) or 0
+    print(f"🗄️ Cache prompt ({label}): {cached}/{usage.prompt_tokens} tokens lus en cache")
+
 
 async def enrich_offer_intelligently(offre_json: Dict[str, Any], metier_label: str) -> Dict[str, Any]:
     """
@@ -176,9 +275,16 @@ async def enrich_offer_intelligently(offre_json: Dict[str, Any], metier_label: s
     Raises:
         ValueError: Si validation échoue après 3 tentatives
     """
-    user_content = PROMPT_ENRICHISSEMENT.format(
+    cache_key = _enrich_cache_key(offre_json, metier_label)
+    cached = _enrich_cache_get(cache_key)
+    if cached is not None:
+        print("♻️ Enrichissement déjà calculé pour cette offre → cache (aucun appel LLM)")
+        return cached
+
+    context_content = PROMPT_ENRICHISSEMENT_CONTEXTE.format(
         metier_label=metier_label,
-        offre_json=json.dumps(offre_json, ensure_ascii=False, indent=2)
+        # JSON compact: encodeur C de la stdlib (indent force l'encodeur Python) et moins de tokens
+        offre_json=json.dumps(offre_json, ensure_ascii=False, separators=(",", ":"))
     )
 
     # Première tentative
@@ -187,11 +293,12 @@ async def enrich_offer_intelligently(offre_json: Dict[str, Any], metier_label: s
         response = await client.chat.completions.create(
             model="gpt-5-mini",
             messages=[
-                {"role": "system", "content": "Tu réponds UNIQUEMENT en JSON valide conforme au schéma demandé."},
-                {"role": "user", "content": user_content}
+                {"role": "system", "content": SYSTEM_ENRICHISSEMENT},
+                {"role": "user", "content": context_content}
             ],
             response_format={"type": "json_object"}
         )
+        _log_prompt_cache(response, "enrichissement")
 
         txt = response.choices[0].message.content
         print(f"📥 Réponse LLM (aperçu 200 chars): {txt[:200]}...")
@@ -200,10 +307,11 @@ async def enrich_offer_intelligently(offre_json: Dict[str, Any], metier_label: s
         for attempt in range(3):
             try:
                 data = json.loads(txt)
-                validate(instance=data, schema=ENRICH_SCHEMA)
+                _validate_enrich(data)
                 print(f"✅ Validation réussie (tentative {attempt + 1})")
+                _enrich_cache_put(cache_key, data)
                 return data
-            except (json.JSONDecodeError, ValidationError) as e:
+            except (json.JSONDecodeError, *_ENRICH_VALIDATION_ERRORS) as e:
                 print(f"⚠️ Tentative {attempt + 1}/3 échouée: {str(e)[:100]}")
 
                 if attempt < 2:  # Pas de réparation au 3e essai
@@ -211,22 +319,12 @@ async def enrich_offer_intelligently(offre_json: Dict[str, Any], metier_label: s
                     repair_response = await client.chat.completions.create(
                         model="gpt-5-mini",
                         messages=[
-                            {"role": "system", "content": "Tu réponds UNIQUEMENT en JSON valide conforme au schéma demandé."},
-                            {"role": "user", "content": f"""Corrige ce JSON pour respecter STRICTEMENT le schéma, sans changer le fond:
-
-JSON à corriger:
-{txt}
-
-Erreur:
-{str(e)}
-
-Schéma attendu:
-{json.dumps(ENRICH_SCHEMA, indent=2)}
-
-Retourne UNIQUEMENT le JSON corrigé, sans texte additionnel."""}
+                            {"role": "system", "content": SYSTEM_REPARATION},
+                            {"role": "user", "content": f"JSON à corriger:\n{txt}\n\nErreur:\n{str(e)}"}
                         ],
                         response_format={"type": "json_object"}
                     )
+                    _log_prompt_cache(repair_response, "réparation")
                     txt = repair_response.choices[0].message.content
                     print(f"🔧 Réparation tentée (aperçu): {txt[:150]}...")
 
@@ -237,6 +335,28 @@ Retourne UNIQUEMENT le JSON corrigé, sans texte additionnel."""}
         raise
 
 
+# Type de proposition → (section de l'offre, champ de la proposition à ajouter)
+_MERGE_TARGETS = {
+    "competences": ("competences_techniques", "name"),
+    "outils": ("outils", "name"),
+    "langages": ("langages", "name"),
+    "certifications": ("certifications", "name"),
+    "missions": ("responsabilites", "text"),
+}
+
+
+def _merge_unique(target_list: list, new_items: list) -> list:
+    """Ajoute à target_list les éléments absents (test d'appartenance O(1)); retourne les ajouts"""
+    seen = set(target_list)
+    added = []
+    for item in new_items:
+        if item not in seen:
+            seen.add(item)
+            target_list.append(item)
+            added.append(item)
+    return added
+
+
 def merge_enrichment(offre_json: Dict[str, Any], enrichment: Dict[str, Any], selections: Dict[str, list]) -> Dict[str, Any]:
     """
     Fusionne les propositions acceptées dans l'offre
@@ -250,77 +370,30 @@ def merge_enrichment(offre_json: Dict[str, Any], enrichment: Dict[str, Any], sel
     Returns:
         Offre enrichie
     """
-    import copy
-    offre_enrichie = copy.deepcopy(offre_json)  # Deep copy pour éviter mutations
+    # Copie superficielle: seuls "sections" et les listes modifiées ci-dessous sont recopiés
+    offre_enrichie = dict(offre_json)
+    if "sections" not in offre_enrichie:
+        return offre_enrichie
+    sections = offre_enrichie["sections"] = dict(offre_enrichie["sections"])
     propositions = enrichment["propositions"]
 
-    # Fusionner les compétences (MUST ET NICE)
-    if "competences" in selections and "sections" in offre_enrichie:
-        if "competences_techniques" not in offre_enrichie["sections"]:
-            offre_enrichie["sections"]["competences_techniques"] = []
-
-        for idx in selections["competences"]:
-            comp = propositions["competences"][idx]
-            comp_name = comp["name"]
-
-            # Ajouter si pas déjà présent (éviter doublons)
-            if comp_name not in offre_enrichie["sections"]["competences_techniques"]:
-                offre_enrichie["sections"]["competences_techniques"].append(comp_name)
-                print(f"✅ Compétence ajoutée: {comp_name} ({comp['type']})")
-
-    # Fusionner les outils
-    if "outils" in selections and "sections" in offre_enrichie:
-        if "outils" not in offre_enrichie["sections"]:
-            offre_enrichie["sections"]["outils"] = []
+    # Fusionner chaque type de proposition (compétences must ET nice, outils, langages, certifications, missions)
+    added_counts = {}
+    for prop_type, (section_key, field) in _MERGE_TARGETS.items():
+        if prop_type not in selections:
+            continue
+        sections[section_key] = list(sections.get(section_key, []))
+        selected = [propositions[prop_type][idx][field] for idx in selections[prop_type]]
+        added_counts[prop_type] = len(_merge_unique(sections[section_key], selected))
 
-        for idx in selections["outils"]:
-            outil = propositions["outils"][idx]
-            outil_name = outil["name"]
+    if added_counts:
+        print("✅ Propositions ajoutées: " + ", ".join(f"{t}={n}" for t, n in added_counts.items()))
 
-            if outil_name not in offre_enrichie["sections"]["outils"]:
-                offre_enrichie["sections"]["outils"].append(outil_name)
-                print(f"✅ Outil ajouté: {outil_name}")
-
-    # Fusionner les langages
-    if "langages" in selections and "sections" in offre_enrichie:
-        if "langages" not in offre_enrichie["sections"]:
-            offre_enrichie["sections"]["langages"] = []
-
-        for idx in selections["langages"]:
-            lang = propositions["langages"][idx]
-            lang_name = lang["name"]
-
-            if lang_name not in offre_enrichie["sections"]["langages"]:
-                offre_enrichie["sections"]["langages"].append(lang_name)
-                print(f"✅ Langage ajouté: {lang_name}")
-
-    # Fusionner les certifications
-    if "certifications" in selections and "sections" in offre_enrichie:
-        if "certifications" not in offre_enrichie["sections"]:
-            offre_enrichie["sections"]["certifications"] = []
-
-        for idx in selections["certifications"]:
-            cert = propositions["certifications"][idx]
-            cert_name = cert["name"]
-
-            if cert_name not in offre_enrichie["sections"]["certifications"]:
-                offre_enrichie["sections"]["certifications"].append(cert_name)
-                print(f"✅ Certification ajoutée: {cert_name}")
-
-    # Fusionner les missions
-    if "missions" in selections and "sections" in offre_enrichie:
-        if "responsabilites" not in offre_enrichie["sections"]:
-            offre_enrichie["sections"]["responsabilites"] = []
+    return offre_enrichie
 
-        for idx in selections["missions"]:
-            mission = propositions["missions"][idx]
-            mission_text = mission["text"]
 
-            if mission_text not in offre_enrichie["sections"]["responsabilites"]:
-                offre_enrichie["sections"]["responsabilites"].append(mission_text)
-                print(f"✅ Mission ajoutée: {mission_text[:50]}...")
-
-    return offre_enrichie
+# Normalisation des questions en clés: "?" et "'" supprimés, espaces → "_"
+_QUESTION_KEY_TRANS = str.maketrans({"?": "", "'": "", " ": "_"})
 
 
 def integrate_question_responses(offre_data: Dict[str, Any], questions_responses: Dict[str, str]) -> Dict[str, Any]:
@@ -334,25 +407,27 @@ def integrate_question_responses(offre_data: Dict[str, Any], questions_responses
     Returns:
         Offre enrichie avec les réponses intégrées
     """
-    import copy
-    offre_enrichie = copy.deepcopy(offre_data)
+    # Copie superficielle: seuls "sections" et "informations_complementaires" sont recopiés
+    offre_enrichie = dict(offre_data)
 
     # Créer une section "informations_complementaires" si elle n'existe pas
     if "sections" in offre_enrichie:
-        if "informations_complementaires" not in offre_enrichie["sections"]:
-            offre_enrichie["sections"]["informations_complementaires"] = {}
+        offre_enrichie["sections"] = dict(offre_enrichie["sections"])
+        offre_enrichie["sections"]["informations_complementaires"] = dict(
+            offre_enrichie["sections"].get("informations_complementaires", {})
+        )
 
         # Intégrer chaque réponse
         for question, response in questions_responses.items():
-            if response and response.strip():  # Ignorer les réponses vides
-                # Créer une clé normalisée à partir de la question
+            reponse = response.strip() if response else ""
+            if reponse:  # Ignorer les réponses vides
+                # Créer une clé normalisée à partir de la question (une seule passe, longueur limitée)
                 # Ex: "Quelle est la taille de l'équipe ?" -> "taille_equipe"
-                key = question.lower().replace("?", "").replace("'", "").replace(" ", "_")
-                key = key[:50]  # Limiter la longueur
+                key = question.translate(_QUESTION_KEY_TRANS).lower()[:50]
 
                 offre_enrichie["sections"]["informations_complementaires"][key] = {
                     "question": question,
-                    "reponse": response.strip()
+                    "reponse": reponse
                 }
                 print(f"✅ Réponse intégrée: {question[:50]}... -> {response[:50]}...")
 
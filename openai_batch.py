@@ -0,0 +1,128 @@
+"""
+Traitement hors ligne via l'API Batch d'OpenAI
+- Requêtes déposées en JSONL (upload), exécutées par OpenAI sur sa capacité libre (fenêtre 24h)
+- Coût réduit de moitié et pas de comptabilité RPM: adapté aux gros volumes non interactifs
+- Suivi du lot avec backoff exponentiel, puis collecte des réponses par custom_id
+"""
+
+import asyncio
+import json
+import logging
+from typing import Dict, List, Any
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_COMPLETION_WINDOW = "24h"
+BATCH_POLL_INITIAL_S = 5.0
+BATCH_POLL_MAX_S = 300.0
+BATCH_TERMINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+
+def build_chat_request(custom_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+    """Ligne JSONL d'un lot: un appel chat.completions identifié par custom_id"""
+    return {"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body}
+
+
+async def submit_batch(client: Any, requests: List[Dict[str, Any]]) -> str:
+    """
+    Dépose les requêtes (JSONL) et crée le lot
+
+    Args:
+        client: Client AsyncOpenAI
+        requests: Lignes construites par build_chat_request (custom_id uniques)
+
+    Returns:
+        Identifiant du lot
+    """
+    jsonl = "\n".join(json.dumps(r, ensure_ascii=False) for r in requests).encode("utf-8")
+    input_file = await client.files.create(file=("batch.jsonl", jsonl), purpose="batch")
+    batch = await client.batches.create(
+        input_file_id=input_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window=BATCH_COMPLETION_WINDOW
+    )
+    logger.info(f"📦 Lot OpenAI {batch.id} soumis ({len(requests)} requêtes)")
+    return batch.id
+
+
+async def poll_batch(client: Any, batch_id: str) -> Any:
+    """
+    Attend la fin du lot (intervalle doublé à chaque vérification, plafonné)
+
+    Args:
+        client: Client AsyncOpenAI
+        batch_id: Identifiant du lot
+
+    Returns:
+        Objet Batch dans un état terminal (completed, failed, expired, cancelled)
+    """
+    delay = BATCH_POLL_INITIAL_S
+    while True:
+        batch = await client.batches.retrieve(batch_id)
+        if batch.status in BATCH_TERMINAL_STATUSES:
+            logger.info(f"📦 Lot OpenAI {batch_id} terminé: {batch.status}")
+            return batch
+
+        counts = getattr(batch, "request_counts", None)
+        if counts is not None:
+            logger.info(f"⏳ Lot {batch_id}: {batch.status} ({counts.completed}/{counts.total})")
+        await asyncio.sleep(delay)
+        delay = min(BATCH_POLL_MAX_S, delay * 2)
+
+
+async def fetch_results(client: Any, batch: Any) -> Dict[str, Dict[str, Any]]:
+    """
+    Collecte les réponses d'un lot terminé
+
+    Args:
+        client: Client AsyncOpenAI
+        batch: Objet Batch terminal (retourné par poll_batch)
+
+    Returns:
+        Dict {custom_id: {"success": bool, "response": contenu ou None, "error": message ou None}}
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        content = await client.files.content(file_id)
+        for line in content.text.splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            response = entry.get("response") or {}
+            if entry.get("error") or response.get("status_code") != 200:
+                error = entry.get("error") or response.get("body", {}).get("error") or "réponse invalide"
+                results[entry["custom_id"]] = {"success": False, "response": None, "error": str(error)}
+            else:
+                content_text = response["body"]["choices"][0]["message"]["content"]
+                results[entry["custom_id"]] = {"success": True, "response": content_text, "error": None}
+
+    return results
+
+
+async def run_batch(client: Any, requests: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Soumet un lot, attend sa fin et retourne un résultat par custom_id
+    (les requêtes sans réponse, lot expiré ou annulé, sont marquées en échec)
+
+    Args:
+        client: Client AsyncOpenAI
+        requests: Lignes construites par build_chat_request
+
+    Returns:
+        Dict {custom_id: {"success", "response", "error"}}
+    """
+    batch_id = await submit_batch(client, requests)
+    batch = await poll_batch(client, batch_id)
+    results = await fetch_results(client, batch)
+
+    for request in requests:
+        results.setdefault(request["custom_id"], {
+            "success": False,
+            "response": None,
+            "error": f"aucune réponse (lot {batch.status})"
+        })
+    return results
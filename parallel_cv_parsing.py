@@ -2,7 +2,7 @@
 ⚠️ WARNING - MODULE LEGACY
 
 Module de parsing parallèle des CVs
-Utilise asyncio + Semaphore pour traiter plusieurs CVs simultanément
+Utilise asyncio (pipeline extraction → pool de workers LLM) pour traiter plusieurs CVs simultanément
 
 Ce module écrit dans des dossiers arbitraires et ne suit pas la nouvelle architecture.
 
@@ -15,43 +15,202 @@ Ce module est conservé uniquement pour tests/développement.
 """
 
 import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 import json
-from openai import AsyncOpenAI
+from openai import AsyncOpenAI, RateLimitError
 import os
 from dotenv import load_dotenv
+import json_io
 import parseur_cv
+from retry_runner import run_sync
 import time
-from datetime import datetime
+import logging
+import queue
+import atexit
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 load_dotenv()
 
 # Client OpenAI async
 client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-# Logger pour tracking des performances
+# Logger pour tracking des performances: fichier ouvert une seule fois à l'import,
+# handlers (fichier + console) dans un thread dédié pour ne pas bloquer l'event loop
+PERF_LOG_FILE = Path("logs/parsing_performance.log")
+PERF_LOG_MAX_BYTES = 10 * 1024 * 1024
+PERF_LOG_BACKUPS = 3
+PERF_LOG_LEVEL = logging.INFO  # DEBUG pour le détail par phase de chaque CV
+
+_perf_logger = logging.getLogger("parsing_perf")
+
+# Niveaux acceptés par log_performance (SUCCESS = niveau dédié entre INFO et WARNING)
+SUCCESS_LEVEL = 25
+logging.addLevelName(SUCCESS_LEVEL, "SUCCESS")
+_PERF_LEVELS = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "SUCCESS": SUCCESS_LEVEL,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+}
+
+
+def _setup_perf_logger():
+    """Configure le logger de performance (idempotent en cas de rechargement du module)"""
+    if _perf_logger.handlers:
+        return
+
+    PERF_LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    formatter = logging.Formatter("[%(asctime)s.%(msecs)03d] [%(levelname)s] %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
+    handlers = [
+        RotatingFileHandler(PERF_LOG_FILE, maxBytes=PERF_LOG_MAX_BYTES, backupCount=PERF_LOG_BACKUPS, encoding="utf-8"),
+        logging.StreamHandler()
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers)
+    listener.start()
+    atexit.register(listener.stop)
+
+    _perf_logger.addHandler(QueueHandler(log_queue))
+    _perf_logger.setLevel(PERF_LOG_LEVEL)
+    _perf_logger.propagate = False  # Pas de doublon via les handlers du logger racine
+
+
+_setup_perf_logger()
+
+
 def log_performance(message: str, level: str = "INFO"):
     """Log avec timestamp pour tracking des performances"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-    log_message = f"[{timestamp}] [{level}] {message}"
+    _perf_logger.log(_PERF_LEVELS.get(level, logging.INFO), message)
 
-    # Afficher dans la console
-    print(log_message)
 
-    # Écrire dans un fichier de log
-    log_file = Path("logs/parsing_performance.log")
-    log_file.parent.mkdir(parents=True, exist_ok=True)
+# Concurrence adaptative (AIMD): +1 appel simultané toutes les N réussites, /2 sur un 429
+ADAPTIVE_CONCURRENCY_CAP = 20
+ADAPTIVE_INCREASE_EVERY = 10
+RATE_LIMIT_RETRIES = 3
+RATE_LIMIT_DEFAULT_WAIT_S = 2.0
 
-    with open(log_file, "a", encoding="utf-8") as f:
-        f.write(log_message + "\n")
+
+class AdaptiveConcurrency:
+    """
+    Limite d'appels LLM simultanés ajustée aux 429 observés (remplace un Semaphore fixe).
+    Pas de lock autour des compteurs: un seul event loop, aucune préemption entre deux await.
+    """
+
+    def __init__(self, initial: int, cap: int):
+        self.limit = max(1, initial)
+        self.cap = max(self.limit, cap)
+        self.inflight = 0
+        self._successes = 0
+        self._last_decrease = 0.0
+        self._cond = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.inflight < self.limit)
+            self.inflight += 1
+        return self
+
+    async def __aexit__(self, *exc_info):
+        async with self._cond:
+            self.inflight -= 1
+            self._cond.notify_all()
+
+    async def on_success(self):
+        """Augmentation additive: un appel simultané de plus toutes les N réussites"""
+        self._successes += 1
+        if self._successes % ADAPTIVE_INCREASE_EVERY == 0 and self.limit < self.cap:
+            async with self._cond:
+                self.limit += 1
+                self._cond.notify_all()
+            log_performance(f"  📈 Concurrence LLM augmentée à {self.limit}", "DEBUG")
+
+    def on_rate_limit(self, wait_s: float):
+        """Diminution multiplicative (une seule fois par salve de 429 concurrents)"""
+        now = time.monotonic()
+        if now - self._last_decrease < wait_s:
+            return
+        self._last_decrease = now
+        self._successes = 0
+        self.limit = max(1, self.limit // 2)
+        log_performance(f"  📉 429 reçu → concurrence LLM réduite à {self.limit}", "WARNING")
+
+
+def _retry_after_s(error: RateLimitError) -> float:
+    """Délai Retry-After renvoyé par l'API (défaut si absent ou illisible)"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", RATE_LIMIT_DEFAULT_WAIT_S))
+    except (TypeError, ValueError):
+        return RATE_LIMIT_DEFAULT_WAIT_S
+
+
+SYSTEM_CV_JSON_ONLY = "Tu es un assistant qui analyse des CV. Tu réponds UNIQUEMENT en JSON valide."
+
+
+async def _stream_json_completion(
+    user_content: str,
+    model: str,
+    concurrency: Optional[AdaptiveConcurrency] = None
+) -> Tuple[str, Optional[int]]:
+    """
+    Appel LLM JSON en streaming; sur un 429, attend Retry-After (slot conservé) et réessaie
+
+    Args:
+        user_content: Message utilisateur
+        model: Modèle LLM à utiliser
+        concurrency: Limiteur adaptatif à notifier des réussites et des 429
+
+    Returns:
+        Tuple (texte complet, instant perf_counter_ns du premier token ou None si réponse vide)
+    """
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        try:
+            stream = await client.chat.completions.create(
+                model=model,
+                # NE PAS passer temperature pour gpt-5-mini (seule valeur 1.0 supportée)
+                messages=[
+                    {"role": "system", "content": SYSTEM_CV_JSON_ONLY},
+                    {"role": "user", "content": user_content}
+                ],
+                response_format={"type": "json_object"},
+                stream=True
+            )
+            break
+        except RateLimitError as e:
+            if concurrency is None or attempt == RATE_LIMIT_RETRIES:
+                raise
+            wait_s = _retry_after_s(e)
+            concurrency.on_rate_limit(wait_s)
+            await asyncio.sleep(wait_s)
+
+    # Fragments accumulés, joints une seule fois
+    chunks = []
+    first_token_ns = None
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            if first_token_ns is None:
+                first_token_ns = time.perf_counter_ns()
+            chunks.append(chunk.choices[0].delta.content)
+
+    if concurrency is not None:
+        await concurrency.on_success()
+    return "".join(chunks), first_token_ns
 
 
 async def parse_single_cv_async(
     cv_text: str,
     cv_filename: str,
     model: str = "gpt-5-mini",
-    semaphore: asyncio.Semaphore = None
+    semaphore: asyncio.Semaphore = None,
+    concurrency: Optional[AdaptiveConcurrency] = None
 ) -> Dict[str, Any]:
     """
     Parse un CV de manière asynchrone avec GPT
@@ -62,63 +221,52 @@ async def parse_single_cv_async(
         model: Modèle LLM à utiliser
         temperature: Température (0.1 pour extraction structurée)
         semaphore: Semaphore pour limiter la concurrence
+        concurrency: Limiteur adaptatif à notifier des réussites et des 429
 
     Returns:
         Dict avec données parsées ou erreur + timing détaillé
     """
-    # Timer global pour ce CV
-    cv_start_time = time.time()
-    timings = {}
+    # Un seul instantané perf_counter_ns par frontière de phase, durées calculées à la fin
+    t = [time.perf_counter_ns()]
+    detailed = _perf_logger.isEnabledFor(logging.DEBUG)
 
     async with semaphore if semaphore else asyncio.Semaphore(5):
+        t.append(time.perf_counter_ns())  # Fin de l'attente du semaphore
         try:
-            log_performance(f"🔄 [DÉBUT] Parsing de {cv_filename}")
-
-            # PHASE 1: Appel API
-            api_start = time.time()
-            log_performance(f"  📤 [API START] Envoi requête LLM pour {cv_filename}")
+            if detailed:
+                log_performance(f"🔄 [DÉBUT] Parsing de {cv_filename}", "DEBUG")
 
-            response = await client.chat.completions.create(
-                model=model,
-                # NE PAS passer temperature pour gpt-5-mini (seule valeur 1.0 supportée)
-                messages=[
-                    {"role": "system", "content": "Tu es un assistant qui analyse des CV. Tu réponds UNIQUEMENT en JSON valide."},
-                    {"role": "user", "content": f"{parseur_cv.PROMPT_CV_EXTRACTION}\n\n{cv_text}"}
-                ],
-                response_format={"type": "json_object"}
+            # PHASE 1 + 2: Appel API en streaming (premier token, puis réception du flux)
+            result_text, first_token_ns = await _stream_json_completion(
+                f"{parseur_cv.PROMPT_CV_EXTRACTION}\n\n{cv_text}", model, concurrency
             )
+            t.append(first_token_ns or time.perf_counter_ns())
+            t.append(time.perf_counter_ns())
+
+            # PHASE 3: Parsing JSON (response_format json_object garantit un JSON valide:
+            # nettoyage uniquement en repli si la réponse n'est pas conforme)
+            try:
+                parsed_data = json_io.loads(result_text)
+            except json.JSONDecodeError:
+                log_performance(f"  🧹 [CLEAN] JSON non conforme pour {cv_filename}, nettoyage puis nouvel essai", "WARNING")
+                parsed_data = json_io.loads(parseur_cv.clean_json_text(result_text))
+            t.append(time.perf_counter_ns())
+
+            timings = {
+                "first_token": round((t[2] - t[1]) / 1e9, 3),
+                "api_call": round((t[3] - t[1]) / 1e9, 3),
+                "extract_response": round((t[3] - t[2]) / 1e9, 3),
+                "parse_json": round((t[4] - t[3]) / 1e9, 3),
+                "total": round((t[4] - t[0]) / 1e9, 3),
+            }
 
-            api_duration = time.time() - api_start
-            timings['api_call'] = round(api_duration, 3)
-            log_performance(f"  📥 [API END] Réponse reçue pour {cv_filename} ({api_duration:.3f}s)")
-
-            # PHASE 2: Extraction réponse
-            extract_start = time.time()
-            result_text = response.choices[0].message.content
-            extract_duration = time.time() - extract_start
-            timings['extract_response'] = round(extract_duration, 3)
-            log_performance(f"  📄 [EXTRACT] Réponse extraite ({extract_duration:.3f}s)")
-
-            # PHASE 3: Nettoyage JSON
-            clean_start = time.time()
-            cleaned_result = parseur_cv.clean_json_text(result_text)
-            clean_duration = time.time() - clean_start
-            timings['clean_json'] = round(clean_duration, 3)
-            log_performance(f"  🧹 [CLEAN] JSON nettoyé ({clean_duration:.3f}s)")
-
-            # PHASE 4: Parsing JSON
-            parse_start = time.time()
-            parsed_data = json.loads(cleaned_result)
-            parse_duration = time.time() - parse_start
-            timings['parse_json'] = round(parse_duration, 3)
-            log_performance(f"  ✓ [PARSE] JSON parsé ({parse_duration:.3f}s)")
-
-            # Temps total
-            total_duration = time.time() - cv_start_time
-            timings['total'] = round(total_duration, 3)
-
-            log_performance(f"✅ [FIN] {cv_filename} parsé avec succès | TOTAL: {total_duration:.3f}s", "SUCCESS")
-            log_performance(f"  📊 Détail: API={api_duration:.3f}s | Clean={clean_duration:.3f}s | Parse={parse_duration:.3f}s")
+            log_performance(f"✅ [FIN] {cv_filename} parsé avec succès | TOTAL: {timings['total']:.3f}s", "SUCCESS")
+            if detailed:
+                log_performance(
+                    f"  📊 Détail: 1er token={timings['first_token']:.3f}s | API={timings['api_call']:.3f}s | Flux={timings['extract_response']:.3f}s "
+                    f"| Parse={timings['parse_json']:.3f}s",
+                    "DEBUG"
+                )
 
             return {
                 "filename": cv_filename,
@@ -128,7 +276,7 @@ async def parse_single_cv_async(
             }
 
         except Exception as e:
-            total_duration = time.time() - cv_start_time
+            total_duration = (time.perf_counter_ns() - t[0]) / 1e9
             log_performance(f"❌ [ERREUR] {cv_filename}: {str(e)[:100]} | Temps écoulé: {total_duration:.3f}s", "ERROR")
             return {
                 "filename": cv_filename,
@@ -138,11 +286,143 @@ async def parse_single_cv_async(
             }
 
 
+async def parse_cv_batch_async(
+    cv_infos: List[Dict[str, str]],
+    model: str = "gpt-5-mini",
+    concurrency: Optional[AdaptiveConcurrency] = None
+) -> List[Dict[str, Any]]:
+    """
+    Parse plusieurs CVs en un seul appel LLM (un aller-retour et un prompt système pour le lot).
+    Repli sur un appel par CV si le lot échoue, et pour chaque CV dont l'identifiant est absent
+    ou en double dans la réponse (objets replacés par "cv_id", pas par position).
+
+    Args:
+        cv_infos: Liste de dicts {"filename", "text"}
+        model: Modèle LLM à utiliser
+        concurrency: Limiteur adaptatif à notifier des réussites et des 429
+
+    Returns:
+        Liste de résultats (même format que parse_single_cv_async), dans l'ordre de cv_infos
+    """
+    if len(cv_infos) == 1:
+        return [await parse_single_cv_async(cv_infos[0]["text"], cv_infos[0]["filename"], model=model, concurrency=concurrency)]
+
+    k = len(cv_infos)
+    filenames = ", ".join(info["filename"] for info in cv_infos)
+    t = [time.perf_counter_ns()]
+
+    try:
+        instructions, cv_blocks = parseur_cv.build_cv_batch([info["text"] for info in cv_infos])
+        result_text, first_token_ns = await _stream_json_completion(
+            f"{parseur_cv.PROMPT_CV_EXTRACTION}\n\n{instructions}\n\n{cv_blocks}", model, concurrency
+        )
+        t.append(first_token_ns or time.perf_counter_ns())
+        t.append(time.perf_counter_ns())
+
+        parsed_list = json_io.loads(result_text).get("cvs")
+        if not isinstance(parsed_list, list):
+            raise ValueError("réponse de lot invalide (tableau \"cvs\" attendu)")
+        mapped = parseur_cv.map_cv_batch(parsed_list, k)
+        t.append(time.perf_counter_ns())
+
+    except Exception as e:
+        log_performance(f"⚠️ [LOT] Échec du lot ({filenames}): {str(e)[:100]} → un appel par CV", "WARNING")
+        results = []
+        for info in cv_infos:
+            results.append(await parse_single_cv_async(info["text"], info["filename"], model=model, concurrency=concurrency))
+        return results
+
+    timings = {
+        "first_token": round((t[1] - t[0]) / 1e9, 3),
+        "api_call": round((t[2] - t[0]) / 1e9, 3),
+        "extract_response": round((t[2] - t[1]) / 1e9, 3),
+        "parse_json": round((t[3] - t[2]) / 1e9, 3),
+        "total": round((t[3] - t[0]) / 1e9, 3),
+        "batch_size": k,
+    }
+    missing = mapped.count(None)
+    log_performance(f"✅ [FIN LOT] {k - missing}/{k} CVs parsés en un appel ({filenames}) | TOTAL: {timings['total']:.3f}s", "SUCCESS")
+    if missing:
+        log_performance(f"⚠️ [LOT] {missing} CV(s) absent(s) ou en double dans la réponse → un appel par CV", "WARNING")
+
+    results = []
+    for info, data in zip(cv_infos, mapped):
+        if data is None:
+            results.append(await parse_single_cv_async(info["text"], info["filename"], model=model, concurrency=concurrency))
+        else:
+            results.append({"filename": info["filename"], "success": True, "data": data, "timings": timings})
+    return results
+
+
+# Bornes sur le texte extrait: en dessous, extraction ratée (PDF scanné sans OCR) → pas
+# d'appel LLM; au-dessus, début (identité, titre) + fin (suite du parcours) conservés
+MIN_CV_TEXT_CHARS = 200
+MAX_CV_TEXT_CHARS = 30_000
+
+
+def _truncate_cv_text(cv_text: str) -> str:
+    """Tronque un texte trop long en gardant sa première et sa dernière moitié utiles"""
+    if len(cv_text) <= MAX_CV_TEXT_CHARS:
+        return cv_text
+    half = MAX_CV_TEXT_CHARS // 2
+    return f"{cv_text[:half]}\n[...]\n{cv_text[-half:]}"
+
+
+# Extracteur par extension (les formats non supportés sont écartés avant le pipeline)
+_EXTRACTORS = {
+    ".pdf": parseur_cv.extract_text_from_pdf,
+    ".docx": parseur_cv.extract_text_from_docx,
+}
+
+
+# Parsing PDF/DOCX dans un pool de processus partagé (créé au premier usage, un worker par cœur):
+# PyMuPDF et docx2txt sont liés au CPU et gardent le GIL, des threads ne se recouvrent pas.
+# Tout le travail d'un fichier (lecture, parsing, cache texte disque) reste dans un seul processus.
+# "spawn": pas de fork d'un process qui a déjà des threads (file de logs, event loop partagé)
+_extract_pool: Optional[ProcessPoolExecutor] = None
+_extract_pool_lock = threading.Lock()
+
+
+def _get_extract_pool() -> ProcessPoolExecutor:
+    """Retourne le pool de processus d'extraction partagé"""
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is None:
+            _extract_pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+    return _extract_pool
+
+
+def _extract_one(idx: int, total: int, cv_file: Path) -> Optional[Tuple[Dict[str, str], Dict[str, Any]]]:
+    """Extrait le texte d'un CV au format supporté; retourne (cv_info, timing) ou None en cas d'erreur"""
+    ext = cv_file.suffix.lower()
+    file_start = time.time()
+
+    try:
+        log_performance(f"  📄 [{idx}/{total}] Extraction de {cv_file.name} (format: {ext})")
+        # Le thread appelant ne fait qu'attendre: le parsing tourne dans un processus du pool
+        cv_text = _get_extract_pool().submit(_EXTRACTORS[ext], str(cv_file)).result()
+
+        file_duration = time.time() - file_start
+        log_performance(f"  ✅ {cv_file.name} extrait ({file_duration:.3f}s, {len(cv_text)} chars)")
+
+        cv_info = {"filename": cv_file.name, "text": cv_text}
+        timing = {"filename": cv_file.name, "duration": round(file_duration, 3), "text_length": len(cv_text)}
+        return cv_info, timing
+    except Exception as e:
+        file_duration = time.time() - file_start
+        log_performance(f"  ❌ Erreur extraction {cv_file.name}: {e} ({file_duration:.3f}s)", "ERROR")
+        return None
+
+
 async def parse_cvs_parallel(
     cv_files: List[Path],
     cv_json_folder: Path,
     model: str = "gpt-5-mini",
-    max_concurrent: int = 5
+    max_concurrent: int = 5,
+    batch_size: int = 1
 ) -> Dict[str, Any]:
     """
     Parse plusieurs CVs en parallèle avec contrôle de concurrence
@@ -152,14 +432,12 @@ async def parse_cvs_parallel(
         cv_json_folder: Dossier de sortie pour les JSONs
         model: Modèle LLM à utiliser
         temperature: Température (0.1 pour extraction)
-        max_concurrent: Nombre max d'appels LLM simultanés
+        max_concurrent: Nombre initial d'appels LLM simultanés (ajusté ensuite selon les 429)
+        batch_size: Nombre max de CVs envoyés dans un même appel LLM (1 = un appel par CV)
 
     Returns:
         Dict avec statistiques (success_count, failed_count, results)
     """
-    semaphore = asyncio.Semaphore(max_concurrent)
-    tasks = []
-
     # Créer le dossier de sortie
     cv_json_folder.mkdir(parents=True, exist_ok=True)
 
@@ -167,98 +445,122 @@ async def parse_cvs_parallel(
     log_performance("")
     log_performance("=" * 100)
     log_performance(f"🚀 NOUVELLE SESSION DE PARSING - {len(cv_files)} fichiers à traiter")
-    log_performance(f"   Configuration: max_concurrent={max_concurrent}, model={model}")
+    log_performance(f"   Configuration: max_concurrent={max_concurrent}, batch_size={batch_size}, model={model}")
     log_performance("=" * 100)
 
-    # Extraction du texte (synchrone) avec tracking
-    log_performance(f"📂 [EXTRACTION TEXTE] Début extraction de {len(cv_files)} fichiers")
-    extraction_start = time.time()
+    # Formats non supportés écartés une seule fois, avant le pipeline
+    unsupported = [f.name for f in cv_files if f.suffix.lower() not in _EXTRACTORS]
+    if unsupported:
+        log_performance(f"  ⚠️ {len(unsupported)} format(s) non supporté(s) ignoré(s): {', '.join(unsupported)}", "WARNING")
+        cv_files = [f for f in cv_files if f.suffix.lower() in _EXTRACTORS]
+
+    # Pipeline extraction → parsing LLM: les premiers CVs extraits partent au LLM
+    # pendant que les suivants sont encore lus sur disque
+    log_performance(f"🔀 [PIPELINE] Extraction de {len(cv_files)} fichiers → parsing LLM ({max_concurrent} simultanés au départ, adaptatif)")
+    pipeline_start = time.time()
+
+    batch_size = max(1, batch_size)
+    # Workers en nombre suffisant pour le plafond adaptatif; la limite courante borne les appels
+    concurrency = AdaptiveConcurrency(max_concurrent, max(max_concurrent, ADAPTIVE_CONCURRENCY_CAP))
+    n_workers = max(1, min(concurrency.cap, len(cv_files)))
+    queue: asyncio.Queue = asyncio.Queue()
+    extracted_slots: List[Optional[Tuple[Dict[str, Any], Dict[str, Any]]]] = [None] * len(cv_files)
+    result_slots: List[Optional[Dict[str, Any]]] = [None] * len(cv_files)
+    extraction_total = 0.0
+
+    async def extract_and_push(idx: int, cv_file: Path):
+        """Extrait un fichier (parsing dans le pool de processus) et le met en file dès qu'il est prêt"""
+        item = await asyncio.to_thread(_extract_one, idx, len(cv_files), cv_file)
+        if item is None:
+            return
+        extracted_slots[idx - 1] = item
+        cv_info = item[0]
+
+        # Texte vide ou quasi vide: échec immédiat, sans appel LLM
+        if len(cv_info["text"].strip()) < MIN_CV_TEXT_CHARS:
+            log_performance(f"  ⚠️ {cv_info['filename']}: texte extrait < {MIN_CV_TEXT_CHARS} caractères → ignoré", "WARNING")
+            result_slots[idx - 1] = {
+                "filename": cv_info["filename"],
+                "success": False,
+                "error": f"text extraction yielded <{MIN_CV_TEXT_CHARS} chars"
+            }
+            return
 
-    cv_texts = []
-    extraction_timings = []
+        if len(cv_info["text"]) > MAX_CV_TEXT_CHARS:
+            log_performance(f"  ✂️ {cv_info['filename']}: {len(cv_info['text'])} caractères → tronqué à {MAX_CV_TEXT_CHARS}", "WARNING")
+            cv_info = {"filename": cv_info["filename"], "text": _truncate_cv_text(cv_info["text"])}
 
-    for idx, cv_file in enumerate(cv_files, 1):
-        ext = cv_file.suffix.lower()
-        file_start = time.time()
+        await queue.put((idx - 1, cv_info))
 
+    async def producer():
+        """Extractions en parallèle (pool de processus), puis une sentinelle de fin par worker"""
+        nonlocal extraction_total
         try:
-            log_performance(f"  📄 [{idx}/{len(cv_files)}] Extraction de {cv_file.name} (format: {ext})")
-
-            if ext == ".pdf":
-                cv_text = parseur_cv.extract_text_from_pdf(str(cv_file))
-            elif ext == ".docx":
-                cv_text = parseur_cv.extract_text_from_docx(str(cv_file))
-            else:
-                log_performance(f"  ⚠️ Format non supporté: {cv_file.name}", "WARNING")
-                continue
-
-            file_duration = time.time() - file_start
-            extraction_timings.append({
-                "filename": cv_file.name,
-                "duration": round(file_duration, 3),
-                "text_length": len(cv_text)
-            })
-
-            log_performance(f"  ✅ {cv_file.name} extrait ({file_duration:.3f}s, {len(cv_text)} chars)")
-
-            cv_texts.append({
-                "filename": cv_file.name,
-                "text": cv_text
-            })
-        except Exception as e:
-            file_duration = time.time() - file_start
-            log_performance(f"  ❌ Erreur extraction {cv_file.name}: {e} ({file_duration:.3f}s)", "ERROR")
-
-    extraction_total = time.time() - extraction_start
-    log_performance(f"📂 [FIN EXTRACTION] {len(cv_texts)}/{len(cv_files)} fichiers extraits en {extraction_total:.3f}s")
-
+            await asyncio.gather(*(
+                extract_and_push(idx, cv_file)
+                for idx, cv_file in enumerate(cv_files, 1)
+            ))
+            extraction_total = time.time() - pipeline_start
+        finally:
+            for _ in range(n_workers):
+                await queue.put(None)
+
+    async def consumer():
+        """Parse les CVs extraits au fil de l'eau, par lots d'au plus batch_size CVs déjà en file"""
+        while True:
+            job = await queue.get()
+            if job is None:
+                return
+
+            async with concurrency:
+                # Lot complété une fois le slot obtenu: les CVs arrivés pendant l'attente en profitent
+                jobs = [job]
+                done = False
+                while len(jobs) < batch_size and not queue.empty():
+                    job = queue.get_nowait()
+                    if job is None:
+                        done = True
+                        break
+                    jobs.append(job)
+
+                results_batch = await parse_cv_batch_async(
+                    [cv_info for _, cv_info in jobs], model=model, concurrency=concurrency
+                )
+
+            for (slot, _), result in zip(jobs, results_batch):
+                result_slots[slot] = result
+                # Sauvegarde immédiate dans un thread: l'écriture recouvre les appels LLM restants
+                if result["success"]:
+                    save_tasks.append(asyncio.create_task(asyncio.to_thread(
+                        json_io.write_json, cv_json_folder / (Path(result["filename"]).stem + ".json"), result["data"]
+                    )))
+
+            if done:
+                return
+
+    save_tasks: List[asyncio.Task] = []
+    await asyncio.gather(producer(), *(consumer() for _ in range(n_workers)))
+
+    # Résultats dans l'ordre des fichiers (les complétions arrivent dans le désordre)
+    extraction_timings = [item[1] for item in extracted_slots if item is not None]
+    results = [r for r in result_slots if r is not None]
+
+    log_performance(f"📂 [FIN EXTRACTION] {len(extraction_timings)}/{len(cv_files)} fichiers extraits en {extraction_total:.3f}s")
     if extraction_timings:
         avg_extraction = sum(t['duration'] for t in extraction_timings) / len(extraction_timings)
         log_performance(f"  📊 Temps moyen extraction: {avg_extraction:.3f}s par fichier")
 
-    # Parsing parallèle avec LLM
-    log_performance(f"🤖 [PARSING LLM] Début parsing de {len(cv_texts)} CVs (max {max_concurrent} simultanés)")
-    parsing_start = time.time()
+    # Parsing mesuré de bout en bout: il recouvre l'extraction
+    parsing_total = time.time() - pipeline_start
+    log_performance(f"🤖 [FIN PARSING] {len(results)} CVs traités en {parsing_total:.3f}s (extraction incluse)")
 
-    for cv_info in cv_texts:
-        task = parse_single_cv_async(
-            cv_text=cv_info["text"],
-            cv_filename=cv_info["filename"],
-            model=model,
-            semaphore=semaphore
-        )
-        tasks.append(task)
-
-    # Exécuter toutes les tâches en parallèle
-    results = await asyncio.gather(*tasks)
-
-    parsing_total = time.time() - parsing_start
-    log_performance(f"🤖 [FIN PARSING] {len(results)} CVs traités en {parsing_total:.3f}s")
-
-    # Sauvegarder les résultats et calculer les stats
+    # Attendre les dernières sauvegardes (lancées au fil des parsings) et calculer les stats
     save_start = time.time()
-    success_count = 0
-    failed_count = 0
-    saved_files = []
-    llm_timings = []
-
-    for result in results:
-        if result["success"]:
-            # Sauvegarder le JSON
-            json_filename = Path(result["filename"]).stem + ".json"
-            json_path = cv_json_folder / json_filename
-
-            with open(json_path, "w", encoding="utf-8") as f:
-                json.dump(result["data"], f, ensure_ascii=False, indent=4)
-
-            saved_files.append(json_filename)
-            success_count += 1
-
-            # Collecter les timings LLM
-            if "timings" in result:
-                llm_timings.append(result["timings"])
-        else:
-            failed_count += 1
+    await asyncio.gather(*save_tasks)
+    saved_files = [Path(r["filename"]).stem + ".json" for r in results if r["success"]]
+    success_count = len(saved_files)
+    failed_count = len(results) - success_count
+    llm_timings = [r["timings"] for r in results if r["success"] and "timings" in r]
 
     save_duration = time.time() - save_start
 
@@ -269,6 +571,7 @@ async def parse_cvs_parallel(
     log_performance(f"  ✅ Succès: {success_count}/{len(results)}")
     log_performance(f"  ❌ Échecs: {failed_count}/{len(results)}")
     log_performance(f"  💾 Sauvegarde: {save_duration:.3f}s")
+    log_performance(f"  🎚️ Concurrence LLM finale: {concurrency.limit} (départ {max_concurrent}, plafond {concurrency.cap})")
     log_performance("")
 
     # Stats extraction
@@ -295,14 +598,16 @@ async def parse_cvs_parallel(
         log_performance(f"  • Temps total: {parsing_total:.3f}s")
         log_performance(f"  • Temps moyen par CV: {avg_total_llm:.3f}s")
         log_performance(f"  • Temps API moyen: {avg_api:.3f}s")
+        log_performance(f"  • Premier token moyen: {sum(t.get('first_token', 0) for t in llm_timings) / len(llm_timings):.3f}s")
         log_performance(f"  • API Min: {min_api:.3f}s | Max: {max_api:.3f}s")
         log_performance("")
 
     # Temps total global
-    total_global = extraction_total + parsing_total + save_duration
+    # Extraction et parsing se recouvrent: le pipeline compte une seule fois
+    total_global = parsing_total + save_duration
     log_performance(f"⏱️ TEMPS TOTAL: {total_global:.3f}s")
-    log_performance(f"  • Extraction: {extraction_total:.3f}s ({extraction_total/total_global*100:.1f}%)")
-    log_performance(f"  • Parsing LLM: {parsing_total:.3f}s ({parsing_total/total_global*100:.1f}%)")
+    log_performance(f"  • Extraction (recouverte par le pipeline): {extraction_total:.3f}s ({extraction_total/total_global*100:.1f}%)")
+    log_performance(f"  • Pipeline extraction + parsing LLM: {parsing_total:.3f}s ({parsing_total/total_global*100:.1f}%)")
     log_performance(f"  • Sauvegarde: {save_duration:.3f}s ({save_duration/total_global*100:.1f}%)")
     log_performance("=" * 80)
 
@@ -328,7 +633,8 @@ def parse_cvs_parallel_sync(
     cv_files: List[Path],
     cv_json_folder: Path,
     model: str = "gpt-5-mini",
-    max_concurrent: int = 5
+    max_concurrent: int = 5,
+    batch_size: int = 1
 ) -> Dict[str, Any]:
     """
     Wrapper synchrone pour Streamlit
@@ -344,11 +650,13 @@ def parse_cvs_parallel_sync(
 
         st.success(f"✅ {results['success_count']} CVs parsés")
     """
-    return asyncio.run(parse_cvs_parallel(
+    # Event loop partagé (pas un loop par appel): le client AsyncOpenAI du module garde ses connexions
+    return run_sync(parse_cvs_parallel(
         cv_files=cv_files,
         cv_json_folder=cv_json_folder,
         model=model,
-        max_concurrent=max_concurrent
+        max_concurrent=max_concurrent,
+        batch_size=batch_size
     ))
 
 
@@ -4,11 +4,41 @@ Implémente async/await pour les appels LLM et ThreadPool pour l'I/O fichiers
 """
 
 import asyncio
+import hashlib
+import json
+import logging
 import time
 from typing import List, Dict, Any, Callable, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from functools import partial
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import os
+import httpx
+from openai import AsyncOpenAI
+
+import llm_cache
+from retry_runner import TokenBucket, run_background, run_sync
+from openai_batch import build_chat_request, run_batch
+
+logger = logging.getLogger(__name__)
+
+# Extraction d'un fichier abandonnée au-delà de ce délai (PDF corrompu qui bloque le parsing)
+EXTRACTION_TIMEOUT_S = 60
+EXTRACTION_POLL_S = 0.5  # Fréquence de vérification des délais
+
+# Durées par fichier / par appel mesurées seulement sur demande (BRAINRH_TIMING=1), sinon 0.0
+DEBUG_TIMING = os.getenv("BRAINRH_TIMING") == "1"
+
+# Pool HTTP keep-alive: connexions réutilisées d'un appel à l'autre (pas de TCP+TLS par requête)
+LLM_KEEPALIVE_EXPIRY_S = 60
+LLM_TIMEOUT_S = 60
+LLM_CONNECT_TIMEOUT_S = 10
+
+# Limites de débit OpenAI (requêtes et tokens par minute), à ajuster au tier du compte
+DEFAULT_REQUESTS_PER_MINUTE = 500
+DEFAULT_TOKENS_PER_MINUTE = 200_000
+CHARS_PER_TOKEN = 4  # Estimation grossière des tokens d'un prompt
+
+# Mode lot (API Batch OpenAI): au-delà de ce nombre d'appels, si activé sur le pipeline
+BATCH_API_MIN_CALLS = 100
 
 
 # ==================== EXTRACTION PARALLÈLE DE FICHIERS ====================
@@ -25,9 +55,9 @@ def extract_single_file(file_path: str, extract_fn: Callable) -> Dict[str, Any]:
         {"file": path, "success": bool, "data": ..., "error": ...}
     """
     try:
-        start = time.time()
+        start = time.perf_counter() if DEBUG_TIMING else 0.0
         data = extract_fn(file_path)
-        duration = time.time() - start
+        duration = time.perf_counter() - start if DEBUG_TIMING else 0.0
 
         return {
             "file": file_path,
@@ -42,15 +72,28 @@ def extract_single_file(file_path: str, extract_fn: Callable) -> Dict[str, Any]:
             "success": False,
             "data": None,
             "error": str(e),
-            "duration": 0
+            "duration": 0.0
         }
 
 
+def _log_extraction_summary(results: List[Dict[str, Any]]):
+    """Bilan unique après extraction (détail par fichier en DEBUG) au lieu d'un print par fichier"""
+    if logger.isEnabledFor(logging.DEBUG):
+        for r in results:
+            logger.debug("%s %s (%.2fs)", "✅" if r["success"] else "❌", os.path.basename(r["file"]), r["duration"])
+
+    failed = [os.path.basename(r["file"]) for r in results if not r["success"]]
+    print(f"✅ {len(results) - len(failed)}/{len(results)} fichiers extraits avec succès")
+    if failed:
+        print(f"❌ Échecs: {', '.join(failed)}")
+
+
 def parallel_extract_files(
     file_paths: List[str],
     extract_fn: Callable,
     max_workers: int = 4,
-    progress_callback: Optional[Callable[[int, int], None]] = None
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    per_file_timeout: Optional[float] = EXTRACTION_TIMEOUT_S
 ) -> List[Dict[str, Any]]:
     """
     Extrait plusieurs fichiers en parallèle avec ThreadPoolExecutor
@@ -60,89 +103,245 @@ def parallel_extract_files(
         extract_fn: Fonction d'extraction
         max_workers: Nombre de threads (défaut: 4)
         progress_callback: Callback(current, total) pour progression
+        per_file_timeout: Délai max d'extraction d'un fichier, compté depuis son démarrage
+            (None: pas de limite). Un fichier hors délai est marqué en échec; son thread ne peut
+            pas être interrompu et se termine en arrière-plan, sans bloquer le retour
 
     Returns:
         Liste de résultats [{file, success, data, error, duration}, ...]
     """
-    results = []
     total = len(file_paths)
+    results: List[Optional[Dict[str, Any]]] = [None] * total
+    started: Dict[int, float] = {}  # Position → instant de démarrage effectif (hors attente en file)
+    completed = 0
 
     print(f"🔄 Extraction parallèle de {total} fichiers ({max_workers} workers)")
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Soumettre tous les jobs
-        future_to_file = {
-            executor.submit(extract_single_file, fp, extract_fn): fp
-            for fp in file_paths
+    def run(index: int, file_path: str) -> Dict[str, Any]:
+        started[index] = time.monotonic()
+        return extract_single_file(file_path, extract_fn)
+
+    def record(index: int, result: Dict[str, Any]):
+        nonlocal completed
+        results[index] = result  # Rangé directement à sa place
+        completed += 1
+        if progress_callback:
+            progress_callback(completed, total)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        # Soumettre tous les jobs (future → position d'origine)
+        pending = {
+            executor.submit(run, i, fp): i
+            for i, fp in enumerate(file_paths)
         }
 
-        # Collecter les résultats au fur et à mesure
-        completed = 0
-        for future in as_completed(future_to_file):
-            result = future.result()
-            results.append(result)
+        # Collecter les résultats au fur et à mesure; vérifier les délais entre deux complétions
+        while pending:
+            done, _ = wait(
+                pending,
+                timeout=EXTRACTION_POLL_S if per_file_timeout else None,
+                return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                record(pending.pop(future), future.result())
+
+            if per_file_timeout:
+                now = time.monotonic()
+                for future, index in list(pending.items()):
+                    if index in started and now - started[index] > per_file_timeout:
+                        future.cancel()
+                        del pending[future]
+                        record(index, {
+                            "file": file_paths[index],
+                            "success": False,
+                            "data": None,
+                            "error": f"Timeout après {per_file_timeout}s",
+                            "duration": 0.0
+                        })
+    finally:
+        # Pas d'attente des threads encore bloqués sur un fichier hors délai
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    _log_extraction_summary(results)
 
-            completed += 1
-            if progress_callback:
-                progress_callback(completed, total)
+    return results
 
-            status = "✅" if result["success"] else "❌"
-            filename = os.path.basename(result["file"])
-            print(f"  {status} {filename} ({result['duration']:.2f}s)")
 
-    # Trier par ordre original
-    results.sort(key=lambda r: file_paths.index(r["file"]))
+# ==================== APPELS LLM PARALLÈLES AVEC ASYNC ====================
 
-    successes = sum(1 for r in results if r["success"])
-    print(f"✅ {successes}/{total} fichiers extraits avec succès")
+def create_async_openai_client(api_key: str, max_concurrent: int) -> AsyncOpenAI:
+    """
+    Client AsyncOpenAI avec pool httpx dimensionné pour la concurrence des appels
 
-    return results
+    Args:
+        api_key: Clé API OpenAI
+        max_concurrent: Nombre max d'appels simultanés
+
+    Returns:
+        Client AsyncOpenAI (à utiliser sur un seul event loop)
+    """
+    return AsyncOpenAI(
+        api_key=api_key,
+        http_client=httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_concurrent * 2,
+                max_keepalive_connections=max_concurrent,
+                keepalive_expiry=LLM_KEEPALIVE_EXPIRY_S
+            ),
+            timeout=httpx.Timeout(LLM_TIMEOUT_S, connect=LLM_CONNECT_TIMEOUT_S)
+        )
+    )
 
 
-# ==================== APPELS LLM PARALLÈLES AVEC ASYNC ====================
+class RpmTpmLimiter:
+    """
+    Rate limiter à deux seaux (requêtes/min et tokens/min), partagé par tous les appels
+    vers le même endpoint: lisse les rafales sous les limites du fournisseur (pas de tempête de 429)
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = DEFAULT_TOKENS_PER_MINUTE
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = TokenBucket(rate=requests_per_minute / 60)
+        self._tokens = TokenBucket(rate=tokens_per_minute / 60)
+
+    async def acquire(self, estimated_tokens: int):
+        """Réserve une requête et ses tokens estimés (attend si un des seaux est vide)"""
+        await self._requests.acquire()
+        await self._tokens.acquire(estimated_tokens)
+
+
+class LlmClientPool:
+    """
+    Répartit les appels LLM sur plusieurs clients (clés API, déploiements Azure multi-régions):
+    chaque client a sa propre concurrence et son propre limiteur RPM/TPM, les quotas étant par clé.
+    Un appel va au client le moins chargé (appels en cours ou en attente).
+    Pas de lock: un seul event loop, le choix du client est synchrone
+    """
+
+    def __init__(
+        self,
+        clients: List[Any],
+        max_concurrent_per_client: int = 5,
+        requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = DEFAULT_TOKENS_PER_MINUTE
+    ):
+        if not clients:
+            raise ValueError("LlmClientPool: au moins un client requis")
+        self.clients = list(clients)
+        self.semaphores = [asyncio.Semaphore(max_concurrent_per_client) for _ in self.clients]
+        self.rate_limiters = [RpmTpmLimiter(requests_per_minute, tokens_per_minute) for _ in self.clients]
+        self.inflight = [0] * len(self.clients)
+
+    def acquire(self) -> int:
+        """Choisit le client le moins chargé et le marque occupé (index du client)"""
+        index = min(range(len(self.clients)), key=self.inflight.__getitem__)
+        self.inflight[index] += 1
+        return index
+
+    def release(self, index: int):
+        """Libère le client après son appel"""
+        self.inflight[index] -= 1
+
+
+def estimate_prompt_tokens(messages: List[Dict[str, str]]) -> int:
+    """Estimation des tokens d'un prompt (~4 caractères par token)"""
+    return sum(len(m.get("content") or "") for m in messages) // CHARS_PER_TOKEN + 1
+
+
+def call_signature(call: Dict[str, Any]) -> str:
+    """Empreinte d'un appel: deux appels de même empreinte reçoivent la même réponse"""
+    payload = json.dumps(
+        [call["model"], call["messages"], call.get("response_format", {"type": "json_object"})],
+        sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _is_cacheable_response(content: Optional[str], response_format: Optional[Dict[str, str]], finish_reason: Optional[str]) -> bool:
+    """
+    Vrai si la réponse peut aller dans le cache disque: complète et, en mode JSON, parsable
+    (une réponse tronquée ou invalide serait sinon resservie à chaque relance)
+    """
+    if not content or finish_reason == "length":
+        return False
+    if (response_format or {}).get("type") != "json_object":
+        return True
+
+    from lib.cv_parsing import clean_json_text
+    try:
+        json.loads(clean_json_text(content))
+        return True
+    except (json.JSONDecodeError, TypeError):
+        return False
+
 
 async def async_llm_call(
     client: Any,
     model: str,
     messages: List[Dict[str, str]],
     response_format: Dict[str, str],
-    temperature: float,
     semaphore: asyncio.Semaphore,
-    call_id: str
+    call_id: str,
+    rate_limiter: Optional[RpmTpmLimiter] = None,
+    cache_key: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     Appel LLM asynchrone avec semaphore (rate limiting)
 
     Args:
-        client: Client OpenAI
+        client: Client AsyncOpenAI
         model: Modèle (ex: gpt-5-mini)
         messages: Messages du prompt
         response_format: Format de réponse {"type": "json_object"}
-        temperature: Température
         semaphore: Semaphore pour limiter la concurrence
         call_id: ID de l'appel (pour debug)
+        rate_limiter: Limiteur RPM/TPM partagé (optionnel)
+        cache_key: Clé du cache disque des réponses (optionnel, voir llm_cache.make_key);
+            seules les réponses complètes et JSON valides sont mises en cache
 
     Returns:
         {"call_id": ..., "success": bool, "response": ..., "error": ...}
     """
+    # Réponse déjà en cache: ni débit ni slot de concurrence consommés
+    if cache_key is not None:
+        cached = await asyncio.to_thread(llm_cache.get, cache_key)
+        if cached is not None:
+            return {
+                "call_id": call_id,
+                "success": True,
+                "response": cached,
+                "error": None,
+                "duration": 0.0
+            }
+
+    # Débit (RPM/TPM) réservé avant la concurrence: un appel en attente de débit n'occupe pas de slot
+    if rate_limiter is not None:
+        await rate_limiter.acquire(estimate_prompt_tokens(messages))
+
     async with semaphore:  # Limite le nombre d'appels simultanés
         try:
-            start = time.time()
-
-            # Appel synchrone dans un thread (OpenAI n'a pas d'API async native)
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                partial(
-                    client.chat.completions.create,
-                    model=model,
-                    messages=messages,
-                    response_format=response_format,
-                        )
+            start = time.perf_counter() if DEBUG_TIMING else 0.0
+
+            # Appel async natif: I/O non bloquante sur l'event loop, sans thread par appel
+            # GPT-5 mini ne supporte PAS le paramètre temperature (erreur 400 si fourni)
+            response = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                response_format=response_format
             )
 
-            duration = time.time() - start
-            content = response.choices[0].message.content
+            duration = time.perf_counter() - start if DEBUG_TIMING else 0.0
+            choice = response.choices[0]
+            content = choice.message.content
+
+            if cache_key is not None and _is_cacheable_response(content, response_format, getattr(choice, "finish_reason", None)):
+                await asyncio.to_thread(llm_cache.put, cache_key, content)
 
             return {
                 "call_id": call_id,
@@ -158,54 +357,84 @@ async def async_llm_call(
                 "success": False,
                 "response": None,
                 "error": str(e),
-                "duration": 0
+                "duration": 0.0
             }
 
 
 async def parallel_llm_calls(
     client: Any,
     calls: List[Dict[str, Any]],
-    max_concurrent: int = 5
+    max_concurrent: int = 5,
+    rate_limiter: Optional[RpmTpmLimiter] = None
 ) -> List[Dict[str, Any]]:
     """
     Effectue plusieurs appels LLM en parallèle avec rate limiting
 
     Args:
-        client: Client OpenAI
+        client: Client AsyncOpenAI, ou LlmClientPool pour répartir les appels sur plusieurs clés
+            (concurrence et débit sont alors ceux du pool, par client)
         calls: Liste de dicts avec:
             - call_id: Identifiant unique
             - model: Modèle
             - messages: Messages
             - response_format: Format réponse
-            - temperature: Température
+            - cache_key: Clé du cache disque des réponses (optionnel)
         max_concurrent: Nombre max d'appels simultanés (défaut: 5)
+        rate_limiter: Limiteur RPM/TPM partagé (optionnel)
 
     Returns:
         Liste de résultats [{call_id, success, response, error, duration}, ...]
     """
     semaphore = asyncio.Semaphore(max_concurrent)
 
+    # Appels identiques (même modèle, messages et format) regroupés: un seul appel par prompt
+    unique: Dict[str, List[int]] = {}
+    for i, call in enumerate(calls):
+        unique.setdefault(call_signature(call), []).append(i)
+
     print(f"🔄 Appels LLM parallèles: {len(calls)} appels ({max_concurrent} max concurrent)")
+    if len(unique) < len(calls):
+        print(f"♻️ {len(calls) - len(unique)} appel(s) en double: réponse LLM partagée")
+
+    async def run_call(call: Dict[str, Any]) -> Dict[str, Any]:
+        request = {
+            "model": call["model"],
+            "messages": call["messages"],
+            "response_format": call.get("response_format", {"type": "json_object"}),
+            "call_id": call["call_id"],
+            "cache_key": call.get("cache_key")
+        }
+        if not isinstance(client, LlmClientPool):
+            return await async_llm_call(
+                client=client, semaphore=semaphore, rate_limiter=rate_limiter, **request
+            )
 
-    tasks = [
-        async_llm_call(
-            client=client,
-            model=call["model"],
-            messages=call["messages"],
-            response_format=call.get("response_format", {"type": "json_object"}),
-            semaphore=semaphore,
-            call_id=call["call_id"]
-        )
-        for call in calls
-    ]
+        # Plusieurs clients: concurrence et débit propres au client choisi
+        index = client.acquire()
+        try:
+            return await async_llm_call(
+                client=client.clients[index],
+                semaphore=client.semaphores[index],
+                rate_limiter=client.rate_limiters[index],
+                **request
+            )
+        finally:
+            client.release(index)
 
-    results = await asyncio.gather(*tasks)
+    tasks = [run_call(calls[indices[0]]) for indices in unique.values()]
 
-    successes = sum(1 for r in results if r["success"])
-    total_duration = sum(r["duration"] for r in results)
-    avg_duration = total_duration / len(results) if results else 0
+    # Redistribuer chaque réponse à tous les call_id de son groupe, dans l'ordre d'origine
+    results: List[Dict[str, Any]] = [None] * len(calls)
+    for indices, result in zip(unique.values(), await asyncio.gather(*tasks)):
+        for i in indices:
+            results[i] = {**result, "call_id": calls[i]["call_id"]}
 
-    print(f"✅ {successes}/{len(calls)} appels réussis (durée moy: {avg_duration:.2f}s)")
+    successes = sum(1 for r in results if r["success"])
+    if DEBUG_TIMING and results:
+        avg_duration = sum(r["duration"] for r in results) / len(results)
+        print(f"✅ {successes}/{len(calls)} appels réussis (durée moy: {avg_duration:.2f}s)")
+    else:
+        print(f"✅ {successes}/{len(calls)} appels réussis")
 
     return results
 
@@ -213,20 +442,62 @@ async def parallel_llm_calls(
 def run_parallel_llm_calls(
     client: Any,
     calls: List[Dict[str, Any]],
-    max_concurrent: int = 5
+    max_concurrent: int = 5,
+    rate_limiter: Optional[RpmTpmLimiter] = None
 ) -> List[Dict[str, Any]]:
     """
-    Version synchrone wrapper pour parallel_llm_calls
+    Version synchrone wrapper pour parallel_llm_calls.
+    Exécutée sur l'event loop partagé: le client async garde son pool HTTP d'un batch à l'autre
 
     Args:
-        client: Client OpenAI
+        client: Client AsyncOpenAI ou LlmClientPool
         calls: Liste de calls (voir parallel_llm_calls)
         max_concurrent: Nombre max d'appels simultanés
+        rate_limiter: Limiteur RPM/TPM partagé (optionnel)
 
     Returns:
         Liste de résultats
     """
-    return asyncio.run(parallel_llm_calls(client, calls, max_concurrent))
+    return run_sync(parallel_llm_calls(client, calls, max_concurrent, rate_limiter))
+
+
+async def batch_api_llm_calls(
+    client: Any,
+    calls: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    Effectue les appels via l'API Batch d'OpenAI (coût /2, pas de limite RPM, latence en minutes)
+
+    Args:
+        client: Client AsyncOpenAI
+        calls: Liste de calls (voir parallel_llm_calls), call_id uniques
+
+    Returns:
+        Liste de résultats [{call_id, success, response, error, duration}, ...] dans l'ordre de calls
+    """
+    print(f"📦 Appels LLM via l'API Batch: {len(calls)} appels")
+    start = time.time()
+
+    requests = [
+        build_chat_request(str(call["call_id"]), {
+            "model": call["model"],
+            "messages": call["messages"],
+            "response_format": call.get("response_format", {"type": "json_object"})
+        })
+        for call in calls
+    ]
+    results_by_id = await run_batch(client, requests)
+    duration = time.time() - start
+
+    results = [
+        {"call_id": call["call_id"], **results_by_id[str(call["call_id"])], "duration": duration}
+        for call in calls
+    ]
+
+    successes = sum(1 for r in results if r["success"])
+    print(f"✅ {successes}/{len(calls)} appels réussis (lot terminé en {duration:.0f}s)")
+
+    return results
 
 
 # ==================== VALIDATION BATCH AVEC LLM RETRY ====================
@@ -291,7 +562,13 @@ class ParallelPipeline:
         self,
         max_file_workers: int = 4,
         max_llm_concurrent: int = 5,
-        openai_client: Any = None
+        openai_client: Any = None,
+        requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = DEFAULT_TOKENS_PER_MINUTE,
+        batch_mode: bool = False,
+        batch_threshold: int = BATCH_API_MIN_CALLS,
+        openai_clients: Optional[List[Any]] = None,
+        prewarm: bool = False
     ):
         """
         Initialise le pipeline
@@ -299,11 +576,59 @@ class ParallelPipeline:
         Args:
             max_file_workers: Threads pour extraction fichiers
             max_llm_concurrent: Appels LLM simultanés max
-            openai_client: Client OpenAI
+            openai_client: Client AsyncOpenAI (appels LLM non bloquants)
+            requests_per_minute: Limite de requêtes par minute du compte OpenAI
+            tokens_per_minute: Limite de tokens par minute du compte OpenAI
+            batch_mode: Autorise l'API Batch OpenAI pour les gros volumes (non interactif)
+            batch_threshold: Nombre d'appels au-delà duquel le mode lot est utilisé
+            openai_clients: Clients AsyncOpenAI de plusieurs clés/déploiements (remplace openai_client):
+                les appels sont répartis, limites de concurrence et de débit appliquées par client
+            prewarm: Préchauffe le pool de connexions dès la construction (en arrière-plan, voir pre_warm)
         """
         self.max_file_workers = max_file_workers
         self.max_llm_concurrent = max_llm_concurrent
-        self.openai_client = openai_client
+        self.openai_clients = list(openai_clients) if openai_clients else ([openai_client] if openai_client else [])
+        self.openai_client = self.openai_clients[0] if self.openai_clients else None
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        # Un seul limiteur pour tous les batchs du pipeline (même endpoint, mêmes quotas)
+        self.rate_limiter = RpmTpmLimiter(requests_per_minute, tokens_per_minute)
+        # Plusieurs clés: un limiteur et une concurrence par clé (les quotas OpenAI sont par clé)
+        self.client_pool = LlmClientPool(
+            self.openai_clients, max_llm_concurrent, requests_per_minute, tokens_per_minute
+        ) if len(self.openai_clients) > 1 else None
+        self.batch_mode = batch_mode
+        self.batch_threshold = batch_threshold
+
+        # Poignées de main TLS faites pendant que l'appelant prépare son premier batch
+        self._prewarm_future = run_background(self._prewarm()) if prewarm and self.openai_clients else None
+
+    async def _prewarm(self) -> int:
+        """Requêtes légères en parallèle pour remplir le pool keep-alive; retourne le nombre de succès"""
+        results = await asyncio.gather(
+            *(
+                client.models.list()
+                for client in self.openai_clients
+                for _ in range(self.max_llm_concurrent)
+            ),
+            return_exceptions=True
+        )
+        opened = sum(1 for r in results if not isinstance(r, Exception))
+        print(f"🔥 {opened}/{len(results)} connexions LLM préchauffées")
+        return opened
+
+    def pre_warm(self) -> int:
+        """
+        Ouvre à l'avance max_llm_concurrent connexions par client (requêtes légères en parallèle):
+        les premiers appels LLM n'ont plus à payer la poignée de main TCP+TLS
+
+        Returns:
+            Nombre de requêtes de préchauffage réussies
+        """
+        if not self.openai_client:
+            raise ValueError("OpenAI client non configuré")
+
+        return run_sync(self._prewarm())
 
     def extract_files(
         self,
@@ -323,14 +648,18 @@ class ParallelPipeline:
         self,
         calls: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
-        """Traite un batch d'appels LLM en parallèle"""
+        """Traite un batch d'appels LLM en parallèle (API Batch OpenAI si mode lot et gros volume)"""
         if not self.openai_client:
             raise ValueError("OpenAI client non configuré")
 
+        if self.batch_mode and len(calls) > self.batch_threshold:
+            return run_sync(batch_api_llm_calls(self.openai_client, calls))
+
         return run_parallel_llm_calls(
-            self.openai_client,
+            self.client_pool or self.openai_client,
             calls,
-            max_concurrent=self.max_llm_concurrent
+            max_concurrent=self.max_llm_concurrent,
+            rate_limiter=self.rate_limiter
         )
 
     async def validate_batch(
@@ -388,8 +717,8 @@ if __name__ == "__main__":
                 })()]
 
         class MockCompletions:
-            def create(self, **kwargs):
-                time.sleep(0.3)  # Simule latence API
+            async def create(self, **kwargs):
+                await asyncio.sleep(0.3)  # Simule latence API
                 return MockClient.MockResponse()
 
         def __init__(self):
@@ -404,8 +733,7 @@ if __name__ == "__main__":
             "call_id": f"call_{i}",
             "model": "gpt-5-mini",
             "messages": [{"role": "user", "content": "Test"}],
-            "response_format": {"type": "json_object"},
-            "temperature": 1
+            "response_format": {"type": "json_object"}
         }
         for i in range(10)
     ]
@@ -12,24 +12,40 @@ Les CVs sont maintenant stockés dans: enterprises/{id}/projects/{id}/cvs_parsed
 
 import os
 import json
+import functools
+import hashlib
 import fitz # PyMuPDF
 import re
 import docx2txt
 from pathlib import Path
 from dotenv import load_dotenv
+import json_io
+import llm_cache
 
 # Charger les variables d'environnement
 load_dotenv()
 
 # 1. Configuration de l'API
+import httpx
 from openai import OpenAI
 
+# Seed lu une fois au chargement du module (déterminisme des réponses), pas à chaque appel
+from config_loader import get_config
+_LLM_SEED = get_config().get("llm", {}).get("seed", 42)
+
 # Récupérer la clé API depuis les variables d'environnement
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
     raise ValueError("❌ OPENAI_API_KEY non trouvée dans les variables d'environnement")
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+# Client réutilisé pour tous les appels: connexions keep-alive (pas de TCP+TLS par requête)
+client = OpenAI(
+    api_key=OPENAI_API_KEY,
+    http_client=httpx.Client(
+        limits=httpx.Limits(max_connections=10, max_keepalive_connections=5, keepalive_expiry=60),
+        timeout=httpx.Timeout(60, connect=10)
+    )
+)
 
 # 2. Prompt global pour extraire toutes les infos du CV
 PROMPT_CV_EXTRACTION = """
@@ -122,32 +138,81 @@ Structure à respecter :
 **RAPPEL FINAL** : Avant de répondre, vérifie une dernière fois que tu as extrait TOUTES les informations du CV, sans aucune omission. L'exhaustivité est cruciale.
 """
 
-# 3.1. Extraire le texte brut du PDF
-def extract_text_from_pdf(pdf_path):
+# Consigne ajoutée après PROMPT_CV_EXTRACTION pour extraire plusieurs CVs en un seul appel
+PROMPT_CV_EXTRACTION_BATCH = """Tu reçois {k} CVs, chacun précédé d'un marqueur "=== cv_n ===" donnant son identifiant.
+Applique les instructions ci-dessus à chaque CV, indépendamment des autres.
+Réponds avec un objet JSON {{"cvs": [...]}} contenant un objet par CV, chacun avec un champ "cv_id"
+reprenant l'identifiant de son marqueur.
+Identifiants attendus (un objet par identifiant): {ids}"""
+
+# Nombre de CVs par appel: 1 = un appel par CV (défaut), lots activés via CV_BATCH_SIZE (2, 4, 8...)
+CV_BATCH_SIZE = 1
+
+# 3. Cache du texte extrait: clé (chemin, taille, mtime), un fichier modifié est donc re-parsé.
+# Mémoire (process) puis disque (cache/text/), pour éviter de re-parser d'une exécution à l'autre
+TEXT_CACHE_DIR = Path(__file__).parent / "cache" / "text"
+
+
+def _parse_pdf(pdf_path):
     #la librairie PyMuPDF (fitz) pour extraire le texte de toutes les pages du PDF
-    doc = fitz.open(pdf_path)
-    text = ""
-    for page in doc:
-        text += page.get_text()
+    # join: une seule allocation finale (pas de recopie à chaque page), "with" ferme le document
+    with fitz.open(pdf_path) as doc:
+        return "".join(page.get_text("text") for page in doc)
+
+
+_PARSERS = {".pdf": _parse_pdf, ".docx": docx2txt.process}
+
+
+@functools.lru_cache(maxsize=1024)
+def _cached_text(path, size, mtime_ns, ext):
+    """Texte d'un fichier dans une version donnée (taille, mtime): disque, sinon parsing"""
+    key = hashlib.sha1(f"{path}\0{size}\0{mtime_ns}".encode("utf-8")).hexdigest()
+    cache_file = TEXT_CACHE_DIR / key[:2] / f"{key}.txt"
+    try:
+        return cache_file.read_text(encoding="utf-8")
+    except OSError:
+        pass
+
+    text = _PARSERS[ext](path)
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, cache_file)
+    except OSError as e:
+        print(f"⚠️ Cache texte non écrit sur disque: {e}")
     return text
+
+
+def _extract_cached(path, ext):
+    st = os.stat(path)
+    return _cached_text(os.path.abspath(path), st.st_size, st.st_mtime_ns, ext)
+
+
+# 3.1. Extraire le texte brut du PDF
+def extract_text_from_pdf(pdf_path):
+    return _extract_cached(pdf_path, ".pdf")
 # 3.2. Extraction texte du DOCX
 def extract_text_from_docx(docx_path):
-    return docx2txt.process(docx_path)
+    return _extract_cached(docx_path, ".docx")
 
 # 4. Analyse d'un texte avec le prompt global
 def analyze_text(text, prompt_text, model_name="gpt-5-mini"):
     """Analyse un texte avec OpenAI en utilisant response_format JSON"""
     import time
 
+    # Même modèle + même prompt + même texte → réponse déjà obtenue, relue sur disque
+    cache_key = llm_cache.make_key(model_name, prompt_text, text)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        print(f"[DEBUG] Réponse lue dans le cache LLM ({len(cached)} caractères)")
+        return cached
+
     api_call_start = time.time()
     print(f"[DEBUG] Appel API OpenAI démarré à {time.strftime('%H:%M:%S')}")
     print(f"[DEBUG] Modèle: {model_name}")
     print(f"[DEBUG] Input tokens estimés: {(len(prompt_text) + len(text)) // 4}")
 
-    # Charger le seed depuis la config pour le déterminisme
-    from config_loader import get_config
-    seed = get_config().get("llm", {}).get("seed", 42)
-    
     response = client.chat.completions.create(
         model=model_name,
         messages=[
@@ -155,7 +220,7 @@ def analyze_text(text, prompt_text, model_name="gpt-5-mini"):
             {"role": "user", "content": f"{prompt_text}\n\n{text}"}
         ],
         response_format={"type": "json_object"},
-        seed=seed  # Déterminisme: même seed = mêmes résultats
+        seed=_LLM_SEED  # Déterminisme: même seed = mêmes résultats
         # GPT-5 mini: pas de paramètre temperature (erreur 400 si fourni)
         # PAS DE TIMEOUT - laissons l'API prendre son temps pour diagnostiquer
     )
@@ -173,19 +238,155 @@ def analyze_text(text, prompt_text, model_name="gpt-5-mini"):
     content = response.choices[0].message.content
     print(f"[DEBUG] Longueur réponse: {len(content)} caractères")
 
+    # Seules les réponses JSON valides sont mises en cache (une réponse tronquée serait resservie)
+    try:
+        json_io.loads(clean_json_text(content))
+        llm_cache.put(cache_key, content)
+    except (json.JSONDecodeError, TypeError):
+        pass
+
     return content
 
 
+# 4.1. Analyse de plusieurs CVs par appel (prompt d'extraction amorti sur le lot)
+def build_cv_batch(cv_texts):
+    """
+    Prépare un lot de CVs pour un seul appel: identifiants positionnels cv_1..cv_k
+
+    Args:
+        cv_texts: Textes bruts des CVs du lot
+
+    Returns:
+        Tuple (consigne de lot à ajouter après PROMPT_CV_EXTRACTION, blocs des CVs marqués)
+    """
+    cv_ids = [f"cv_{i}" for i in range(1, len(cv_texts) + 1)]
+    instructions = PROMPT_CV_EXTRACTION_BATCH.format(k=len(cv_ids), ids=json.dumps(cv_ids))
+    blocks = "\n\n".join(f"=== {cv_id} ===\n{text}" for cv_id, text in zip(cv_ids, cv_texts))
+    return instructions, blocks
+
+
+def map_cv_batch(parsed, k):
+    """
+    Replace les objets d'une réponse de lot sur leur CV par "cv_id", pas par position:
+    le modèle peut réordonner ou fusionner des entrées
+
+    Args:
+        parsed: Valeur de la clé "cvs" de la réponse
+        k: Nombre de CVs du lot
+
+    Returns:
+        Liste de k dicts extraits (sans cv_id), None pour un identifiant absent ou en double
+    """
+    by_id = {}
+    duplicated = set()
+    for data in parsed if isinstance(parsed, list) else []:
+        if not isinstance(data, dict):
+            continue
+        cv_id = data.pop("cv_id", None)
+        if cv_id in by_id:
+            duplicated.add(cv_id)
+        by_id[cv_id] = data
+    return [None if cv_id in duplicated else by_id.get(cv_id) for cv_id in (f"cv_{i}" for i in range(1, k + 1))]
+
+
+def batch_extract_cvs(cv_texts, batch_size=CV_BATCH_SIZE, model_name="gpt-5-mini"):
+    """
+    Extrait plusieurs CVs par appel LLM; repli sur un appel par CV pour chaque CV dont
+    l'identifiant est absent ou en double dans la réponse du lot
+
+    Args:
+        cv_texts: Liste des textes bruts des CVs
+        batch_size: Nombre de CVs par appel
+        model_name: Modèle OpenAI
+
+    Returns:
+        Liste (même ordre que cv_texts) de dicts extraits, None pour un CV dont le JSON est invalide
+    """
+    batch_size = max(1, batch_size)
+    results = []
+
+    for start in range(0, len(cv_texts), batch_size):
+        batch = cv_texts[start:start + batch_size]
+
+        mapped = [None] * len(batch)
+        if len(batch) > 1:
+            instructions, blocks = build_cv_batch(batch)
+            prompt = f"{PROMPT_CV_EXTRACTION}\n\n{instructions}"
+            try:
+                mapped = map_cv_batch(json_io.loads(clean_json_text(analyze_text(blocks, prompt, model_name))).get("cvs"), len(batch))
+                missing = mapped.count(None)
+                if missing:
+                    print(f"⚠️ Lot de {len(batch)} CVs: {missing} CV(s) absent(s) ou en double → un appel par CV")
+            except (json.JSONDecodeError, AttributeError) as e:
+                print(f"⚠️ Lot de {len(batch)} CVs: JSON invalide ({e}) → un appel par CV")
+
+        for text, data in zip(batch, mapped):
+            if data is None:
+                try:
+                    data = json_io.loads(clean_json_text(analyze_text(text, PROMPT_CV_EXTRACTION, model_name)))
+                except json.JSONDecodeError:
+                    pass
+            results.append(data)
+
+    return results
+
+
+# 4.2. Analyse hors ligne via l'API Batch d'OpenAI (gros dossiers, coût /2, résultat en minutes)
+def batch_extract_offline(cv_paths, model_name="gpt-5-mini"):
+    """
+    Extrait les CVs via l'API Batch d'OpenAI (dépôt JSONL → attente → collecte)
+
+    Args:
+        cv_paths: Chemins des CVs (PDF/DOCX)
+        model_name: Modèle OpenAI
+
+    Returns:
+        Dict {chemin: dict extrait ou None si extraction/JSON invalide}
+    """
+    from openai import AsyncOpenAI
+    from openai_batch import build_chat_request, run_batch
+    from retry_runner import run_sync
+
+    requests = []
+    for path in map(str, cv_paths):
+        ext = os.path.splitext(path)[-1].lower()
+        text = extract_text_from_pdf(path) if ext == ".pdf" else extract_text_from_docx(path)
+        requests.append(build_chat_request(path, {
+            "model": model_name,
+            "messages": [
+                {"role": "system", "content": "Tu es un assistant qui analyse des CV. Tu réponds UNIQUEMENT en JSON valide."},
+                {"role": "user", "content": f"{PROMPT_CV_EXTRACTION}\n\n{text}"}
+            ],
+            "response_format": {"type": "json_object"},
+            "seed": _LLM_SEED
+        }))
+
+    results = run_sync(run_batch(AsyncOpenAI(api_key=OPENAI_API_KEY), requests))
+
+    extracted = {}
+    for path, result in results.items():
+        try:
+            extracted[path] = json_io.loads(clean_json_text(result["response"])) if result["success"] else None
+        except json.JSONDecodeError:
+            extracted[path] = None
+        if extracted[path] is None:
+            print(f"  └─ ❌ {os.path.basename(path)}: {result['error'] or 'JSON invalide'}")
+    return extracted
+
+
 # 5. Nettoyage json
 # ce script ajoute pour corriger la generation d'une output sous forme json
 # consiste a nettoyer le texte avent de le convertir en objet json
+_RE_FENCE_OPEN = re.compile(r"```(?:json)?\s*")
+_RE_FENCE_CLOSE = re.compile(r"\s*```")
+_SMART_QUOTE_TRANSLATE = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+
 def clean_json_text(text):
     # Supprime les balises de code Markdown éventuelles (```json ... ```)
-    text = re.sub(r"```(?:json)?\s*", "", text)
-    text = re.sub(r"\s*```", "", text)
-    # Optionnel : remplace les guillemets typographiques par des guillemets simples
-    text = text.replace("“", '"').replace("”", '"').replace("‘", "'").replace("’", "'")
-    return text.strip()
+    text = _RE_FENCE_OPEN.sub("", text)
+    text = _RE_FENCE_CLOSE.sub("", text)
+    # Optionnel : remplace les guillemets typographiques (une seule passe)
+    return text.translate(_SMART_QUOTE_TRANSLATE).strip()
 
 #offre to json
 job_text = """
@@ -301,13 +502,12 @@ def main():
     job_cleaned = clean_json_text(job_raw_result)
 
     try:
-        job_data = json.loads(job_cleaned)
+        job_data = json_io.loads(job_cleaned)
         print("✅ Offre extraite avec succès")
 
         # Sauvegarde de l'offre au format JSON
         offre_output_path = os.path.join(offre_output_folder, "offre_extrait.json")
-        with open(offre_output_path, "w", encoding="utf-8") as f:
-            json.dump(job_data, f, ensure_ascii=False, indent=4)
+        json_io.write_json(offre_output_path, job_data)
         print(f"💾 Offre sauvegardée dans : {offre_output_path}")
 
     except json.JSONDecodeError:
@@ -330,36 +530,38 @@ def main():
 
     print(f"\n📁 Traitement de {len(cv_files)} CV(s)...")
 
-    for filename in cv_files:
-        file_path = os.path.join(cv_folder, filename)
-        ext = os.path.splitext(filename)[-1].lower()
-
-        print(f"\n📄 Traitement de : {filename}")
-        print(f"  └─ Extraction du texte...")
-
-        if ext == ".pdf":
-            cv_text = extract_text_from_pdf(file_path)
-        elif ext == ".docx":
-            cv_text = extract_text_from_docx(file_path)
-
-        print(f"  └─ Analyse du CV avec OpenAI...")
-        result = analyze_text(cv_text, PROMPT_CV_EXTRACTION)
-        cleaned_result = clean_json_text(result)
-
-        try:
-            extracted_data = json.loads(cleaned_result)
-        except json.JSONDecodeError:
-            print(f"  └─ ❌ JSON invalide pour {filename}. Résultat brut sauvegardé.")
-            raw_output_path = os.path.join(json_output_folder, f"{filename}_raw.txt")
-            with open(raw_output_path, "w", encoding="utf-8") as f:
-                f.write(result)
+    if os.getenv("CV_BATCH_OFFLINE") == "1":
+        # Gros dossier sans attente interactive: API Batch d'OpenAI (coût /2, résultat en minutes)
+        cv_paths = [os.path.join(cv_folder, filename) for filename in cv_files]
+        print(f"\n📦 Analyse des CVs via l'API Batch d'OpenAI (hors ligne, plusieurs minutes)...")
+        by_path = batch_extract_offline(cv_paths)
+        extracted = [by_path.get(path) for path in cv_paths]
+    else:
+        batch_size = int(os.getenv("CV_BATCH_SIZE", CV_BATCH_SIZE))
+
+        cv_texts = []
+        for filename in cv_files:
+            file_path = os.path.join(cv_folder, filename)
+            ext = os.path.splitext(filename)[-1].lower()
+
+            print(f"📄 Extraction du texte : {filename}")
+            if ext == ".pdf":
+                cv_texts.append(extract_text_from_pdf(file_path))
+            elif ext == ".docx":
+                cv_texts.append(extract_text_from_docx(file_path))
+
+        print(f"\n🤖 Analyse des CVs avec OpenAI ({batch_size} CV(s) par appel)...")
+        extracted = batch_extract_cvs(cv_texts, batch_size=batch_size)
+
+    for filename, extracted_data in zip(cv_files, extracted):
+        if extracted_data is None:
+            print(f"  └─ ❌ JSON invalide pour {filename}")
             continue
 
         json_filename = os.path.splitext(filename)[0] + ".json"
         json_path = os.path.join(json_output_folder, json_filename)
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(extracted_data, f, ensure_ascii=False, indent=4)
-        print(f"  └─ ✅ Sauvegardé dans {json_path}")
+        json_io.write_json(json_path, extracted_data)
+        print(f"  └─ ✅ {filename} sauvegardé dans {json_path}")
 
     print(f"\n✅ Traitement terminé : {len(cv_files)} CV(s) traités")
 
@@ -7,20 +7,133 @@ Délègue au service ProjectService pour la persistance DB+JSON
 
 import json
 import os
+import re
+import time
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 import uuid
 
+import json_io
 from brainrh.services.project_service import ProjectService
 
+# Index project_id → dossier, persisté dans projects/: évite de re-parcourir enterprises/ à chaque instance
+PROJECTS_INDEX_FILE = "_index.json"
+
+# Projets et offres gardés en mémoire quelques secondes (rafales de requêtes sur le même projet).
+# Au niveau du module: les routes créent un ProjectManager par requête.
+# project_id → (instant de lecture, JSON sérialisé): chaque lecture rend une copie indépendante
+PROJECT_CACHE_TTL_S = 30
+_project_cache: Dict[str, Tuple[float, bytes]] = {}
+_offer_cache: Dict[str, Tuple[float, bytes]] = {}
+
+# Résumé d'un matching écrit à côté de ses résultats (results.json → results.meta.json):
+# list_matchings lit ce petit fichier au lieu de parser tout le scorecard
+MATCHING_META_SUFFIX = ".meta.json"
+
+# Slug d'ID projet: caractères retirés, puis blancs remplacés par des tirets
+_SLUG_REMOVE = re.compile(r'[^a-z0-9\s-]')
+_SLUG_SPACES = re.compile(r'\s+')
+
+
+def count_matching_candidates(data: Dict) -> int:
+    """Nombre de candidats d'un matching (dossier matchings/): metadata, sinon results"""
+    if "metadata" in data:
+        return data["metadata"].get("top_reranked", 0)
+    if "results" in data:
+        return len(data.get("results", []))
+    return 0
+
+
+def count_historique_candidates(data: Dict) -> int:
+    """Nombre de candidats d'un ancien matching (dossier historique/): priorité reranked_cvs > scored_cvs"""
+    if "reranked_cvs" in data:
+        reranked = data["reranked_cvs"]
+        if isinstance(reranked, list):
+            return len(reranked)
+        if isinstance(reranked, dict):
+            return len(reranked.get("ranked_cvs", []))
+        return 0
+    if "scored_cvs" in data:
+        return len(data.get("scored_cvs", []))
+    return 0
+
+
+def matching_meta_path(results_file) -> str:
+    """Chemin du résumé associé à un fichier de résultats"""
+    return str(results_file)[:-len(".json")] + MATCHING_META_SUFFIX
+
+
+def write_matching_meta(results_file, timestamp: str, candidats_count: int):
+    """Écrit le résumé d'un matching (l'échec n'est pas bloquant: list_matchings relira les résultats)"""
+    try:
+        json_io.write_json(matching_meta_path(results_file), {
+            "timestamp": timestamp,
+            "candidats_count": candidats_count
+        })
+    except OSError as e:
+        print(f"⚠️ Résumé du matching non écrit: {e}")
+
+
+def read_candidats_count(results_file: str, count_fn: Callable[[Dict], int]) -> int:
+    """Nombre de candidats depuis le résumé; repli sur les résultats complets (matchings sans résumé)"""
+    try:
+        return json_io.read_json(matching_meta_path(results_file))["candidats_count"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return count_fn(json_io.read_json(results_file))
+
+
+def has_matchings_on_disk(project_dir) -> bool:
+    """
+    Vrai si matchings/ ou historique/ contient au moins une entrée (un scandir chacun, arrêt à la
+    première entrée, aucun JSON lu). matchings_count vaut 0 pour les matchings sauvegardés par la
+    route API avant record_matching: le compteur seul ne suffit pas à conclure à un historique vide
+    """
+    for subdir in ("matchings", "historique"):
+        try:
+            with os.scandir(os.path.join(project_dir, subdir)) as entries:
+                if any(entries):
+                    return True
+        except OSError:
+            continue
+    return False
+
+
+def _cache_get(cache: Dict[str, Tuple[float, bytes]], project_id: str) -> Optional[Dict]:
+    """Copie de l'entrée en cache si elle a moins de PROJECT_CACHE_TTL_S secondes, sinon None"""
+    entry = cache.get(project_id)
+    if entry is None:
+        return None
+    if time.monotonic() - entry[0] > PROJECT_CACHE_TTL_S:
+        cache.pop(project_id, None)
+        return None
+    return json_io.loads(entry[1])
+
+
+def _cache_put(cache: Dict[str, Tuple[float, bytes]], project_id: str, data: Dict):
+    """Mémorise une entrée (sérialisée: les modifications de l'appelant n'altèrent pas le cache)"""
+    cache[project_id] = (time.monotonic(), json_io.dumps(data))
+
+
+def invalidate_project_cache(project_id: str):
+    """
+    Oublie le projet et l'offre en mémoire. À appeler par tout code qui modifie
+    projet.json ou offre_parsed.json sans passer par ProjectManager
+    """
+    _project_cache.pop(project_id, None)
+    _offer_cache.pop(project_id, None)
+
 
 class ProjectManager:
     """Gestionnaire de projets de recrutement (wrapper autour de ProjectService)"""
 
     def __init__(self, projects_folder: str = "projects"):
         self.projects_folder = Path(projects_folder)
+        # Chemins des méthodes fréquentes composés en str (os.path.join): Path seulement en retour public
+        self._projects_folder_str = str(projects_folder)
         self.service = ProjectService()
+        # project_id → dossier résolu (un projet ne change pas de dossier: pas de re-scan à chaque appel)
+        self._path_cache: Dict[str, Path] = self._load_index()
 
     def list_projects(self, status: Optional[str] = None, enterprise_id: Optional[str] = None) -> List[Dict]:
         """
@@ -51,8 +164,15 @@ class ProjectManager:
         Returns:
             Dictionnaire avec toutes les métadonnées, ou None si non trouvé
         """
+        cached = _cache_get(_project_cache, project_id)
+        if cached is not None:
+            return cached
+
         # Charger depuis le service (DB → JSON)
-        return self.service.get_project(project_id)
+        projet = self.service.get_project(project_id)
+        if projet is not None:
+            _cache_put(_project_cache, project_id, projet)
+        return projet
 
     def create_project(self, nom: str, description: str = "", enterprise_id: Optional[str] = None) -> Dict:
         """
@@ -82,6 +202,7 @@ class ProjectManager:
 
         project_dir.mkdir(parents=True, exist_ok=True)
         (project_dir / "historique").mkdir(exist_ok=True)
+        self._remember_path(project_id, project_dir)
 
         # Métadonnées du projet
         projet_data = {
@@ -108,6 +229,7 @@ class ProjectManager:
             updates: Dictionnaire des champs à mettre à jour
         """
         # Mettre à jour via le service (DB + JSON)
+        _project_cache.pop(project_id, None)
         result = self.service.update_project(project_id, updates)
         if not result:
             raise ValueError(f"Projet {project_id} introuvable")
@@ -136,8 +258,8 @@ class ProjectManager:
 
         offre_file = project_dir / "offre_parsed.json"
 
-        with open(offre_file, 'w', encoding='utf-8') as f:
-            json.dump(offre_data, f, ensure_ascii=False, indent=2)
+        json_io.write_json(offre_file, offre_data)
+        _offer_cache.pop(project_id, None)
 
         # Mettre à jour le projet
         self.update_project(project_id, {"offre_saved": True})
@@ -152,6 +274,10 @@ class ProjectManager:
         Returns:
             Données de l'offre, ou None si pas trouvée
         """
+        cached = _cache_get(_offer_cache, project_id)
+        if cached is not None:
+            return cached
+
         project_dir = self.get_project_path(project_id)
         if not project_dir:
             return None
@@ -161,8 +287,29 @@ class ProjectManager:
         if not offre_file.exists():
             return None
 
-        with open(offre_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        offre = json_io.read_json(offre_file)
+        _cache_put(_offer_cache, project_id, offre)
+        return offre
+
+    def delete_offer(self, project_id: str):
+        """
+        Supprime l'offre parsée du projet
+
+        Args:
+            project_id: ID du projet
+        """
+        project_dir = self.get_project_path(project_id)
+        if not project_dir:
+            raise ValueError(f"Projet {project_id} introuvable")
+
+        try:
+            (project_dir / "offre_parsed.json").unlink()
+        except FileNotFoundError:
+            pass
+        _offer_cache.pop(project_id, None)
+
+        # Mettre à jour le projet
+        self.update_project(project_id, {"offre_saved": False})
 
     def save_matching_result(self, project_id: str, results: Dict, timestamp: Optional[str] = None) -> str:
         """
@@ -184,28 +331,54 @@ class ProjectManager:
         if not project_dir:
             raise ValueError(f"Projet {project_id} introuvable")
 
-        historique_dir = project_dir / "historique"
-        historique_dir.mkdir(exist_ok=True)
+        historique_dir = os.path.join(project_dir, "historique")
+        os.makedirs(historique_dir, exist_ok=True)
 
         # Sauvegarder JSON
-        result_file = historique_dir / f"{timestamp}.json"
-        with open(result_file, 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
-
-        # Incrémenter le compteur
-        projet = self.get_project(project_id)
-        matchings_count = projet.get("matchings_count", 0) + 1
-        self.update_project(project_id, {
-            "matchings_count": matchings_count,
-            "last_matching": timestamp
-        })
+        result_file = os.path.join(historique_dir, f"{timestamp}.json")
+        json_io.write_json(result_file, results)
+        write_matching_meta(result_file, timestamp, count_historique_candidates(results))
 
+        self.record_matching(project_id, timestamp)
         return timestamp
 
+    def record_matching(self, project_id: str, timestamp: str):
+        """
+        Comptabilise un matching sauvegardé (matchings_count, last_matching)
+        À appeler par tout code qui écrit un matching: list_matchings se fie au compteur
+
+        Args:
+            project_id: ID du projet
+            timestamp: Timestamp du matching
+        """
+        # Incrémenter le compteur (un seul appel au service)
+        _project_cache.pop(project_id, None)
+        if not self.service.increment_matching_count(project_id, timestamp):
+            raise ValueError(f"Projet {project_id} introuvable")
+
     def list_matchings(self, project_id: str) -> List[Dict]:
         """
         Liste l'historique des matchings d'un projet
 
+        Args:
+            project_id: ID du projet
+
+        Returns:
+            Liste des matchings [{timestamp, candidats_count, ...}]
+        """
+        # Compteur à zéro et dossiers vides: rien à lire (projets sans historique)
+        projet = self.get_project(project_id)
+        if projet and projet.get("matchings_count") == 0:
+            project_dir = self.get_project_path(project_id)
+            if not project_dir or not has_matchings_on_disk(project_dir):
+                return []
+
+        return self.scan_matchings(project_id)
+
+    def scan_matchings(self, project_id: str) -> List[Dict]:
+        """
+        Liste les matchings présents sur disque, sans se fier à matchings_count
+
         Args:
             project_id: ID du projet
 
@@ -220,68 +393,51 @@ class ProjectManager:
         matchings = []
 
         # Lire les nouveaux matchings (dossier matchings/)
-        matchings_dir = project_dir / "matchings"
-        if matchings_dir.exists():
-            for matching_folder in sorted(matchings_dir.iterdir(), reverse=True):
-                if not matching_folder.is_dir():
-                    continue
-
+        # scandir: nom, chemin et type viennent du listing (ni Path ni stat par entrée);
+        # l'ordre est donné par le tri final sur le timestamp
+        matchings_dir = os.path.join(project_dir, "matchings")
+        if os.path.isdir(matchings_dir):
+            with os.scandir(matchings_dir) as entries:
+                matching_folders = [e for e in entries if e.is_dir(follow_symlinks=False)]
+
+            for matching_folder in matching_folders:
                 timestamp = matching_folder.name
-                results_file = matching_folder / "results.json"
+                results_file = os.path.join(matching_folder.path, "results.json")
 
-                if results_file.exists():
+                if os.path.isfile(results_file):
                     try:
-                        with open(results_file, 'r', encoding='utf-8') as f:
-                            data = json.load(f)
-
-                        # Récupérer le nombre de candidats depuis metadata ou results
-                        candidats_count = 0
-                        if "metadata" in data:
-                            candidats_count = data["metadata"].get("top_reranked", 0)
-                        elif "results" in data:
-                            candidats_count = len(data.get("results", []))
-
-                        matchings.append({
-                            "timestamp": timestamp,
-                            "candidats_count": candidats_count,
-                            "file_path": str(results_file)
-                        })
+                        matchings.append(
+                            (timestamp, read_candidats_count(results_file, count_matching_candidates), results_file)
+                        )
                     except Exception as e:
                         print(f"Erreur lecture {results_file}: {e}")
 
         # Lire les anciens matchings (dossier historique/)
-        historique_dir = project_dir / "historique"
-        if historique_dir.exists():
-            for file in sorted(historique_dir.glob("*.json"), reverse=True):
-                timestamp = file.stem
+        historique_dir = os.path.join(project_dir, "historique")
+        if os.path.isdir(historique_dir):
+            with os.scandir(historique_dir) as entries:
+                files = [
+                    e for e in entries
+                    if e.name.endswith(".json") and not e.name.endswith(MATCHING_META_SUFFIX) and e.is_file()
+                ]
+
+            for file in files:
+                timestamp = file.name[:-len(".json")]
 
                 try:
-                    with open(file, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-
-                    # Compter les candidats: priorité reranked_cvs > scored_cvs
-                    candidats_count = 0
-                    if "reranked_cvs" in data:
-                        reranked = data["reranked_cvs"]
-                        if isinstance(reranked, list):
-                            candidats_count = len(reranked)
-                        elif isinstance(reranked, dict):
-                            candidats_count = len(reranked.get("ranked_cvs", []))
-                    elif "scored_cvs" in data:
-                        candidats_count = len(data.get("scored_cvs", []))
-
-                    matchings.append({
-                        "timestamp": timestamp,
-                        "candidats_count": candidats_count,
-                        "file_path": str(file)
-                    })
+                    matchings.append(
+                        (timestamp, read_candidats_count(file.path, count_historique_candidates), file.path)
+                    )
                 except Exception as e:
-                    print(f"Erreur lecture {file}: {e}")
+                    print(f"Erreur lecture {file.path}: {e}")
 
-        # Trier par timestamp (plus récent en premier)
-        matchings.sort(key=lambda m: m["timestamp"], reverse=True)
+        # Trier par timestamp (plus récent en premier): tuples comparés directement, dicts construits après
+        matchings.sort(reverse=True)
 
-        return matchings
+        return [
+            {"timestamp": timestamp, "candidats_count": candidats_count, "file_path": file_path}
+            for timestamp, candidats_count, file_path in matchings
+        ]
 
     def load_matching(self, project_id: str, timestamp: str) -> Optional[Dict]:
         """
@@ -304,41 +460,82 @@ class ProjectManager:
         if not result_file.exists():
             return None
 
-        with open(result_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return json_io.read_json(result_file)
 
     def get_project_path(self, project_id: str) -> Optional[Path]:
         """
         Retourne le chemin du dossier projet
         Cherche d'abord dans projects/, puis dans enterprises/*/projects/
+        (résultat mémorisé; re-cherché seulement si le dossier a disparu)
         """
+        cached = self._path_cache.get(project_id)
+        if cached is not None and cached.exists():
+            return cached
+
+        # Absent de l'index ou dossier disparu: recherche sur disque, puis index corrigé
+        project_path = self._find_project_path(project_id)
+        if project_path is not None:
+            self._remember_path(project_id, project_path)
+        elif self._path_cache.pop(project_id, None) is not None:
+            self._save_index()
+        return project_path
+
+    # Méthodes privées
+
+    def _load_index(self) -> Dict[str, Path]:
+        """Charge l'index project_id → dossier (vide si absent ou illisible)"""
+        try:
+            with open(self.projects_folder / PROJECTS_INDEX_FILE, 'r', encoding='utf-8') as f:
+                return {project_id: Path(path) for project_id, path in json.load(f).items()}
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    def _save_index(self):
+        """Réécrit l'index de manière atomique (l'échec d'écriture n'est pas bloquant)"""
+        index_file = self.projects_folder / PROJECTS_INDEX_FILE
+        tmp_file = index_file.with_suffix('.tmp')
+        try:
+            self.projects_folder.mkdir(parents=True, exist_ok=True)
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({pid: str(path) for pid, path in self._path_cache.items()}, f, ensure_ascii=False, indent=2)
+            tmp_file.replace(index_file)
+        except OSError as e:
+            print(f"⚠️ Index des projets non écrit: {e}")
+
+    def _remember_path(self, project_id: str, project_dir: Path):
+        """Mémorise le dossier d'un projet (mémoire + index disque si nouveau ou déplacé)"""
+        if self._path_cache.get(project_id) != project_dir:
+            self._path_cache[project_id] = project_dir
+            self._save_index()
+
+    def _find_project_path(self, project_id: str) -> Optional[Path]:
+        """Recherche du dossier projet sur disque (projects/ puis enterprises/*/projects/)"""
         # Chercher dans projects/ (ancien système)
-        project_path = self.projects_folder / project_id
-        if project_path.exists():
-            return project_path
+        project_path = os.path.join(self._projects_folder_str, project_id)
+        if os.path.isdir(project_path):
+            return Path(project_path)
 
         # Chercher dans enterprises/*/projects/ (nouveau système)
-        enterprises_folder = Path("enterprises")
-        if enterprises_folder.exists():
-            for enterprise_dir in enterprises_folder.iterdir():
-                if not enterprise_dir.is_dir():
-                    continue
-
-                enterprise_project_path = enterprise_dir / "projects" / project_id
-                if enterprise_project_path.exists():
-                    return enterprise_project_path
+        # scandir: type des entrées fourni par le listing (pas de stat par entreprise), un seul
+        # isdir par candidat, et un Path construit uniquement pour le dossier trouvé
+        try:
+            with os.scandir("enterprises") as entries:
+                for entry in entries:
+                    if not entry.is_dir(follow_symlinks=False):
+                        continue
+
+                    candidate = os.path.join(entry.path, "projects", project_id)
+                    if os.path.isdir(candidate):
+                        return Path(candidate)
+        except FileNotFoundError:
+            pass  # Pas de dossier enterprises/
 
         # Projet non trouvé
         return None
 
-    # Méthodes privées
-
     def _generate_project_id(self, nom: str) -> str:
         """Génère un ID projet à partir du nom"""
-        import re
         # Normaliser: minuscules, espaces -> tirets, garder alphanum
-        slug = nom.lower()
-        slug = re.sub(r'[^a-z0-9\s-]', '', slug)
-        slug = re.sub(r'\s+', '-', slug)
+        slug = _SLUG_SPACES.sub('-', _SLUG_REMOVE.sub('', nom.lower()))
         slug = slug.strip('-')[:50]  # Max 50 chars
         return slug or "projet"
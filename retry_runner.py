@@ -0,0 +1,300 @@
+"""
+Machinerie commune aux modules de filtrage LLM parallélisés (must-have, nice-have)
+- Tracking des appels API en vol (un seul compteur global pour toutes les phases)
+- Rate limiting token-bucket (QPS)
+- Appel avec timeout et retries (backoff plafonné, jitter décorrélé)
+- Répartition producteur/consommateurs avec déduplication des CVs identiques
+- Event loop partagé pour les wrappers synchrones
+"""
+
+import asyncio
+import concurrent.futures
+import hashlib
+import logging
+import time
+import random
+import json
+import threading
+from typing import Dict, List, Any, Optional, Callable, Awaitable, AsyncIterator, Coroutine, TypeVar
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_DELAY_S = 30.0   # Plafond du backoff (jitter décorrélé)
+
+# Codes HTTP transitoires: les autres 4xx (clé invalide, requête invalide) ne sont pas retentés
+RETRYABLE_STATUS = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+
+# ==================== TRACKING PARALLÉLISATION ====================
+
+class InflightTracker:
+    """
+    Métriques pour prouver la vraie parallélisation (appels API en vol et pic).
+    Pas de lock: un seul event loop, les coroutines ne sont pas préemptées au milieu d'un +=
+    """
+
+    def __init__(self):
+        self.inflight = 0
+        self.peak = 0
+
+    def start(self):
+        """Incrémente le compteur d'appels API en vol"""
+        self.inflight += 1
+        if self.inflight > self.peak:
+            self.peak = self.inflight
+
+    def end(self):
+        """Décrémente le compteur d'appels API en vol"""
+        self.inflight -= 1
+
+    def reset(self):
+        """Reset les métriques de tracking"""
+        self.inflight = 0
+        self.peak = 0
+
+
+# Instance partagée par must_have_parallel et nice_have_parallel
+inflight_tracker = InflightTracker()
+
+
+def get_peak_inflight() -> int:
+    """Retourne le pic d'appels API simultanés"""
+    return inflight_tracker.peak
+
+
+def reset_inflight_tracking():
+    """Reset les métriques de tracking"""
+    inflight_tracker.reset()
+
+
+class TokenBucket:
+    """
+    Rate limiter token-bucket: rafales jusqu'à `capacity` requêtes, débit moyen `rate` req/s.
+    Pas de lock: le calcul de recharge est synchrone (aucun await entre lecture et écriture).
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = max(rate, 0.01)
+        self.capacity = max(1.0, capacity if capacity is not None else self.rate)
+        self.tokens = self.capacity
+        self.last = time.perf_counter()
+
+    async def acquire(self, tokens: float = 1):
+        """Consomme `tokens` jetons; n'attend que si le seau ne les contient pas"""
+        now = time.perf_counter()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+        # Réserver les jetons tout de suite (solde négatif = dette à rembourser en attendant)
+        self.tokens -= tokens
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+
+# ==================== RETRIES ====================
+
+class RetryExhausted(Exception):
+    """Échec définitif d'un appel après retries (ou erreur non transitoire)"""
+
+    def __init__(self, attempts: int, last_err: str):
+        super().__init__(last_err)
+        self.attempts = attempts
+        self.last_err = last_err
+
+
+def is_retryable(exc: Exception) -> bool:
+    """Vrai si l'erreur est transitoire (429, 5xx, réseau...) et mérite un nouvel essai"""
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status is None or status in RETRYABLE_STATUS
+
+
+async def call_with_retry(
+    factory: Callable[[], Awaitable[T]],
+    *,
+    retries: int,
+    backoff_s: float,
+    timeout_s: int,
+    limiter: TokenBucket,
+    label: str = "inconnu",
+) -> T:
+    """
+    Appelle `factory()` avec protection QPS/timeout/retries et tracking des appels en vol
+
+    Args:
+        factory: Fabrique de la coroutine à attendre (une nouvelle par tentative)
+        retries: Nombre de retries
+        backoff_s: Backoff initial
+        timeout_s: Timeout de l'appel LLM (garde-fou externe à timeout_s + 5)
+        limiter: Rate limiter (token-bucket)
+        label: Identifiant du ou des CVs pour les logs
+
+    Returns:
+        Le résultat de la coroutine
+
+    Raises:
+        RetryExhausted: après toutes les tentatives ou sur erreur définitive
+    """
+    delay = backoff_s
+    last_err = None
+
+    for attempt in range(retries + 1):
+        try:
+            # Respecter le rate limit
+            await limiter.acquire()
+
+            # TRACKING: appel API en vol pendant l'attente de la réponse
+            inflight_tracker.start()
+            try:
+                # Appel async direct avec timeout (pas de thread intermédiaire)
+                return await asyncio.wait_for(factory(), timeout=timeout_s + 5)
+            finally:
+                inflight_tracker.end()
+
+        except asyncio.TimeoutError:
+            last_err = f"Timeout après {timeout_s}s (tentative {attempt + 1}/{retries + 1})"
+            logger.warning(f"⚠️ {last_err} - CV: {label}")
+
+        except Exception as e:
+            last_err = str(e)
+            logger.warning(f"⚠️ Erreur tentative {attempt + 1}/{retries + 1}: {last_err} - CV: {label}")
+            if not is_retryable(e):
+                break  # Erreur définitive (401, 400...): inutile de gaspiller des tentatives
+
+        # Backoff plafonné avec jitter décorrélé (désynchronise les retries après une rafale de 429)
+        if attempt < retries:
+            delay = min(DEFAULT_MAX_DELAY_S, random.uniform(backoff_s, delay * 3))
+            await asyncio.sleep(delay)
+
+    raise RetryExhausted(attempt + 1, last_err)
+
+
+# ==================== RÉPARTITION ====================
+
+def clean_criteria(criteria: Optional[List[str]]) -> List[str]:
+    """Critères nettoyés une seule fois (espaces retirés, entrées vides écartées)"""
+    return [c.strip() for c in (criteria or []) if c and c.strip()]
+
+
+def cv_identifier(cv: Dict[str, Any], index: int) -> str:
+    """Identifiant stable d'un CV (repli sur sa position dans la liste d'entrée)"""
+    return cv.get("cv") or cv.get("id") or cv.get("filename") or cv.get("nom") or f"cv_{index}"
+
+
+def cv_identifiers(cvs: List[Dict[str, Any]]) -> Dict[int, str]:
+    """Identifiants calculés une seule fois, indexés par id(cv) pour la boucle de complétion"""
+    return {id(cv): cv_identifier(cv, i) for i, cv in enumerate(cvs)}
+
+
+def content_key(cv: Dict[str, Any]) -> bytes:
+    """Empreinte du contenu d'un CV (même payload → même décision LLM)"""
+    payload = json.dumps(cv, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).digest()
+
+
+async def stream_results(
+    cvs: List[Dict[str, Any]],
+    call: Callable[[List[Dict[str, Any]]], Awaitable[List[tuple]]],
+    concurrency: int,
+    batch_size: int = 1,
+) -> AsyncIterator[tuple]:
+    """
+    Producteur/consommateurs sur asyncio.Queue: `concurrency` workers, file bornée
+    (mémoire en O(concurrence) au lieu d'une tâche par CV).
+    Les CVs au contenu identique partagent un seul appel; `call` reçoit des lots
+    de `batch_size` CVs distincts et retourne un résultat par CV, dans l'ordre.
+    Produit (cv, *résultat) au fil des complétions.
+    Une exception levée par `call` est relancée dans le consommateur (les autres workers sont annulés).
+    """
+    # Regrouper les CVs identiques (un seul appel LLM par contenu)
+    groups: Dict[bytes, List[Dict[str, Any]]] = {}
+    for cv in cvs:
+        groups.setdefault(content_key(cv), []).append(cv)
+
+    group_list = list(groups.values())
+    batch_size = max(1, batch_size)
+    batches = [group_list[i:i + batch_size] for i in range(0, len(group_list), batch_size)]
+
+    n_workers = max(1, min(concurrency, len(batches)))
+    jobs: asyncio.Queue = asyncio.Queue(maxsize=n_workers * 2)
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def producer():
+        for batch in batches:
+            await jobs.put(batch)
+        for _ in range(n_workers):
+            await jobs.put(None)  # Sentinelle de fin pour chaque worker
+
+    async def worker():
+        while True:
+            batch = await jobs.get()
+            if batch is None:
+                return
+            try:
+                batch_results = await call([group[0] for group in batch])
+                if len(batch_results) != len(batch):
+                    raise ValueError(f"{len(batch_results)} résultat(s) pour un lot de {len(batch)} CV(s)")
+            except Exception as e:
+                # Transmis au consommateur: sans cela il attendrait indéfiniment les résultats de ce lot
+                results.put_nowait(e)
+                return
+            for group, result in zip(batch, batch_results):
+                for cv in group:
+                    results.put_nowait((cv,) + tuple(result[1:]))
+
+    tasks = [asyncio.create_task(producer())] + [asyncio.create_task(worker()) for _ in range(n_workers)]
+    try:
+        for _ in range(len(cvs)):
+            item = await results.get()
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    duplicates = len(cvs) - len(groups)
+    if duplicates:
+        logger.info(f"♻️ {duplicates} CV(s) en double: résultat LLM partagé")
+
+
+# ==================== EVENT LOOP PARTAGÉ ====================
+
+# Un seul event loop pour tout le process, dans un thread dédié: les wrappers synchrones
+# n'en recréent plus un par appel, et le client OpenAI async (un par loop) garde son pool HTTP
+_background_loop: Optional[asyncio.AbstractEventLoop] = None
+_background_thread: Optional[threading.Thread] = None
+_background_lock = threading.Lock()
+
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    """Retourne l'event loop partagé (démarré au premier appel)"""
+    global _background_loop, _background_thread
+    with _background_lock:
+        if _background_loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="llm-event-loop", daemon=True)
+            thread.start()
+            _background_loop, _background_thread = loop, thread
+    return _background_loop
+
+
+def run_sync(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Exécute une coroutine sur l'event loop partagé et attend son résultat.
+    Utilisable depuis n'importe quel thread, y compris quand ce thread a déjà un loop actif.
+    """
+    loop = _get_background_loop()
+    if threading.current_thread() is _background_thread:
+        coro.close()
+        raise RuntimeError("run_sync appelé depuis l'event loop partagé: utiliser await")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+def run_background(coro: Coroutine[Any, Any, T]) -> "concurrent.futures.Future[T]":
+    """Planifie une coroutine sur l'event loop partagé sans attendre son résultat"""
+    return asyncio.run_coroutine_threadsafe(coro, _get_background_loop())
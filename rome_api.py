@@ -1,16 +1,168 @@
 """
 Module pour l'intégration avec l'API ROME de France Travail
 Gère l'authentification OAuth2 et la récupération des compétences métiers
+Les réponses sont mises en cache (mémoire + disque): le référentiel ROME ne change qu'à chaque trimestre
 """
 
+import functools
+import hashlib
 import os
+import re
 import requests
+import sqlite3
+import threading
 import time
-from typing import Dict, List, Optional
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from typing import Any, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 
+import json_io
+
 load_dotenv()
 
+# Connexions HTTP gardées ouvertes entre les appels (une poignée de main TLS par connexion, pas par requête)
+HTTP_POOL_CONNECTIONS = 4
+HTTP_POOL_MAXSIZE = 16
+
+# Mapping basique des titres communs → code ROME (fallback si API recherche pas dispo)
+TITRE_CODE_ROME = {
+    "data scientist": "M1805",
+    "data analyst": "M1403",
+    "architecte données": "M1805",
+    "architecte de données": "M1805",
+    "développeur": "M1805",
+    "ingénieur logiciel": "M1805",
+    "chef de projet": "M1806",
+    "consultant": "M1402",
+    "analyste": "M1403",
+    "business analyst": "M1403",
+    "product owner": "M1803",
+    "scrum master": "M1806",
+    "devops": "M1810",
+    "administrateur système": "M1810",
+    "administrateur réseau": "M1810",
+}
+DEFAULT_CODE_ROME_IT = "M1805"  # Études et développement informatique
+
+# Une seule passe sur le titre au lieu d'un test par clé. Lookahead: toutes les occurrences sont
+# trouvées, même chevauchantes; la clé retenue est la première dans l'ordre de TITRE_CODE_ROME
+# (priorité voulue: "consultant data scientist" → M1805, "chef de projet data analyst" → M1403)
+_TITRE_PATTERN = re.compile("(?=(" + "|".join(re.escape(k) for k in sorted(TITRE_CODE_ROME, key=len, reverse=True)) + "))")
+_TITRE_PRIORITY = {key: rank for rank, key in enumerate(TITRE_CODE_ROME)}
+_IT_KEYWORDS_PATTERN = re.compile("data|développeur|ingénieur|informatique|it|tech")
+
+# Classification d'une compétence selon son champ "type"
+_TYPE_TECHNIQUE_MARKERS = ("technique", "metier", "savoir")
+_TYPE_TRANSVERSALE_MARKERS = ("transversal", "general", "comportemental")
+
+
+@functools.lru_cache(maxsize=256)
+def _is_transversale(type_comp: str) -> bool:
+    """Vrai si le type désigne une compétence transversale (par défaut: technique).
+    Mis en cache: une réponse ne contient qu'une poignée de types distincts"""
+    if any(marker in type_comp for marker in _TYPE_TECHNIQUE_MARKERS):
+        return False
+    return any(marker in type_comp for marker in _TYPE_TRANSVERSALE_MARKERS)
+
+
+def _libelles(items: List) -> List[str]:
+    """Libellés d'une liste d'entrées (dict avec "libelle" ou chaîne brute)"""
+    return [s.get("libelle", s) if isinstance(s, dict) else s for s in items]
+
+
+def _extract_list(result: List) -> Tuple[List[str], List[str]]:
+    """Compétences d'une réponse sous forme de liste (une entrée typée par compétence)"""
+    techniques: List[str] = []
+    transversales: List[str] = []
+    for comp in result:
+        if isinstance(comp, dict):
+            target = transversales if _is_transversale(comp.get("type", "").lower()) else techniques
+            target.append(comp.get("libelle", ""))
+        elif isinstance(comp, str):
+            techniques.append(comp)  # Sans type: considérée comme technique
+    return techniques, transversales
+
+
+def _extract_dict(result: Dict) -> Tuple[List[str], List[str]]:
+    """Compétences d'une réponse sous forme de dict (savoirs, savoir_faire, savoir_etre...)"""
+    techniques = _libelles(result.get("savoirs", [])) + _libelles(result.get("savoir_faire", []))
+    key = "savoir_etre" if "savoir_etre" in result else "competences_transversales"
+    return techniques, _libelles(result.get(key, []))
+
+
+# Cache des réponses ROME: mémoire du process, puis une base SQLite unique (cache/rome.sqlite):
+# une requête indexée par lecture au lieu d'un open/read/close de fichier par code
+ROME_CACHE_DB = Path(__file__).parent / "cache" / "rome.sqlite"
+ROME_CACHE_TTL_S = 86400 * 30
+ROME_CACHE_VERSION = 1  # À incrémenter si le format des réponses mises en cache change
+
+# Clé → (expiration, réponse sérialisée): chaque lecture rend une copie indépendante
+_memory_cache: Dict[str, Tuple[float, bytes]] = {}
+
+# Connexion partagée par tous les clients (ouverte au premier accès); le lock sérialise les threads
+_cache_db: Optional[sqlite3.Connection] = None
+_cache_db_lock = threading.Lock()
+
+
+def _get_cache_db() -> sqlite3.Connection:
+    """Retourne la connexion au cache disque (créée au premier appel, sous _cache_db_lock)"""
+    global _cache_db
+    if _cache_db is None:
+        ROME_CACHE_DB.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(ROME_CACHE_DB), check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS rome_cache("
+            "key TEXT PRIMARY KEY, version INTEGER, expires_at REAL, body BLOB)"
+        )
+        _cache_db = db
+    return _cache_db
+
+
+def _cache_key(endpoint: str, params: Optional[Dict]) -> str:
+    """Clé de cache d'une requête (endpoint + paramètres triés)"""
+    raw = endpoint + "?" + "&".join(f"{k}={v}" for k, v in sorted((params or {}).items()))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _cache_get(key: str) -> Optional[Any]:
+    """Réponse en cache non expirée (mémoire puis disque), ou None"""
+    now = time.time()
+    entry = _memory_cache.get(key)
+    if entry is not None and entry[0] > now:
+        return json_io.loads(entry[1])
+
+    try:
+        with _cache_db_lock:
+            row = _get_cache_db().execute(
+                "SELECT expires_at, body FROM rome_cache WHERE key = ? AND version = ? AND expires_at > ?",
+                (key, ROME_CACHE_VERSION, now)
+            ).fetchone()
+    except (OSError, sqlite3.Error):
+        return None
+    if row is None:
+        return None
+
+    _memory_cache[key] = (row[0], bytes(row[1]))
+    return json_io.loads(row[1])
+
+
+def _cache_put(key: str, value: Any, ttl: int = ROME_CACHE_TTL_S):
+    """Mémorise une réponse (l'échec d'écriture disque n'est pas bloquant)"""
+    expires_at = time.time() + ttl
+    body = json_io.dumps(value)
+    _memory_cache[key] = (expires_at, body)
+    try:
+        with _cache_db_lock:
+            _get_cache_db().execute(
+                "INSERT OR REPLACE INTO rome_cache(key, version, expires_at, body) VALUES (?, ?, ?, ?)",
+                (key, ROME_CACHE_VERSION, expires_at, body)
+            )
+    except (OSError, sqlite3.Error) as e:
+        print(f"⚠️ Cache ROME non écrit sur disque: {e}")
+
 
 class ROMEAPIClient:
     """Client pour l'API ROME de France Travail"""
@@ -41,6 +193,14 @@ class ROMEAPIClient:
 
         self.access_token = None
         self.token_expires_at = 0
+        self._token_lock = threading.Lock()  # Un seul renouvellement quand plusieurs threads voient le token expiré
+
+        # Session partagée par l'authentification et les requêtes API (keep-alive)
+        self._session = requests.Session()
+        self._session.headers.update({"Accept": "application/json"})
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=0)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
 
     def _get_access_token(self) -> str:
         """
@@ -53,9 +213,26 @@ class ROMEAPIClient:
         if self.access_token and time.time() < self.token_expires_at:
             return self.access_token
 
-        # Obtenir un nouveau token
+        with self._token_lock:
+            # Un autre thread a pu renouveler le token pendant l'attente du lock
+            if self.access_token and time.time() < self.token_expires_at:
+                return self.access_token
+            return self._fetch_access_token()
+
+    def _invalidate_token(self, rejected_token: str):
+        """
+        Oublie un token refusé (401). Sans effet si un autre thread l'a déjà remplacé:
+        les requêtes refusées en même temps ne déclenchent qu'un seul renouvellement
+        """
+        with self._token_lock:
+            if self.access_token == rejected_token:
+                self.access_token = None
+                self.token_expires_at = 0
+
+    def _fetch_access_token(self) -> str:
+        """Demande un nouveau token OAuth2 (appelé sous _token_lock)"""
         try:
-            response = requests.post(
+            response = self._session.post(
                 self.token_url,
                 data={
                     "grant_type": "client_credentials",
@@ -87,7 +264,7 @@ class ROMEAPIClient:
 
     def _make_request(self, endpoint: str, params: Dict = None, max_retries: int = 3) -> Optional[Dict]:
         """
-        Effectue une requête à l'API ROME avec retry logic
+        Effectue une requête à l'API ROME avec retry logic (réponses valides mises en cache)
 
         Args:
             endpoint: Endpoint complet (ex: "rome-metiers/v1/metiers/metier/M1805")
@@ -97,29 +274,33 @@ class ROMEAPIClient:
         Returns:
             Réponse JSON ou None en cas d'erreur
         """
+        key = _cache_key(endpoint, params)
+        cached = _cache_get(key)
+        if cached is not None:
+            return cached
+
         url = f"{self.base_url}/{endpoint}"
-        headers = {
-            "Authorization": f"Bearer {self._get_access_token()}",
-            "Accept": "application/json"
-        }
 
         for attempt in range(max_retries):
             try:
-                response = requests.get(
+                # Token relu à chaque tentative: après un 401, la suivante utilise le token renouvelé
+                token = self._get_access_token()
+                response = self._session.get(
                     url,
-                    headers=headers,
+                    headers={"Authorization": f"Bearer {token}"},
                     params=params,
                     timeout=10
                 )
 
                 if response.status_code == 200:
-                    return response.json()
+                    data = response.json()
+                    _cache_put(key, data)
+                    return data
 
                 elif response.status_code == 401:
                     # Token expiré, forcer le renouvellement
                     print("🔄 Token expiré, renouvellement...")
-                    self.access_token = None
-                    self.token_expires_at = 0
+                    self._invalidate_token(token)
                     continue
 
                 elif response.status_code == 429:
@@ -197,41 +378,13 @@ class ROMEAPIClient:
         if not result:
             return {"techniques": [], "transversales": []}
 
-        competences_techniques = []
-        competences_transversales = []
-
-        # Si result est une liste
+        # Forme de la réponse déterminée une seule fois: liste de compétences typées, ou dict par catégorie
         if isinstance(result, list):
-            for comp in result:
-                if isinstance(comp, dict):
-                    libelle = comp.get("libelle", "")
-                    type_comp = comp.get("type", "").lower()
-                elif isinstance(comp, str):
-                    libelle = comp
-                    type_comp = ""
-                else:
-                    continue
-
-                if "technique" in type_comp or "metier" in type_comp or "savoir" in type_comp:
-                    competences_techniques.append(libelle)
-                elif "transversal" in type_comp or "general" in type_comp or "comportemental" in type_comp:
-                    competences_transversales.append(libelle)
-                else:
-                    # Par défaut, considérer comme technique
-                    competences_techniques.append(libelle)
-
-        # Si result est un dict avec des clés spécifiques
+            competences_techniques, competences_transversales = _extract_list(result)
         elif isinstance(result, dict):
-            if "savoirs" in result:
-                competences_techniques.extend([s.get("libelle", s) if isinstance(s, dict) else s
-                                               for s in result["savoirs"]])
-            if "savoir_faire" in result:
-                competences_techniques.extend([s.get("libelle", s) if isinstance(s, dict) else s
-                                               for s in result["savoir_faire"]])
-            if "savoir_etre" in result or "competences_transversales" in result:
-                key = "savoir_etre" if "savoir_etre" in result else "competences_transversales"
-                competences_transversales.extend([s.get("libelle", s) if isinstance(s, dict) else s
-                                                  for s in result[key]])
+            competences_techniques, competences_transversales = _extract_dict(result)
+        else:
+            competences_techniques, competences_transversales = [], []
 
         print(f"📊 {len(competences_techniques)} techniques, {len(competences_transversales)} transversales")
 
@@ -250,39 +403,25 @@ class ROMEAPIClient:
         Returns:
             Code ROME ou None
         """
-        # Mapping basique des titres communs
-        mapping = {
-            "data scientist": "M1805",
-            "data analyst": "M1403",
-            "architecte données": "M1805",
-            "architecte de données": "M1805",
-            "développeur": "M1805",
-            "ingénieur logiciel": "M1805",
-            "chef de projet": "M1806",
-            "consultant": "M1402",
-            "analyste": "M1403",
-            "business analyst": "M1403",
-            "product owner": "M1803",
-            "scrum master": "M1806",
-            "devops": "M1810",
-            "administrateur système": "M1810",
-            "administrateur réseau": "M1810",
-        }
-
         titre_lower = titre_poste.lower().strip()
 
         # Recherche exacte
-        if titre_lower in mapping:
-            return mapping[titre_lower]
+        if titre_lower in TITRE_CODE_ROME:
+            return TITRE_CODE_ROME[titre_lower]
+
+        # Recherche par mots-clés: un titre connu contenu dans le titre du poste
+        match = min(_TITRE_PATTERN.finditer(titre_lower), key=lambda m: _TITRE_PRIORITY[m.group(1)], default=None)
+        if match:
+            return TITRE_CODE_ROME[match.group(1)]
 
-        # Recherche par mots-clés
-        for key, code in mapping.items():
-            if key in titre_lower or titre_lower in key:
+        # Titre du poste partiel (ex: "data") contenu dans un titre connu
+        for key, code in TITRE_CODE_ROME.items():
+            if titre_lower in key:
                 return code
 
         # Par défaut, métiers informatiques
-        if any(kw in titre_lower for kw in ["data", "développeur", "ingénieur", "informatique", "it", "tech"]):
-            return "M1805"  # Études et développement informatique
+        if _IT_KEYWORDS_PATTERN.search(titre_lower):
+            return DEFAULT_CODE_ROME_IT
 
         return None
 
@@ -9,17 +9,28 @@ Usage:
     python scripts/migrate_cv_meta.py --apply        # Indexation réelle
 """
 
+import os
 import sys
-import json
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+
+# Extensions des fichiers source d'un CV, par ordre de préférence
+RAW_EXTENSIONS = ('.pdf', '.docx', '.doc')
+
+# Lignes par insertion/mise à jour groupée (une seule transaction pour l'ensemble)
+INDEX_CHUNK_SIZE = 1000
+
+# Lectures de CV simultanées (le GIL est relâché pendant les lectures disque, qui se recouvrent)
+SCAN_MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)
 
 # Ajouter le projet au PYTHONPATH
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(PROJECT_ROOT))
 
+import json_io
 from brainrh.database import get_session
 from brainrh.models import CVMetaDB
 
@@ -30,101 +41,124 @@ def parse_args():
     return parser.parse_args()
 
 
+def _subdirs(parent) -> List[os.DirEntry]:
+    """
+    Sous-dossiers non cachés d'un dossier (vide s'il n'existe pas)
+    scandir: nom et type viennent du listing, sans Path ni stat par entrée
+    """
+    try:
+        with os.scandir(parent) as entries:
+            return [e for e in entries if e.name[0] != '.' and e.is_dir()]
+    except FileNotFoundError:
+        return []
+
+
+def index_raw_files(cvs_raw_dir: str) -> Dict[str, str]:
+    """
+    Indexe les fichiers source d'un dossier cvs_raw/ en un seul listing
+    (au lieu d'un exists() par extension et par CV)
+
+    Args:
+        cvs_raw_dir: Chemin vers cvs_raw/ (absent: index vide)
+
+    Returns:
+        Dict {nom sans extension: chemin du fichier source}, .pdf préféré à .docx puis .doc
+    """
+    best: Dict[str, Tuple[int, str]] = {}
+    try:
+        with os.scandir(cvs_raw_dir) as entries:
+            for e in entries:
+                stem, ext = os.path.splitext(e.name)
+                if ext not in RAW_EXTENSIONS or not e.is_file():
+                    continue
+                rank = RAW_EXTENSIONS.index(ext)
+                if stem not in best or rank < best[stem][0]:
+                    best[stem] = (rank, e.path)
+    except FileNotFoundError:
+        pass
+    return {stem: path for stem, (_, path) in best.items()}
+
+
 def scan_parsed_cvs() -> List[Dict]:
     """
     Scanne tous les CV parsés dans enterprises/ et projects/
+    Listing des dossiers d'abord (séquentiel, rapide), puis lecture des JSON en parallèle
 
     Returns:
         Liste de dicts avec métadonnées CV
     """
-    cv_files = []
+    tasks = []
 
     # 1. Scanner enterprises/*/projects/*/cvs_parsed/
-    enterprises_dir = PROJECT_ROOT / "enterprises"
-    if enterprises_dir.exists():
-        for ent_dir in enterprises_dir.iterdir():
-            if not ent_dir.is_dir():
-                continue
-
-            projects_dir = ent_dir / "projects"
-            if not projects_dir.exists():
-                continue
-
-            for project_dir in projects_dir.iterdir():
-                if not project_dir.is_dir():
-                    continue
-
-                cvs_parsed_dir = project_dir / "cvs_parsed"
-                if cvs_parsed_dir.exists():
-                    cv_files.extend(scan_cvs_in_dir(cvs_parsed_dir, project_dir.name))
+    for ent_dir in _subdirs(PROJECT_ROOT / "enterprises"):
+        for project_dir in _subdirs(os.path.join(ent_dir.path, "projects")):
+            cvs_parsed_dir = os.path.join(project_dir.path, "cvs_parsed")
+            tasks.extend(scan_cvs_in_dir(cvs_parsed_dir, project_dir.name))
 
     # 2. Scanner projects/ legacy
-    projects_legacy_dir = PROJECT_ROOT / "projects"
-    if projects_legacy_dir.exists():
-        for project_dir in projects_legacy_dir.iterdir():
-            if not project_dir.is_dir():
-                continue
+    for project_dir in _subdirs(PROJECT_ROOT / "projects"):
+        if project_dir.name.startswith("_"):
+            continue
 
-            if project_dir.name.startswith("_"):
-                continue
+        cvs_parsed_dir = os.path.join(project_dir.path, "cvs_parsed")
+        tasks.extend(scan_cvs_in_dir(cvs_parsed_dir, project_dir.name))
 
-            cvs_parsed_dir = project_dir / "cvs_parsed"
-            if cvs_parsed_dir.exists():
-                cv_files.extend(scan_cvs_in_dir(cvs_parsed_dir, project_dir.name))
+    if not tasks:
+        return []
 
-    return cv_files
+    # extract_cv_metadata est sans état partagé: les threads lisent chacun leur fichier
+    with ThreadPoolExecutor(max_workers=min(SCAN_MAX_WORKERS, len(tasks))) as executor:
+        results = executor.map(lambda task: extract_cv_metadata(*task), tasks)
+        return [metadata for metadata in results if metadata]
 
 
-def scan_cvs_in_dir(cvs_dir: Path, project_id: str) -> List[Dict]:
+def scan_cvs_in_dir(cvs_dir: str, project_id: str) -> List[Tuple[Path, str, Dict[str, str]]]:
     """
-    Scanne les CV dans un dossier cvs_parsed/
+    Liste les CV d'un dossier cvs_parsed/ (sans les lire)
 
     Args:
-        cvs_dir: Chemin vers cvs_parsed/
+        cvs_dir: Chemin vers cvs_parsed/ (absent: aucun CV)
         project_id: ID du projet
 
     Returns:
-        Liste de dicts avec métadonnées
+        Liste de tuples (cv_file, project_id, raw_index): arguments de extract_cv_metadata
     """
-    cv_files = []
-
-    for cv_file in cvs_dir.glob("*.json"):
-        metadata = extract_cv_metadata(cv_file, project_id)
-        if metadata:
-            cv_files.append(metadata)
+    try:
+        with os.scandir(cvs_dir) as entries:
+            # Même sélection que glob("*.json"): fichiers .json non cachés; Path construit pour ceux-là seulement
+            json_files = [
+                Path(e.path) for e in entries
+                if e.name.endswith(".json") and e.name[0] != '.' and e.is_file()
+            ]
+    except FileNotFoundError:
+        return []
 
-    return cv_files
+    raw_index = index_raw_files(os.path.join(os.path.dirname(cvs_dir), "cvs_raw"))
+    return [(cv_file, project_id, raw_index) for cv_file in json_files]
 
 
-def extract_cv_metadata(cv_file: Path, project_id: str) -> Optional[Dict]:
+def extract_cv_metadata(cv_file: Path, project_id: str, raw_index: Dict[str, str]) -> Optional[Dict]:
     """
     Extrait les métadonnées d'un CV parsé
 
     Args:
         cv_file: Chemin vers le JSON CV
         project_id: ID du projet
+        raw_index: Fichiers source du projet (voir index_raw_files)
 
     Returns:
         Dict avec métadonnées ou None si erreur
     """
     try:
-        # Lire le JSON
-        with open(cv_file, 'r', encoding='utf-8') as f:
-            cv_data = json.load(f)
+        # Lire le JSON (orjson si installé: parsing en C, directement depuis les octets)
+        cv_data = json_io.read_json(cv_file)
 
         # Chemins relatifs depuis PROJECT_ROOT
         json_path = str(cv_file.relative_to(PROJECT_ROOT))
 
         # Chercher le PDF/DOCX source (même nom, différente extension)
-        file_path = None
-        cvs_raw_dir = cv_file.parent.parent / "cvs_raw"
-        if cvs_raw_dir.exists():
-            stem = cv_file.stem
-            for ext in ['.pdf', '.docx', '.doc']:
-                source_file = cvs_raw_dir / f"{stem}{ext}"
-                if source_file.exists():
-                    file_path = str(source_file.relative_to(PROJECT_ROOT))
-                    break
+        source_file = raw_index.get(cv_file.stem)
+        file_path = str(Path(source_file).relative_to(PROJECT_ROOT)) if source_file else None
 
         # Extraire parsed_at (stat du fichier)
         parsed_at = datetime.fromtimestamp(cv_file.stat().st_mtime)
@@ -190,60 +224,60 @@ def detect_anomalies(cv_files: List[Dict]) -> List[str]:
     return warnings
 
 
-def index_cv(cv_meta: Dict, dry_run: bool = True) -> bool:
+def index_cvs_bulk(cv_files: List[Dict], dry_run: bool = True) -> int:
     """
-    Indexe un CV dans cv_meta
+    Indexe les CV dans cv_meta en une seule transaction
+    (une requête pour les clés existantes, puis insertions et mises à jour groupées)
 
     Args:
-        cv_meta: Métadonnées du CV
+        cv_files: Métadonnées des CV
         dry_run: Si True, n'applique pas
 
     Returns:
-        True si succès
+        Nombre de CV indexés (0 en cas d'erreur: la transaction est annulée)
     """
     if dry_run:
-        return True
+        return len(cv_files)
 
+    now = datetime.now()
     try:
         with get_session() as session:
-            # Vérifier si existe déjà
             from sqlmodel import select
-            existing = session.exec(
-                select(CVMetaDB).where(
-                    CVMetaDB.project_id == cv_meta["project_id"],
-                    CVMetaDB.filename == cv_meta["filename"]
-                )
-            ).first()
-
-            if existing:
-                # Mise à jour
-                existing.json_path = cv_meta["json_path"]
-                existing.file_path = cv_meta["file_path"]
-                existing.parsed_at = cv_meta["parsed_at"]
-                existing.candidat_nom = cv_meta["candidat_nom"]
-                existing.candidat_titre = cv_meta["candidat_titre"]
-                existing.last_modified = datetime.now()
-                print(f"         ✅ Mis à jour: {cv_meta['filename']}")
-            else:
-                # Insertion
-                cv_db = CVMetaDB(
-                    filename=cv_meta["filename"],
-                    project_id=cv_meta["project_id"],
-                    json_path=cv_meta["json_path"],
-                    file_path=cv_meta["file_path"],
-                    parsed_at=cv_meta["parsed_at"],
-                    candidat_nom=cv_meta["candidat_nom"],
-                    candidat_titre=cv_meta["candidat_titre"]
-                )
-                session.add(cv_db)
-                print(f"         ✅ Inséré: {cv_meta['filename']}")
+            existing = {
+                (project_id, filename)
+                for project_id, filename in session.exec(select(CVMetaDB.project_id, CVMetaDB.filename)).all()
+            }
+
+            # Doublons (project_id, filename): le dernier l'emporte, comme avec l'ancien upsert ligne à ligne
+            rows: Dict[Tuple[str, str], Dict] = {}
+            for cv_meta in cv_files:
+                rows[(cv_meta["project_id"], cv_meta["filename"])] = {
+                    "filename": cv_meta["filename"],
+                    "project_id": cv_meta["project_id"],
+                    "json_path": cv_meta["json_path"],
+                    "file_path": cv_meta["file_path"],
+                    "parsed_at": cv_meta["parsed_at"],
+                    "candidat_nom": cv_meta["candidat_nom"],
+                    "candidat_titre": cv_meta["candidat_titre"],
+                    "last_modified": now
+                }
+
+            inserts = [row for key, row in rows.items() if key not in existing]
+            updates = [row for key, row in rows.items() if key in existing]
+
+            for i in range(0, len(inserts), INDEX_CHUNK_SIZE):
+                session.bulk_insert_mappings(CVMetaDB, inserts[i:i + INDEX_CHUNK_SIZE])
+            for i in range(0, len(updates), INDEX_CHUNK_SIZE):
+                session.bulk_update_mappings(CVMetaDB, updates[i:i + INDEX_CHUNK_SIZE])
 
             session.commit()
-            return True
+
+        print(f"   ✅ {len(inserts)} inséré(s), {len(updates)} mis à jour")
+        return len(inserts) + len(updates)
 
     except Exception as e:
-        print(f"         ❌ Erreur: {e}")
-        return False
+        print(f"   ❌ Erreur: {e}")
+        return 0
 
 
 def clean_orphan_records(cv_files: List[Dict], dry_run: bool = True):
@@ -333,10 +367,7 @@ def main():
             print(f"   ... et {len(cv_files) - 5} autres")
     else:
         print("\n📥 Indexation en cours...")
-        indexed_count = 0
-        for cv in cv_files:
-            if index_cv(cv, dry_run):
-                indexed_count += 1
+        indexed_count = index_cvs_bulk(cv_files, dry_run)
 
         # Nettoyer les orphelins
         print("\n🧹 Nettoyage des orphelins...")
@@ -4,6 +4,7 @@ Script de reconstruction de la DB depuis les fichiers JSON
 À utiliser après nettoyage ou test pour re-peupler brainrh.db
 """
 
+import os
 import sys
 from pathlib import Path
 import json
@@ -38,19 +39,20 @@ def rebuild_database():
     enterprises_count = 0
     projects_count = 0
 
-    for enterprise_dir in enterprises_dir.iterdir():
-        if not enterprise_dir.is_dir() or enterprise_dir.name.startswith('.'):
-            continue
+    # scandir: nom et type des entrées viennent du listing (pas de stat par dossier),
+    # et les JSON sont ouverts directement au lieu d'un exists() préalable
+    with os.scandir(enterprises_dir) as entries:
+        enterprise_dirs = [e for e in entries if e.name[0] != '.' and e.is_dir()]
 
-        enterprise_json = enterprise_dir / "enterprise.json"
-        if not enterprise_json.exists():
+    for enterprise_dir in enterprise_dirs:
+        # Lire enterprise.json
+        try:
+            with open(os.path.join(enterprise_dir.path, "enterprise.json"), 'r', encoding='utf-8') as f:
+                enterprise_data = json.load(f)
+        except FileNotFoundError:
             print(f"   ⚠️  Pas de enterprise.json dans {enterprise_dir.name}, skip")
             continue
 
-        # Lire enterprise.json
-        with open(enterprise_json, 'r', encoding='utf-8') as f:
-            enterprise_data = json.load(f)
-
         try:
             # Créer l'entreprise dans la DB
             EnterpriseService.create_enterprise(enterprise_data)
@@ -61,21 +63,19 @@ def rebuild_database():
             continue
 
         # Scanner les projets de cette entreprise
-        projects_dir = enterprise_dir / "projects"
-        if not projects_dir.exists():
+        try:
+            with os.scandir(os.path.join(enterprise_dir.path, "projects")) as entries:
+                project_dirs = [e for e in entries if e.name[0] != '.' and e.is_dir()]
+        except FileNotFoundError:
             continue
 
-        for project_dir in projects_dir.iterdir():
-            if not project_dir.is_dir() or project_dir.name.startswith('.'):
-                continue
-
-            projet_json = project_dir / "projet.json"
-            if not projet_json.exists():
-                continue
-
+        for project_dir in project_dirs:
             # Lire projet.json
-            with open(projet_json, 'r', encoding='utf-8') as f:
-                projet_data = json.load(f)
+            try:
+                with open(os.path.join(project_dir.path, "projet.json"), 'r', encoding='utf-8') as f:
+                    projet_data = json.load(f)
+            except FileNotFoundError:
+                continue
 
             # S'assurer que enterprise_id est présent
             if "enterprise_id" not in projet_data:
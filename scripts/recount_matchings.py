@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Script de recomptage des matchings de chaque projet (matchings_count)
+
+Les matchings lancés par l'API avant que la route ne mette à jour ce compteur
+n'y sont pas comptés: ce script le recalcule depuis les fichiers sur disque.
+Optionnel: list_matchings vérifie les dossiers quand le compteur vaut zéro.
+
+Usage:
+    python scripts/recount_matchings.py                # Dry-run
+    python scripts/recount_matchings.py --apply        # Mise à jour réelle
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+# Ajouter le projet au PYTHONPATH
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from brainrh.services.project_service import ProjectService
+from project_manager import ProjectManager
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Recomptage des matchings par projet")
+    parser.add_argument("--apply", action="store_true", help="Appliquer les corrections (défaut: dry-run)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    dry_run = not args.apply
+
+    print("🔢 RECOMPTAGE DES MATCHINGS")
+    print("=" * 50)
+    if dry_run:
+        print("   (dry-run: aucune modification, relancer avec --apply)")
+
+    pm = ProjectManager()
+    projects = ProjectService.list_projects()
+    fixed = 0
+
+    for projet in projects:
+        project_id = projet["id"]
+        actual = len(pm.scan_matchings(project_id))
+        stored = projet.get("matchings_count")
+
+        if stored == actual:
+            continue
+
+        print(f"   ⚠️  {project_id}: matchings_count={stored}, {actual} sur disque")
+        if not dry_run:
+            ProjectService.update_project(project_id, {"matchings_count": actual})
+        fixed += 1
+
+    action = "corrigé(s)" if not dry_run else "à corriger"
+    print(f"\n✅ {len(projects)} projets vérifiés, {fixed} compteur(s) {action}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,7 +12,17 @@ from datetime import datetime
 from typing import Dict, List, Optional
 import uuid
 
+import json_io
 from brainrh.services.project_service import ProjectService
+from project_manager import (
+    MATCHING_META_SUFFIX,
+    count_historique_candidates,
+    count_matching_candidates,
+    has_matchings_on_disk,
+    invalidate_project_cache,
+    read_candidats_count,
+    write_matching_meta,
+)
 
 
 class UnifiedProjectManager:
@@ -27,10 +37,7 @@ class UnifiedProjectManager:
 
     def _write_atomic(self, file_path: Path, data: Dict):
         """Écrit un fichier JSON de manière atomique"""
-        tmp_file = file_path.with_suffix('.tmp')
-        with open(tmp_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        tmp_file.replace(file_path)
+        json_io.write_json(file_path, data)
 
     def _get_projects_folder(self, enterprise_id: str) -> Path:
         """Retourne le chemin du dossier projects pour une entreprise"""
@@ -151,20 +158,24 @@ class UnifiedProjectManager:
             return None
 
         # Sinon, chercher dans toutes les entreprises
-        for enterprise_dir in self.enterprises_folder.iterdir():
-            if not enterprise_dir.is_dir() or enterprise_dir.name.startswith('_'):
-                continue
+        # scandir: type des entrées fourni par le listing (pas de stat par entreprise),
+        # et ouverture directe du projet.json candidat au lieu d'un exists() préalable
+        with os.scandir(self.enterprises_folder) as entries:
+            for entry in entries:
+                if entry.name.startswith('_') or not entry.is_dir(follow_symlinks=False):
+                    continue
 
-            project_dir = enterprise_dir / "projects" / project_id
-            projet_file = project_dir / "projet.json"
+                projet_file = os.path.join(entry.path, "projects", project_id, "projet.json")
+                try:
+                    with open(projet_file, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                except FileNotFoundError:
+                    continue
 
-            if projet_file.exists():
-                with open(projet_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    # S'assurer que enterprise_id est présent
-                    if "enterprise_id" not in data:
-                        data["enterprise_id"] = enterprise_dir.name
-                    return data
+                # S'assurer que enterprise_id est présent
+                if "enterprise_id" not in data:
+                    data["enterprise_id"] = entry.name
+                return data
 
         return None
 
@@ -254,6 +265,7 @@ class UnifiedProjectManager:
         # Mettre à jour via ProjectService (DB + JSON)
         # ProjectService écrit le JSON ET met à jour la DB
         updated = self.project_service.update_project(project_id, updates)
+        invalidate_project_cache(project_id)  # Cache partagé avec ProjectManager
 
         if not updated:
             raise ValueError(f"Échec de la mise à jour du projet {project_id}")
@@ -288,6 +300,7 @@ class UnifiedProjectManager:
         offre_file = project_dir / "offre_parsed.json"
 
         self._write_atomic(offre_file, offre_data)
+        invalidate_project_cache(project_id)
 
         # Mettre à jour le projet
         self.update_project(project_id, {"offre_saved": True}, ent_id)
@@ -314,8 +327,7 @@ class UnifiedProjectManager:
         if not offre_file.exists():
             return None
 
-        with open(offre_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return json_io.read_json(offre_file)
 
     def save_matching_result(self, project_id: str, results: Dict,
                             timestamp: Optional[str] = None,
@@ -348,13 +360,12 @@ class UnifiedProjectManager:
         # Sauvegarder JSON
         result_file = matching_folder / "results.json"
         self._write_atomic(result_file, results)
+        write_matching_meta(result_file, timestamp, count_matching_candidates(results))
 
-        # Incrémenter le compteur
-        matchings_count = projet.get("matchings_count", 0) + 1
-        self.update_project(project_id, {
-            "matchings_count": matchings_count,
-            "last_matching": timestamp
-        }, ent_id)
+        # Incrémenter le compteur (un seul appel au service, sans relire le projet)
+        invalidate_project_cache(project_id)
+        if not self.project_service.increment_matching_count(project_id, timestamp):
+            raise ValueError(f"Échec de la mise à jour du projet {project_id}")
 
         return timestamp
 
@@ -375,71 +386,58 @@ class UnifiedProjectManager:
 
         ent_id = projet.get("enterprise_id") or enterprise_id
         project_dir = self._get_project_dir(project_id, ent_id)
+
+        # Compteur à zéro et dossiers vides: rien à lire (projets sans historique)
+        if projet.get("matchings_count") == 0 and not has_matchings_on_disk(project_dir):
+            return []
         matchings = []
 
         # Lire les nouveaux matchings (dossier matchings/)
-        matchings_dir = project_dir / "matchings"
-        if matchings_dir.exists():
-            for matching_folder in sorted(matchings_dir.iterdir(), reverse=True):
-                if not matching_folder.is_dir():
-                    continue
-
+        # scandir: nom, chemin et type viennent du listing (ni Path ni stat par entrée);
+        # l'ordre est donné par le tri final sur le timestamp
+        matchings_dir = os.path.join(project_dir, "matchings")
+        if os.path.isdir(matchings_dir):
+            with os.scandir(matchings_dir) as entries:
+                matching_folders = [e for e in entries if e.is_dir(follow_symlinks=False)]
+
+            for matching_folder in matching_folders:
                 timestamp = matching_folder.name
-                results_file = matching_folder / "results.json"
+                results_file = os.path.join(matching_folder.path, "results.json")
 
-                if results_file.exists():
+                if os.path.isfile(results_file):
                     try:
-                        with open(results_file, 'r', encoding='utf-8') as f:
-                            data = json.load(f)
-
-                        # Récupérer le nombre de candidats depuis metadata ou results
-                        candidats_count = 0
-                        if "metadata" in data:
-                            candidats_count = data["metadata"].get("top_reranked", 0)
-                        elif "results" in data:
-                            candidats_count = len(data.get("results", []))
-
-                        matchings.append({
-                            "timestamp": timestamp,
-                            "candidats_count": candidats_count,
-                            "file_path": str(results_file)
-                        })
+                        matchings.append(
+                            (timestamp, read_candidats_count(results_file, count_matching_candidates), results_file)
+                        )
                     except Exception as e:
                         print(f"Erreur lecture {results_file}: {e}")
 
         # Lire les anciens matchings (dossier historique/)
-        historique_dir = project_dir / "historique"
-        if historique_dir.exists():
-            for file in sorted(historique_dir.glob("*.json"), reverse=True):
-                timestamp = file.stem
+        historique_dir = os.path.join(project_dir, "historique")
+        if os.path.isdir(historique_dir):
+            with os.scandir(historique_dir) as entries:
+                files = [
+                    e for e in entries
+                    if e.name.endswith(".json") and not e.name.endswith(MATCHING_META_SUFFIX) and e.is_file()
+                ]
 
-                try:
-                    with open(file, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
+            for file in files:
+                timestamp = file.name[:-len(".json")]
 
-                    # Compter les candidats
-                    candidats_count = 0
-                    if "reranked_cvs" in data:
-                        reranked = data["reranked_cvs"]
-                        if isinstance(reranked, list):
-                            candidats_count = len(reranked)
-                        elif isinstance(reranked, dict):
-                            candidats_count = len(reranked.get("ranked_cvs", []))
-                    elif "scored_cvs" in data:
-                        candidats_count = len(data.get("scored_cvs", []))
-
-                    matchings.append({
-                        "timestamp": timestamp,
-                        "candidats_count": candidats_count,
-                        "file_path": str(file)
-                    })
+                try:
+                    matchings.append(
+                        (timestamp, read_candidats_count(file.path, count_historique_candidates), file.path)
+                    )
                 except Exception as e:
-                    print(f"Erreur lecture {file}: {e}")
+                    print(f"Erreur lecture {file.path}: {e}")
 
-        # Trier par timestamp (plus récent en premier)
-        matchings.sort(key=lambda m: m["timestamp"], reverse=True)
+        # Trier par timestamp (plus récent en premier): tuples comparés directement, dicts construits après
+        matchings.sort(reverse=True)
 
-        return matchings
+        return [
+            {"timestamp": timestamp, "candidats_count": candidats_count, "file_path": file_path}
+            for timestamp, candidats_count, file_path in matchings
+        ]
 
     def load_matching(self, project_id: str, timestamp: str,
                      enterprise_id: Optional[str] = None) -> Optional[Dict]:
@@ -467,14 +465,12 @@ class UnifiedProjectManager:
         # Essayer nouveau format d'abord (matchings/)
         new_result_file = project_dir / "matchings" / timestamp / "results.json"
         if new_result_file.exists():
-            with open(new_result_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return json_io.read_json(new_result_file)
 
         # Essayer ancien format (historique/)
         old_result_file = project_dir / "historique" / f"{timestamp}.json"
         if old_result_file.exists():
-            with open(old_result_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return json_io.read_json(old_result_file)
 
         return None
 